@@ -1,85 +1,218 @@
-from flask import Flask, jsonify, send_from_directory
-from flask_cors import CORS
-from flask_jwt_extended import JWTManager
-from models import db
-# Importar explícitamente los modelos para que Alembic los detecte en autogenerate
-from models import User, Product, CartItem, Order, OrderItem, OrderInfo, OrderStatus, DailyMenuItem  # noqa: F401
-from flask_migrate import Migrate
-from routes.auth_routes import auth_bp
-from routes.product_routes import product_bp
-from routes.cart_routes import cart_bp
-from routes.admin_routes import admin_bp
-from routes.menu_routes import menu_bp
-from routes.order_routes import order_bp
-
-app = Flask(__name__)
 import os
-basedir = os.path.abspath(os.path.dirname(__file__))
+from datetime import timedelta
 
-# Configuración desde variables de entorno (apta para Render)
-db_url = os.environ.get('DATABASE_URL')
-if not db_url:
-    # Fallback local para desarrollo (SQLite en archivo)
-    db_url = f"sqlite:///{os.path.join(basedir, 'database.db')}"
-
-app.config['SQLALCHEMY_DATABASE_URI'] = db_url
-app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
-    'pool_pre_ping': True,
-}
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-app.config['JWT_SECRET_KEY'] = os.environ.get('JWT_SECRET_KEY', 'super-secret-key')  # Cambiar en producción
-app.config['UPLOAD_FOLDER'] = os.path.join(basedir, 'uploads')
-os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+from flask import Flask, jsonify, send_from_directory
+
+basedir = os.path.abspath(os.path.dirname(__file__))
 
 # Directorio IMG en la raíz del proyecto
 IMG_DIR = os.path.abspath(os.path.join(basedir, '..', 'IMG'))
 
-# Inicializar extensiones
-# Permitir desarrollo desde puertos comunes de Vite y localhost y origen de producción configurable
-origins = [
-    "http://localhost:3000",
-    "http://localhost:5173",
-    "http://127.0.0.1:3000",
-    "http://127.0.0.1:5173",
-]
-frontend_origin = os.environ.get('FRONTEND_ORIGIN')
-if frontend_origin:
-    origins.append(frontend_origin)
-
-CORS(app, resources={r"/api/*": {"origins": origins}}, supports_credentials=True)
-jwt = JWTManager(app)
-db.init_app(app)
-Migrate(app, db)
-
-# Registrar blueprints
-app.register_blueprint(auth_bp)
-app.register_blueprint(product_bp)
-app.register_blueprint(cart_bp)
-app.register_blueprint(admin_bp)
-app.register_blueprint(menu_bp)
-app.register_blueprint(order_bp)
-
-@app.route('/uploads/<path:filename>')
-def uploaded_file(filename):
-    return send_from_directory(app.config['UPLOAD_FOLDER'], filename)
-
-# Servir archivos desde IMG/
-@app.route('/img/<path:filename>')
-def img_file(filename):
-    return send_from_directory(IMG_DIR, filename)
-
-@app.route('/api/health')
-def health():
-    return jsonify({'status': 'ok'}), 200
-
-# Ruta raíz informativa para evitar 404 en la URL base
-@app.route('/')
-def root():
-    return jsonify({
-        'message': 'Backend de Restaurante activo',
-        'health': '/api/health',
-        'api_base': '/api'
-    }), 200
+# Un año: los nombres con hash de contenido nunca cambian de contenido
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+STATIC_MAX_AGE = 24 * 3600
+
+
+def config_from_env() -> dict:
+    """Configuración desde variables de entorno (apta para Render)."""
+    db_url = os.environ.get('DATABASE_URL')
+    if not db_url:
+        # Fallback local para desarrollo (SQLite en archivo)
+        db_url = f"sqlite:///{os.path.join(basedir, 'database.db')}"
+    return {
+        'SQLALCHEMY_DATABASE_URI': db_url,
+        # Perfil del engine: auto | sqlite | mysql | default (ver db_profiles.py)
+        'DB_PROFILE': os.environ.get('DB_PROFILE', 'auto'),
+        'DB_POOL_SIZE': int(os.environ.get('DB_POOL_SIZE', '10')),
+        'DB_MAX_OVERFLOW': int(os.environ.get('DB_MAX_OVERFLOW', '10')),
+        'DB_POOL_TIMEOUT': float(os.environ.get('DB_POOL_TIMEOUT', '30')),
+        'DB_POOL_RECYCLE': int(os.environ.get('DB_POOL_RECYCLE', '280')),
+        'DB_IDLE_PING_SECONDS': float(os.environ.get('DB_IDLE_PING_SECONDS', '30')),
+        'SQLITE_BUSY_TIMEOUT_MS': int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', '5000')),
+        'SQLITE_MMAP_SIZE': int(os.environ.get('SQLITE_MMAP_SIZE', str(256 * 1024 * 1024))),
+        'SQLALCHEMY_TRACK_MODIFICATIONS': False,
+        'JWT_SECRET_KEY': os.environ.get('JWT_SECRET_KEY', 'super-secret-key'),  # Cambiar en producción
+        'JWT_ACCESS_TOKEN_EXPIRES': timedelta(minutes=int(os.environ.get('JWT_ACCESS_MINUTES', '15'))),
+        'JWT_REFRESH_TOKEN_EXPIRES': timedelta(days=int(os.environ.get('JWT_REFRESH_DAYS', '30'))),
+        # Revocación (logout): filtro de Bloom en memoria sincronizado con la tabla revoked_token
+        'TOKEN_BLOOM_CAPACITY': int(os.environ.get('TOKEN_BLOOM_CAPACITY', '100000')),
+        'TOKEN_REVOCATION_SYNC_SECONDS': float(os.environ.get('TOKEN_REVOCATION_SYNC_SECONDS', '5')),
+        # Hash de contraseñas en un pool acotado (ver passwords.py); cambiar el método rehashea en el próximo login
+        'PASSWORD_HASH_METHOD': os.environ.get('PASSWORD_HASH_METHOD', 'scrypt'),
+        'PASSWORD_HASH_WORKERS': int(os.environ.get('PASSWORD_HASH_WORKERS', '2')),
+        'PASSWORD_HASH_QUEUE': int(os.environ.get('PASSWORD_HASH_QUEUE', '16')),
+        'PASSWORD_HASH_TIMEOUT': float(os.environ.get('PASSWORD_HASH_TIMEOUT', '10')),
+        # Rate limiting de login/registro: reglas "intentos/segundos"; store 'memory' o 'sqlite' (ver ratelimit.py)
+        'RATE_LIMIT_ENABLED': os.environ.get('RATE_LIMIT_ENABLED', '1') == '1',
+        'RATE_LIMIT_STORE': os.environ.get('RATE_LIMIT_STORE', 'memory'),
+        'RATE_LIMIT_SQLITE_PATH': os.environ.get('RATE_LIMIT_SQLITE_PATH'),
+        'LOGIN_RATE_PER_IP': os.environ.get('LOGIN_RATE_PER_IP', '20/60'),
+        'LOGIN_RATE_PER_USER': os.environ.get('LOGIN_RATE_PER_USER', '5/60'),
+        'REGISTER_RATE_PER_IP': os.environ.get('REGISTER_RATE_PER_IP', '5/300'),
+        # Número de proxies delante de la app (Render: 1) para tomar la IP del cliente de X-Forwarded-For
+        'TRUSTED_PROXIES': int(os.environ.get('TRUSTED_PROXIES', '0')),
+        'UPLOAD_FOLDER': os.path.join(basedir, 'uploads'),
+        'FRONTEND_ORIGIN': os.environ.get('FRONTEND_ORIGIN'),
+        # Serialización JSON: 'auto' usa orjson si está instalado, 'stdlib' fuerza el proveedor de Flask
+        'JSON_PROVIDER': os.environ.get('JSON_PROVIDER', 'auto'),
+        # Compresión gzip/brotli de respuestas de texto a partir de COMPRESS_MIN_BYTES (ver compression.py)
+        'COMPRESS_ENABLED': os.environ.get('COMPRESS_ENABLED', '1') == '1',
+        'COMPRESS_MIN_BYTES': int(os.environ.get('COMPRESS_MIN_BYTES', '1024')),
+        'COMPRESS_LEVEL': int(os.environ.get('COMPRESS_LEVEL', '6')),
+        'COMPRESS_BR_QUALITY': int(os.environ.get('COMPRESS_BR_QUALITY', '4')),
+        # Segundos que una respuesta pública cacheada (catálogo, menú) puede servirse
+        # en un worker que no recibió la invalidación explícita
+        'PUBLIC_CACHE_TTL': float(os.environ.get('PUBLIC_CACHE_TTL', '10')),
+        # Broker de eventos para /api/orders/stream: 'memory' (un worker) o 'spool' (varios workers);
+        # gunicorn.conf.py pone 'spool' por defecto con WEB_CONCURRENCY > 1 y no arranca con 'memory'
+        'EVENTS_BROKER': os.environ.get('EVENTS_BROKER', 'memory'),
+        'EVENTS_SPOOL_PATH': os.environ.get('EVENTS_SPOOL_PATH'),
+        # Archivo de pedidos pagados (flask orders archive): antigüedad en días y pedidos por transacción
+        'ARCHIVE_AFTER_DAYS': int(os.environ.get('ARCHIVE_AFTER_DAYS', '90')),
+        'ARCHIVE_BATCH_SIZE': int(os.environ.get('ARCHIVE_BATCH_SIZE', '500')),
+        # Sincronización incremental (/api/sync): días de menú desde hoy, cambios por respuesta, margen para
+        # transacciones que confirman fuera de orden y retención del registro en `flask sync compact`
+        'SYNC_MENU_DAYS': int(os.environ.get('SYNC_MENU_DAYS', '1')),
+        'SYNC_MAX_CHANGES': int(os.environ.get('SYNC_MAX_CHANGES', '1000')),
+        'SYNC_SETTLE_SECONDS': float(os.environ.get('SYNC_SETTLE_SECONDS', '5')),
+        'SYNC_RETENTION_DAYS': int(os.environ.get('SYNC_RETENTION_DAYS', '7')),
+        # Zona horaria del restaurante para agrupar reportes por día local (p. ej. 'America/Lima')
+        'BUSINESS_TIMEZONE': os.environ.get('BUSINESS_TIMEZONE', 'UTC'),
+        # Instrumentación opcional: métricas por petición, log de consultas lentas y cProfile bajo demanda
+        'INSTRUMENTATION_ENABLED': os.environ.get('INSTRUMENTATION_ENABLED') == '1',
+        'SLOW_QUERY_MS': float(os.environ.get('SLOW_QUERY_MS', '100')),
+        'PROFILING_ENABLED': os.environ.get('PROFILING_ENABLED') == '1',
+        'PROFILE_DIR': os.environ.get('PROFILE_DIR'),
+        # Flask-Migrate (y con él Alembic) solo hace falta en comandos `flask ...`;
+        # el CLI de Flask define FLASK_RUN_FROM_CLI antes de cargar la app
+        'ENABLE_MIGRATIONS': os.environ.get('FLASK_RUN_FROM_CLI') == 'true',
+    }
+
+
+def create_app(config=None):
+    """Crea y configura una instancia de la aplicación.
+
+    ``config`` (dict) sobrescribe los valores leídos del entorno, p. ej. para
+    apuntar a otra base de datos en scripts o pruebas.
+    """
+    from flask_cors import CORS
+    from flask_jwt_extended import JWTManager
+    from models import db
+    from auth import init_auth
+    from db_profiles import configure_engine_options, install_engine_events
+    from instrumentation import init_instrumentation
+    from compression import init_compression
+    from serializers import json_provider
+
+    app = Flask(__name__)
+    app.config.update(config_from_env())
+    if config:
+        app.config.update(config)
+    app.json = json_provider(app)
+    os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+    if app.config.get('TRUSTED_PROXIES'):
+        from werkzeug.middleware.proxy_fix import ProxyFix
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config['TRUSTED_PROXIES'])
+
+    # Inicializar extensiones
+    # Permitir desarrollo desde puertos comunes de Vite y localhost y origen de producción configurable
+    origins = [
+        "http://localhost:3000",
+        "http://localhost:5173",
+        "http://127.0.0.1:3000",
+        "http://127.0.0.1:5173",
+    ]
+    if app.config.get('FRONTEND_ORIGIN'):
+        origins.append(app.config['FRONTEND_ORIGIN'])
+
+    CORS(app, resources={r"/api/*": {"origins": origins}}, supports_credentials=True,
+         expose_headers=['X-Next-Cursor', 'Idempotent-Replayed', 'Server-Timing', 'X-Profile-File'])
+    jwt = JWTManager(app)
+    init_auth(app, jwt)
+    configure_engine_options(app)
+    db.init_app(app)
+    with app.app_context():
+        install_engine_events(app, db.engine)
+    if app.config.get('ENABLE_MIGRATIONS'):
+        from flask_migrate import Migrate
+        # Todos los modelos viven en models.py, así que importar db ya los registra para autogenerate
+        Migrate(app, db)
+
+    register_blueprints(app)
+    init_instrumentation(app)
+    init_compression(app)
+    register_static_routes(app)
+    return app
+
+
+def register_blueprints(app):
+    from routes.auth_routes import auth_bp
+    from routes.product_routes import product_bp
+    from routes.cart_routes import cart_bp
+    from routes.admin_routes import admin_bp
+    from routes.menu_routes import menu_bp
+    from routes.order_routes import order_bp
+    from routes.report_routes import report_bp
+    from routes.sync_routes import sync_bp
+
+    app.register_blueprint(auth_bp)
+    app.register_blueprint(product_bp)
+    app.register_blueprint(cart_bp)
+    app.register_blueprint(admin_bp)
+    app.register_blueprint(menu_bp)
+    app.register_blueprint(order_bp)
+    app.register_blueprint(report_bp)
+    app.register_blueprint(sync_bp)
+
+
+def register_static_routes(app):
+    import images
+
+    @app.route('/uploads/<path:filename>')
+    def uploaded_file(filename):
+        folder = app.config['UPLOAD_FOLDER']
+        if not images.is_immutable_name(filename):
+            # Subidas antiguas (timestamp_nombre): caché moderada con revalidación
+            return send_from_directory(folder, filename, max_age=STATIC_MAX_AGE)
+        if not os.path.exists(os.path.join(folder, filename)):
+            # La variante aún se está generando: servir el original sin cachear
+            original = images.original_for(folder, filename)
+            if original:
+                return send_from_directory(folder, original, max_age=0)
+        response = send_from_directory(folder, filename, max_age=IMMUTABLE_MAX_AGE)
+        response.cache_control.immutable = True
+        return response
+
+    # Servir archivos desde IMG/
+    @app.route('/img/<path:filename>')
+    def img_file(filename):
+        return send_from_directory(IMG_DIR, filename, max_age=STATIC_MAX_AGE)
+
+    @app.route('/api/health')
+    def health():
+        return jsonify({'status': 'ok'}), 200
+
+    # Ruta raíz informativa para evitar 404 en la URL base
+    @app.route('/')
+    def root():
+        return jsonify({
+            'message': 'Backend de Restaurante activo',
+            'health': '/api/health',
+            'api_base': '/api'
+        }), 200
+
+
+def __getattr__(name):
+    # `app` se crea en el primer acceso (gunicorn app:app, flask --app app,
+    # `from app import app`), de modo que importar este módulo solo para usar
+    # create_app no construye una instancia configurada desde el entorno.
+    if name == 'app':
+        instance = globals().get('_app')
+        if instance is None:
+            instance = globals()['_app'] = create_app()
+        return instance
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 if __name__ == '__main__':
-    app.run(host='127.0.0.1', port=5000, debug=True)
\ No newline at end of file
+    create_app().run(host='127.0.0.1', port=5000, debug=True)
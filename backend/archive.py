@@ -0,0 +1,108 @@
+"""Archivo de pedidos pagados: tablas vivas pequeñas, historial completo.
+
+Los pedidos pagados hace más de ``ARCHIVE_AFTER_DAYS`` días se mueven de
+``order``/``order_item``/``order_info``/``order_status_history`` a sus
+réplicas ``archived_*`` con ``flask orders archive`` (p. ej. en un cron
+nocturno). Cada lote de ``ARCHIVE_BATCH_SIZE`` pedidos se copia con
+``INSERT ... SELECT`` y se borra de las tablas vivas en su propia
+transacción, de modo que los bloqueos duran poco y el proceso se puede
+interrumpir y reanudar.
+
+El feed de cocina (no pagados) solo lee las tablas vivas, cuyo tamaño ya no
+depende de la antigüedad del negocio. El historial, los pedidos de un
+cliente, la exportación y ``flask reports rebuild`` leen los dos niveles
+(``TIERS``); los reportes normales leen rollups y no cambian.
+
+Un pedido archivado es de solo lectura. Se conservan los ids originales; para
+que SQLite no reasigne ids ya usados, nunca se archivan los pedidos dueños
+de la fila con el id más alto de cada tabla viva.
+"""
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, insert, literal, select
+
+from models import (db, ArchivedOrder, ArchivedOrderInfo, ArchivedOrderItem, ArchivedOrderStatusHistory, Order,
+                    OrderInfo, OrderItem, OrderStatusHistory)
+
+OrderTier = namedtuple('OrderTier', 'name order item info history')
+
+LIVE = OrderTier('live', Order, OrderItem, OrderInfo, OrderStatusHistory)
+ARCHIVE = OrderTier('archive', ArchivedOrder, ArchivedOrderItem, ArchivedOrderInfo, ArchivedOrderStatusHistory)
+TIERS = (LIVE, ARCHIVE)
+
+
+def tiers_for(paid=None) -> tuple:
+    """Niveles que pueden tener pedidos con ese filtro: el archivo solo guarda pagados."""
+    return (LIVE,) if paid is False else TIERS
+
+
+def is_archived(order_id: int) -> bool:
+    return db.session.get(ArchivedOrder, order_id) is not None
+
+
+def newest_archived_at():
+    """Fecha del pedido archivado más reciente (``None`` si el archivo está vacío); usa su índice."""
+    return db.session.query(func.max(ArchivedOrder.created_at)).scalar()
+
+
+def _columns(model):
+    return [column.name for column in model.__table__.columns]
+
+
+def _protected_order_ids() -> list:
+    """Pedidos dueños del id más alto de cada tabla viva (ver docstring del módulo)."""
+    protected = [db.session.query(func.max(Order.id)).scalar()]
+    for model in (OrderItem, OrderInfo, OrderStatusHistory):
+        newest = db.session.query(func.max(model.id)).scalar_subquery()
+        protected.append(db.session.query(model.order_id).filter(model.id == newest).scalar())
+    return [order_id for order_id in protected if order_id is not None]
+
+
+def archivable_query(cutoff: datetime):
+    paid_at = func.coalesce(Order.status_updated_at, Order.created_at)
+    return (db.session.query(Order.id)
+            .filter(Order.status == 'pagado', paid_at < cutoff)
+            .filter(Order.id.notin_(_protected_order_ids())))
+
+
+def _move_batch(order_ids: list, archived_at: datetime):
+    """Copia los pedidos y sus filas hijas al archivo y los borra de las tablas vivas (sin commit)."""
+    order_columns = [c for c in _columns(ArchivedOrder) if c != 'archived_at']
+    db.session.execute(
+        insert(ArchivedOrder).from_select(
+            order_columns + ['archived_at'],
+            select(*[getattr(Order, c) for c in order_columns], literal(archived_at))
+            .where(Order.id.in_(order_ids)),
+        )
+    )
+    for live, archived in ((OrderItem, ArchivedOrderItem), (OrderInfo, ArchivedOrderInfo),
+                           (OrderStatusHistory, ArchivedOrderStatusHistory)):
+        columns = _columns(archived)
+        db.session.execute(
+            insert(archived).from_select(columns, select(*[getattr(live, c) for c in columns])
+                                         .where(live.order_id.in_(order_ids)))
+        )
+        live.query.filter(live.order_id.in_(order_ids)).delete(synchronize_session=False)
+    Order.query.filter(Order.id.in_(order_ids)).delete(synchronize_session=False)
+
+
+def archive_paid_orders(older_than_days: int, batch_size: int = 500, max_batches: int = None) -> int:
+    """Archiva en lotes los pedidos pagados hace más de ``older_than_days`` días; devuelve cuántos."""
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    moved = batches = 0
+    while max_batches is None or batches < max_batches:
+        # FOR UPDATE (MySQL): un cambio de estado concurrente espera a que el lote termine
+        order_ids = [row[0] for row in archivable_query(cutoff).order_by(Order.id)
+                     .limit(batch_size).with_for_update().all()]
+        if not order_ids:
+            break
+        _move_batch(order_ids, datetime.utcnow())
+        db.session.commit()
+        moved += len(order_ids)
+        batches += 1
+    return moved
+
+
+def tier_counts() -> dict:
+    return {tier.name: db.session.query(func.count(tier.order.id)).scalar() for tier in TIERS}
@@ -0,0 +1,196 @@
+"""Autorización por rol y lista de tokens revocados.
+
+Los roles viajan en el propio JWT (``is_admin``), así que comprobar permisos no
+consulta la base. Para la revocación (logout), cada proceso mantiene un filtro
+de Bloom con los ``jti`` revocados delante de la tabla ``RevokedToken``: un
+token que el filtro no conoce se acepta sin tocar la base (el caso común) y
+solo un posible acierto se confirma con una consulta.
+
+El filtro se sincroniza con la tabla cada ``TOKEN_REVOCATION_SYNC_SECONDS``
+leyendo solo las filas nuevas, de modo que un logout atendido por otro worker
+de gunicorn tarda como mucho ese intervalo en aplicarse aquí; en el worker que
+lo atiende es inmediato.
+"""
+from datetime import datetime, timezone
+from functools import wraps
+import hashlib
+import math
+import threading
+import time
+
+from flask import current_app, jsonify
+from flask_jwt_extended import get_jwt, verify_jwt_in_request
+
+from models import db, RevokedToken
+from upsert import upsert_set
+
+ROLE_ADMIN = 'admin'
+ROLE_CUSTOMER = 'customer'
+
+
+def role_from_claims(claims) -> str:
+    return ROLE_ADMIN if claims.get('is_admin') else ROLE_CUSTOMER
+
+
+def roles_required(*roles, **jwt_kwargs):
+    """Como ``jwt_required`` pero además exige que el token tenga uno de ``roles``."""
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            verify_jwt_in_request(**jwt_kwargs)
+            if role_from_claims(get_jwt()) not in roles:
+                return jsonify({'message': 'No autorizado'}), 403
+            return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def admin_required(**jwt_kwargs):
+    return roles_required(ROLE_ADMIN, **jwt_kwargs)
+
+
+class BloomFilter:
+    def __init__(self, capacity: int, error_rate: float = 0.01):
+        self.capacity = capacity
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, value: str):
+        # Doble hashing (Kirsch-Mitzenmacher) a partir de un solo digest
+        digest = hashlib.blake2b(value.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, value: str):
+        for pos in self._positions(value):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, value: str) -> bool:
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(value))
+
+
+def _expires_at(payload) -> datetime:
+    if 'exp' not in payload:
+        # Token sin expiración (JWT_ACCESS_TOKEN_EXPIRES=False): se guarda "para siempre"
+        return datetime(9999, 12, 31)
+    return datetime.fromtimestamp(payload['exp'], timezone.utc).replace(tzinfo=None)
+
+
+class RevocationList:
+    def __init__(self, capacity: int = 100_000, sync_interval: float = 5.0, rebuild_interval: float = 3600.0):
+        self.capacity = capacity
+        self.sync_interval = sync_interval
+        self.rebuild_interval = rebuild_interval
+        # El lock protege solo el filtro y los contadores; las consultas a la base se hacen fuera
+        self._lock = threading.Lock()
+        self._bloom = None
+        self._last_id = 0
+        self._synced_at = 0.0
+        self._built_at = 0.0
+        self._syncing = False
+        # Revocados en este proceso mientras otro hilo recarga el filtro (puede que su consulta no los vea)
+        self._revoked_while_syncing = []
+
+    def _due(self, now: float):
+        """``'rebuild'``, ``'sync'`` o ``None`` según lo que toque hacer ahora (llamar con el lock)."""
+        if self._syncing:
+            return None
+        if (self._bloom is None or now - self._built_at >= self.rebuild_interval
+                or self._bloom.count >= self._bloom.capacity):
+            return 'rebuild'
+        if now - self._synced_at >= self.sync_interval:
+            return 'sync'
+        return None
+
+    def _sync(self):
+        now = time.monotonic()
+        with self._lock:
+            due = self._due(now)
+            if due is None:
+                return
+            # Un solo hilo consulta; los demás siguen con el filtro actual mientras tanto
+            self._syncing = True
+            self._revoked_while_syncing = []
+            last_id = self._last_id
+        try:
+            if due == 'rebuild':
+                # Recarga completa: descarta del filtro los tokens ya expirados
+                expired_before = datetime.now(timezone.utc).replace(tzinfo=None)
+                rows = (db.session.query(RevokedToken.id, RevokedToken.jti)
+                        .filter(RevokedToken.expires_at > expired_before)
+                        .order_by(RevokedToken.id).all())
+                # Con más revocaciones vigentes de lo previsto, el filtro crece en vez de degradarse
+                bloom = BloomFilter(max(self.capacity, 2 * len(rows)))
+                for _, jti in rows:
+                    bloom.add(jti)
+            else:
+                rows = (db.session.query(RevokedToken.id, RevokedToken.jti)
+                        .filter(RevokedToken.id > last_id)
+                        .order_by(RevokedToken.id).all())
+        except Exception:
+            with self._lock:
+                self._syncing = False
+            raise
+        with self._lock:
+            if due == 'rebuild':
+                for jti in self._revoked_while_syncing:
+                    bloom.add(jti)
+                self._bloom = bloom
+                self._built_at = now
+            else:
+                for _, jti in rows:
+                    self._bloom.add(jti)
+            if rows:
+                self._last_id = max(self._last_id, rows[-1][0])
+            self._synced_at = now
+            self._syncing = False
+            self._revoked_while_syncing = []
+
+    def is_revoked(self, jti: str) -> bool:
+        self._sync()
+        with self._lock:
+            # Sin filtro todavía (otro hilo lo está cargando) se pregunta a la base
+            maybe = self._bloom is None or jti in self._bloom
+        if not maybe:
+            return False
+        return db.session.query(RevokedToken.id).filter_by(jti=jti).first() is not None
+
+    def revoke(self, payload: dict, user_id=None):
+        """Guarda el token en la tabla (sin commit) y lo añade al filtro local."""
+        jti = payload['jti']
+        # Upsert: si ya estaba revocado (p. ej. doble logout) no hay IntegrityError que
+        # obligue a deshacer la transacción, con las demás revocaciones de la petición
+        upsert_set(RevokedToken, keys={'jti': jti}, values={
+            'token_type': payload.get('type', 'access'),
+            'user_id': user_id,
+            'expires_at': _expires_at(payload),
+        })
+        with self._lock:
+            if self._bloom is not None:
+                self._bloom.add(jti)
+            if self._syncing:
+                self._revoked_while_syncing.append(jti)
+
+
+def get_revocation_list(app=None) -> RevocationList:
+    app = app or current_app._get_current_object()
+    return app.extensions['token_revocations']
+
+
+def init_auth(app, jwt):
+    app.extensions['token_revocations'] = RevocationList(
+        capacity=app.config.get('TOKEN_BLOOM_CAPACITY', 100_000),
+        sync_interval=app.config.get('TOKEN_REVOCATION_SYNC_SECONDS', 5.0),
+    )
+
+    @jwt.token_in_blocklist_loader
+    def check_if_token_revoked(jwt_header, jwt_payload):
+        return get_revocation_list().is_revoked(jwt_payload['jti'])
+
+    @jwt.revoked_token_loader
+    def revoked_token_response(jwt_header, jwt_payload):
+        return jsonify({'message': 'Token revocado'}), 401
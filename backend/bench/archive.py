@@ -0,0 +1,86 @@
+"""Efecto del archivo de pedidos pagados sobre el feed, el historial y el tamaño de las tablas vivas.
+
+Uso (desde ``backend/``)::
+
+    python -m bench.archive --days 365 --orders-per-day 150 --older-than-days 30
+
+Siembra una base temporal con un año de pedidos pagados, mide el feed de
+cocina (``GET /api/orders/``), la primera página del historial y el historial
+de un cliente, ejecuta el archivo por lotes (con su duración) y vuelve a
+medir. El historial debe devolver lo mismo antes y después.
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from bench.common import admin_headers, load_app, run_metadata, summarize
+
+SCENARIOS = {
+    'kitchen_feed': '/api/orders/?limit=50',
+    'history_first_page': '/api/orders/history?limit=50',
+    'history_old_month': '/api/orders/history?limit=50&from={old_from}&to={old_to}',
+    'customer_orders': '/api/admin/customers/2/orders?limit=50',
+}
+
+
+def _measure(client, headers: dict, urls: dict, runs: int) -> dict:
+    results = {}
+    for name, url in urls.items():
+        samples = []
+        for _ in range(runs):
+            t0 = time.perf_counter()
+            response = client.get(url, headers=headers)
+            samples.append(time.perf_counter() - t0)
+        results[name] = {**summarize(samples), 'status': response.status_code,
+                         'ids': [o['id'] for o in response.get_json()]}
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--orders-per-day', type=int, default=150)
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--older-than-days', type=int, default=30)
+    parser.add_argument('--batch-size', type=int, default=500)
+    parser.add_argument('--runs', type=int, default=30)
+    args = parser.parse_args()
+
+    app = load_app(f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='bench_archive_'), 'bench.db')}")
+    from bench.seed import seed
+    dataset = seed(app, users=args.users, days=args.days, orders_per_day=args.orders_per_day)
+
+    from datetime import date, timedelta
+    from archive import archive_paid_orders, tier_counts
+    old_to = date.today() - timedelta(days=args.days // 2)
+    urls = {name: url.format(old_from=(old_to - timedelta(days=30)).isoformat(), old_to=old_to.isoformat())
+            for name, url in SCENARIOS.items()}
+    headers = admin_headers(app)
+    client = app.test_client()
+
+    with app.app_context():
+        counts_before = tier_counts()
+    before = _measure(client, headers, urls, args.runs)
+    with app.app_context():
+        t0 = time.perf_counter()
+        moved = archive_paid_orders(args.older_than_days, batch_size=args.batch_size)
+        archive_s = time.perf_counter() - t0
+        counts_after = tier_counts()
+    after = _measure(client, headers, urls, args.runs)
+
+    scenarios = {}
+    for name in urls:
+        same = before[name].pop('ids') == after[name].pop('ids')
+        scenarios[name] = {'before': before[name], 'after': after[name], 'same_result': same}
+    print(json.dumps({
+        'meta': {**run_metadata(), 'dataset': dataset, 'runs': args.runs},
+        'archive': {'moved': moved, 'seconds': round(archive_s, 2), 'batch_size': args.batch_size,
+                    'orders_before': counts_before, 'orders_after': counts_after},
+        'scenarios': scenarios,
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
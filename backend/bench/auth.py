@@ -0,0 +1,106 @@
+"""Coste por petición de la autenticación JWT con lista de revocación.
+
+Uso (desde ``backend/``)::
+
+    python -m bench.auth --revoked 10000 --iterations 5000 --budget-us 300
+
+Mide ``verify_jwt_in_request`` (firma, claims y consulta a la lista de
+revocados) con un token válido y con uno revocado, frente a decodificar el
+token sin lista de revocación, y cuenta las consultas SQL por verificación.
+Con ``--budget-us`` sale con código 1 si la mediana del caso común (token
+válido) supera el presupuesto.
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from bench.common import admin_headers, load_app, run_metadata, summarize
+
+
+def _measure(app, call, iterations: int, queries: dict) -> dict:
+    call()  # calentamiento (sincroniza el filtro de Bloom)
+    samples = []
+    queries['count'] = 0
+    for _ in range(iterations):
+        t0 = time.perf_counter()
+        call()
+        samples.append(time.perf_counter() - t0)
+    result = summarize(samples)
+    result['p50_us'] = round(result['p50_ms'] * 1000, 1)
+    result['sql_queries_per_call'] = round(queries['count'] / iterations, 3)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--revoked', type=int, default=10000, help='Tokens revocados en la tabla.')
+    parser.add_argument('--iterations', type=int, default=5000)
+    parser.add_argument('--budget-us', type=float, help='Máximo para la mediana con token válido.')
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp(prefix='bench_auth_')
+    app = load_app(f"sqlite:///{os.path.join(tmpdir, 'bench.db')}")
+    from flask_jwt_extended import decode_token, verify_jwt_in_request
+    from flask_jwt_extended.exceptions import RevokedTokenError
+    from sqlalchemy import event, insert
+    from auth import get_revocation_list
+    from models import db, RevokedToken
+
+    expires = datetime.utcnow() + timedelta(days=1)
+    with app.app_context():
+        db.create_all()
+        db.session.execute(insert(RevokedToken), [
+            {'jti': str(uuid.uuid4()), 'token_type': 'access', 'expires_at': expires}
+            for _ in range(args.revoked)
+        ])
+        db.session.commit()
+        engine = db.engine
+    queries = {'count': 0}
+
+    def count_query(*_args, **_kwargs):
+        queries['count'] += 1
+    event.listen(engine, 'before_cursor_execute', count_query)
+
+    valid = admin_headers(app)
+    revoked = admin_headers(app)
+    with app.app_context():
+        get_revocation_list().revoke(decode_token(revoked['Authorization'].split()[1]))
+        db.session.commit()
+    raw_token = valid['Authorization'].split()[1]
+
+    def verify(headers):
+        def call():
+            with app.test_request_context(headers=headers):
+                try:
+                    verify_jwt_in_request()
+                except RevokedTokenError:
+                    pass
+        return call
+
+    def decode_only():
+        # Mismo contexto de petición que verify, para que la diferencia sea solo la verificación
+        with app.test_request_context(headers=valid):
+            decode_token(raw_token)
+
+    results = {
+        'decode_only': _measure(app, decode_only, args.iterations, queries),
+        'valid_token': _measure(app, verify(valid), args.iterations, queries),
+        'revoked_token': _measure(app, verify(revoked), args.iterations, queries),
+    }
+    overhead_us = round(results['valid_token']['p50_us'] - results['decode_only']['p50_us'], 1)
+    print(json.dumps({
+        'meta': {**run_metadata(), 'revoked_rows': args.revoked, 'iterations': args.iterations},
+        'scenarios': results,
+        'revocation_overhead_p50_us': overhead_us,
+        'budget_us': args.budget_us,
+    }, indent=2))
+    if args.budget_us is not None and results['valid_token']['p50_us'] > args.budget_us:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
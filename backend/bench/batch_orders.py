@@ -0,0 +1,67 @@
+"""Compara ``POST /api/admin/orders/batch`` con N llamadas a ``POST /api/admin/orders``.
+
+Uso (desde ``backend/``)::
+
+    python -m bench.batch_orders --orders 200 --items 3
+
+Trabaja sobre una base SQLite temporal; imprime el resultado en JSON.
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+
+from bench.common import admin_headers, load_app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--orders', type=int, default=200)
+    parser.add_argument('--items', type=int, default=3)
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp(prefix='bench_batch_')
+    app = load_app(f"sqlite:///{os.path.join(tmpdir, 'bench.db')}")
+    from models import db, User
+    from catalog import add_product
+
+    with app.app_context():
+        db.create_all()
+        for n in range(20):
+            add_product(name=f'Plato {n}', price=10 + n)
+        db.session.add_all([User(username=f'cliente{n}') for n in range(20)])
+        db.session.commit()
+    headers = admin_headers(app)
+
+    rng = random.Random(42)
+    orders = [{
+        'user_id': rng.randint(1, 20),
+        'order_type': 'mesa',
+        'table_number': rng.randint(1, 15),
+        'payment_method': 'efectivo',
+        'items': [{'product_id': rng.randint(1, 20), 'quantity': rng.randint(1, 3)} for _ in range(args.items)],
+    } for _ in range(args.orders)]
+
+    client = app.test_client()
+    start = time.perf_counter()
+    for order in orders:
+        assert client.post('/api/admin/orders', json=order, headers=headers).status_code == 201
+    single = time.perf_counter() - start
+
+    start = time.perf_counter()
+    assert client.post('/api/admin/orders/batch', json={'orders': orders}, headers=headers).status_code == 201
+    batch = time.perf_counter() - start
+
+    print(json.dumps({
+        'orders': args.orders,
+        'items_per_order': args.items,
+        'single_calls_s': round(single, 4),
+        'batch_call_s': round(batch, 4),
+        'speedup': round(single / batch, 1) if batch else None,
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""Utilidades compartidas por los scripts de benchmark."""
+import os
+import platform
+import subprocess
+import sys
+from datetime import datetime, timezone
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+def load_app(database_url: str, **config):
+    """Crea una instancia de la app apuntando a ``database_url`` (``config`` sobrescribe otras claves)."""
+    if BACKEND_DIR not in sys.path:
+        sys.path.insert(0, BACKEND_DIR)
+    from app import create_app
+    return create_app({'SQLALCHEMY_DATABASE_URI': database_url, **config})
+
+
+def admin_headers(app, user_id: int = 1) -> dict:
+    from flask_jwt_extended import create_access_token
+    with app.app_context():
+        token = create_access_token(identity=str(user_id), additional_claims={'is_admin': True, 'username': 'admin'})
+    return {'Authorization': f'Bearer {token}'}
+
+
+def customer_headers(app, user_id: int) -> dict:
+    from flask_jwt_extended import create_access_token
+    with app.app_context():
+        token = create_access_token(identity=str(user_id), additional_claims={'is_admin': False})
+    return {'Authorization': f'Bearer {token}'}
+
+
+def percentile(sorted_samples, pct: float) -> float:
+    if not sorted_samples:
+        return 0.0
+    index = min(len(sorted_samples) - 1, max(0, round(pct / 100 * len(sorted_samples)) - 1))
+    return sorted_samples[index]
+
+
+def summarize(samples_s, elapsed_s: float = None) -> dict:
+    """Percentiles en milisegundos y throughput en peticiones por segundo."""
+    ordered = sorted(samples_s)
+    total = elapsed_s if elapsed_s is not None else sum(ordered)
+    return {
+        'requests': len(ordered),
+        'p50_ms': round(percentile(ordered, 50) * 1000, 3),
+        'p90_ms': round(percentile(ordered, 90) * 1000, 3),
+        'p99_ms': round(percentile(ordered, 99) * 1000, 3),
+        'max_ms': round((ordered[-1] if ordered else 0) * 1000, 3),
+        'throughput_rps': round(len(ordered) / total, 1) if total else None,
+    }
+
+
+def run_metadata() -> dict:
+    try:
+        revision = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BACKEND_DIR,
+                                  capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        revision = None
+    return {
+        'git_revision': revision,
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+    }
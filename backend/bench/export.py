@@ -0,0 +1,69 @@
+"""Memoria y tiempo al primer byte de la exportación en streaming.
+
+Uso (desde ``backend/``)::
+
+    python -m bench.export --days 365 --orders-per-day 150
+
+Siembra una base temporal y compara ``GET /api/admin/orders/export`` (CSV y
+NDJSON) con ``GET /api/orders/history`` sin paginar, que arma la lista entera
+en memoria. Para cada uno mide el tiempo hasta el primer trozo, el total, los
+bytes enviados y el pico de memoria de Python (``tracemalloc``) mientras se
+consume la respuesta.
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+
+from bench.common import admin_headers, load_app, run_metadata
+
+
+def _consume(client, url: str, headers: dict) -> dict:
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    response = client.get(url, headers=headers, buffered=False)
+    first_chunk_s = None
+    size = 0
+    for chunk in response.response:
+        if first_chunk_s is None:
+            first_chunk_s = time.perf_counter() - t0
+        size += len(chunk)
+    response.close()
+    total_s = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        'status': response.status_code,
+        'first_chunk_ms': round((first_chunk_s or total_s) * 1000, 1),
+        'total_ms': round(total_s * 1000, 1),
+        'bytes': size,
+        'peak_python_mb': round(peak / 1024 / 1024, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--orders-per-day', type=int, default=150)
+    parser.add_argument('--users', type=int, default=2000)
+    args = parser.parse_args()
+
+    app = load_app(f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='bench_export_'), 'bench.db')}")
+    from bench.seed import seed
+    dataset = seed(app, users=args.users, days=args.days, orders_per_day=args.orders_per_day)
+    headers = admin_headers(app)
+    client = app.test_client()
+
+    scenarios = {
+        'export_csv': '/api/admin/orders/export?format=csv',
+        'export_ndjson': '/api/admin/orders/export?format=ndjson',
+        'history_json': '/api/orders/history',
+    }
+    results = {name: _consume(client, url, headers) for name, url in scenarios.items()}
+    print(json.dumps({'meta': {**run_metadata(), 'dataset': dataset}, 'scenarios': results}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+"""Prueba de carga contra gunicorn con varios workers.
+
+Uso (desde ``backend/``; gunicorn no funciona en Windows)::
+
+    python -m bench.seed --database-url sqlite:////tmp/bench.db
+    python -m bench.load --database-url sqlite:////tmp/bench.db --workers 4 --concurrency 16 --duration 20
+
+Arranca ``gunicorn app:app`` sobre la base indicada, lanza peticiones
+concurrentes a cada endpoint durante ``--duration`` segundos y emite JSON con
+percentiles, throughput y errores por endpoint.
+"""
+import argparse
+import http.client
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+
+from bench.common import BACKEND_DIR, admin_headers, load_app, run_metadata, summarize
+
+ENDPOINTS = {
+    'order_feed': ('/api/orders/?limit=50', True),
+    'history_page': ('/api/orders/history?limit=50', True),
+    'catalog': ('/api/products/', False),
+    'menu_today': ('/api/menu/today', False),
+    'admin_customers': ('/api/admin/customers?limit=50', True),
+}
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _wait_ready(base_url: str, timeout: float = 30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(f'{base_url}/api/health', timeout=1):
+                return
+        except (OSError, http.client.HTTPException):
+            time.sleep(0.2)
+    raise RuntimeError('gunicorn no respondió a /api/health')
+
+
+def _hammer(url: str, headers: dict, duration: float, concurrency: int) -> dict:
+    samples, errors = [], []
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def worker():
+        local_samples, local_errors = [], 0
+        while time.monotonic() < deadline:
+            request = urllib.request.Request(url, headers=headers)
+            t0 = time.perf_counter()
+            try:
+                with urllib.request.urlopen(request, timeout=30) as response:
+                    response.read()
+                local_samples.append(time.perf_counter() - t0)
+            except (OSError, http.client.HTTPException):
+                local_errors += 1
+        with lock:
+            samples.extend(local_samples)
+            errors.append(local_errors)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return {**summarize(samples, time.perf_counter() - started), 'errors': sum(errors)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Prueba de carga con gunicorn multi-worker.')
+    parser.add_argument('--database-url', required=True, help='Base ya sembrada con bench.seed.')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--endpoint', action='append', choices=sorted(ENDPOINTS))
+    parser.add_argument('--output')
+    args = parser.parse_args()
+
+    headers = admin_headers(load_app(args.database_url))
+    port = _free_port()
+    base_url = f'http://127.0.0.1:{port}'
+    env = {**os.environ, 'DATABASE_URL': args.database_url}
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '--workers', str(args.workers), '--bind', f'127.0.0.1:{port}',
+         '--log-level', 'warning', 'app:app'],
+        cwd=BACKEND_DIR, env=env,
+    )
+    try:
+        _wait_ready(base_url)
+        results = {}
+        for name in args.endpoint or ENDPOINTS:
+            path, auth = ENDPOINTS[name]
+            results[name] = _hammer(base_url + path, headers if auth else {}, args.duration, args.concurrency)
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+    output = json.dumps({
+        'meta': {**run_metadata(), 'workers': args.workers, 'concurrency': args.concurrency,
+                 'duration_s': args.duration},
+        'endpoints': results,
+    }, indent=2)
+    if args.output:
+        with open(args.output, 'w') as fh:
+            fh.write(output)
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
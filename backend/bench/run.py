@@ -0,0 +1,140 @@
+"""Latencia, throughput y consultas SQL por endpoint usando el test client de Flask.
+
+Uso (desde ``backend/``)::
+
+    python -m bench.run --output bench_results.json
+    python -m bench.run --database-url sqlite:////tmp/bench.db --no-seed --compare anterior.json
+
+Sin ``--database-url`` crea y puebla una base SQLite temporal (ver
+``bench.seed``). El resultado es JSON con percentiles por escenario, la
+revisión de git y el tamaño del dataset, para comparar entre commits.
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from bench.common import admin_headers, customer_headers, load_app, run_metadata, summarize
+
+
+def _scenarios(app, client, admin, customer, product_ids):
+    """Cada escenario es ``(nombre, función)``; la función hace una petición y devuelve su status."""
+    catalog_etag = client.get('/api/products/').headers.get('ETag')
+
+    def checkout():
+        client.post('/api/cart/', json={'product_id': product_ids[0], 'quantity': 2}, headers=customer)
+        return client.post('/api/cart/checkout', json={'order_type': 'mesa', 'table_number': 4},
+                           headers=customer).status_code
+
+    return [
+        ('order_feed', lambda: client.get('/api/orders/', headers=admin).status_code),
+        ('order_feed_page', lambda: client.get('/api/orders/?limit=50', headers=admin).status_code),
+        ('history_page', lambda: client.get('/api/orders/history?limit=50', headers=admin).status_code),
+        ('customer_history', lambda: client.get('/api/orders/history?limit=50', headers=customer).status_code),
+        ('checkout', checkout),
+        ('catalog', lambda: client.get('/api/products/').status_code),
+        ('catalog_304', lambda: client.get('/api/products/', headers={'If-None-Match': catalog_etag}).status_code),
+        ('menu_today', lambda: client.get('/api/menu/today').status_code),
+        ('admin_customers', lambda: client.get('/api/admin/customers?limit=50', headers=admin).status_code),
+        ('admin_users_full', lambda: client.get('/api/admin/users', headers=admin).status_code),
+        ('report_revenue', lambda: client.get('/api/admin/reports/revenue?group=hour', headers=admin).status_code),
+    ]
+
+
+def run(app, iterations: int, only=None) -> dict:
+    from sqlalchemy import event
+    from models import db, Product
+
+    with app.app_context():
+        product_ids = [pid for (pid,) in db.session.query(Product.id).limit(5)]
+        engine = db.engine
+    queries = {'count': 0}
+
+    def count_query(*_args, **_kwargs):
+        queries['count'] += 1
+    event.listen(engine, 'before_cursor_execute', count_query)
+
+    client = app.test_client()
+    admin = admin_headers(app)
+    customer = customer_headers(app, 2)
+    results = {}
+    try:
+        for name, call in _scenarios(app, client, admin, customer, product_ids):
+            if only and name not in only:
+                continue
+            call()  # calentamiento (cachés, planes de consulta)
+            samples, query_counts, statuses = [], [], set()
+            started = time.perf_counter()
+            for _ in range(iterations):
+                queries['count'] = 0
+                t0 = time.perf_counter()
+                statuses.add(call())
+                samples.append(time.perf_counter() - t0)
+                query_counts.append(queries['count'])
+            elapsed = time.perf_counter() - started
+            results[name] = {
+                **summarize(samples, elapsed),
+                'sql_queries_per_request': round(sum(query_counts) / len(query_counts), 2),
+                'statuses': sorted(statuses),
+            }
+    finally:
+        event.remove(engine, 'before_cursor_execute', count_query)
+    return results
+
+
+def compare(current: dict, previous: dict) -> dict:
+    """Diferencia relativa de p50 y consultas por escenario respecto a un resultado anterior."""
+    deltas = {}
+    for name, now in current['scenarios'].items():
+        before = previous.get('scenarios', {}).get(name)
+        if not before:
+            continue
+        deltas[name] = {
+            'p50_change_pct': round((now['p50_ms'] - before['p50_ms']) / before['p50_ms'] * 100, 1)
+            if before['p50_ms'] else None,
+            'sql_queries_before': before['sql_queries_per_request'],
+            'sql_queries_now': now['sql_queries_per_request'],
+        }
+    return deltas
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de endpoints con el test client de Flask.')
+    parser.add_argument('--database-url', help='Base a usar (por defecto, SQLite temporal).')
+    parser.add_argument('--no-seed', action='store_true', help='No repoblar la base (debe estar sembrada).')
+    parser.add_argument('--iterations', type=int, default=50)
+    parser.add_argument('--scenario', action='append', help='Limitar a estos escenarios (repetible).')
+    parser.add_argument('--days', type=int, default=90)
+    parser.add_argument('--orders-per-day', type=int, default=150)
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--output', help='Archivo JSON de salida (por defecto, stdout).')
+    parser.add_argument('--compare', help='Resultado JSON anterior con el que comparar.')
+    args = parser.parse_args()
+
+    database_url = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='bench_'), 'bench.db')}"
+    app = load_app(database_url)
+    dataset = None
+    if not args.no_seed:
+        from bench.seed import seed
+        dataset = seed(app, users=args.users, days=args.days, orders_per_day=args.orders_per_day)
+
+    result = {
+        'meta': {**run_metadata(), 'database': app.config['SQLALCHEMY_DATABASE_URI'].split(':', 1)[0],
+                 'dataset': dataset, 'iterations': args.iterations},
+        'scenarios': run(app, args.iterations, only=args.scenario),
+    }
+    if args.compare:
+        with open(args.compare) as fh:
+            result['comparison'] = compare(result, json.load(fh))
+
+    output = json.dumps(result, indent=2)
+    if args.output:
+        with open(args.output, 'w') as fh:
+            fh.write(output)
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+"""Búsqueda con el índice invertido frente a un ``LIKE '%…%'`` sobre la tabla.
+
+Uso (desde ``backend/``)::
+
+    python -m bench.search --products 100000 --runs 50
+
+Siembra una base temporal con ``--products`` productos (nombres de platos
+con tildes y descripciones variadas), mide cuánto tarda construir el índice y
+para cada consulta compara la latencia de ``GET /api/products/search`` con la
+de un ``ILIKE '%término%'`` por palabra sobre nombre y descripción, que
+recorre la tabla entera. También cuenta los resultados de cada uno: el
+``LIKE`` no encuentra "Ají" buscando "aji" ni tolera erratas.
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+from bench.common import load_app, run_metadata, summarize
+
+DISHES = ['Lomo saltado', 'Arroz chaufa', 'Ceviche mixto', 'Causa limeña', 'Ají de gallina', 'Tallarín saltado',
+          'Pollo a la brasa', 'Seco de res', 'Chicharrón de cerdo', 'Papa a la huancaína', 'Anticuchos',
+          'Jalea mixta', 'Rocoto relleno', 'Ocopa arequipeña', 'Tacu tacu', 'Sudado de pescado']
+STYLES = ['clásico', 'norteño', 'criollo', 'de la casa', 'especial', 'familiar', 'picante', 'light']
+WORDS = ['con', 'arroz', 'papas', 'yuca', 'salsa', 'criolla', 'ají', 'amarillo', 'limón', 'cebolla', 'culantro',
+         'frejoles', 'camote', 'choclo', 'queso', 'huevo', 'pollo', 'res', 'cerdo', 'pescado', 'mariscos']
+QUERIES = ['aji', 'chaufa', 'ceviche mixto', 'cevice', 'huancaina', 'lomo salt', 'pollo brasa', 'arequipena']
+
+
+def _seed(app, count: int, seed_value: int = 7):
+    from sqlalchemy import insert
+    from models import db, CatalogState, Product, ProductVersion
+
+    rng = random.Random(seed_value)
+    now = datetime.utcnow()
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        rows = [{
+            'id': pid, 'version': 1, 'created_at': now, 'price': round(rng.uniform(8, 45), 2),
+            'name': f'{rng.choice(DISHES)} {rng.choice(STYLES)} {pid}',
+            'description': ' '.join(rng.sample(WORDS, 6)).capitalize(),
+        } for pid in range(1, count + 1)]
+        for start in range(0, count, 10_000):
+            batch = rows[start:start + 10_000]
+            db.session.execute(insert(Product), batch)
+            db.session.execute(insert(ProductVersion), [{
+                'product_id': row['id'], 'version': 1, 'name': row['name'], 'description': row['description'],
+                'price': row['price'],
+            } for row in batch])
+        db.session.add(CatalogState(id=1, version=1))
+        db.session.commit()
+
+
+def _like_search(app, query: str, limit: int):
+    from sqlalchemy import and_, or_
+    from models import db, Product
+
+    terms = query.split()
+    with app.app_context():
+        rows = (db.session.query(Product.id)
+                .filter(Product.deleted_at.is_(None))
+                .filter(and_(*[or_(Product.name.ilike(f'%{t}%'), Product.description.ilike(f'%{t}%'))
+                               for t in terms]))
+                .order_by(Product.name))
+        return len(rows.limit(limit).all()), rows.count()
+
+
+def _timed(fn, runs: int):
+    samples = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        result = fn()
+        samples.append(time.perf_counter() - t0)
+    return result, summarize(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--products', type=int, default=100_000)
+    parser.add_argument('--runs', type=int, default=50)
+    parser.add_argument('--limit', type=int, default=20)
+    args = parser.parse_args()
+
+    app = load_app(f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='bench_search_'), 'bench.db')}")
+    _seed(app, args.products)
+
+    from catalog import get_catalog
+    from search import SearchIndex
+    with app.app_context():
+        catalog = get_catalog(app)
+        t0 = time.perf_counter()
+        index = SearchIndex.build(catalog.products.values(), catalog.version)
+        build_s = time.perf_counter() - t0
+        # Segunda construcción solo para medir memoria (tracemalloc la ralentiza)
+        tracemalloc.start()
+        SearchIndex.build(catalog.products.values(), catalog.version)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        app.extensions['search_index'] = index
+
+    client = app.test_client()
+    scenarios = {}
+    for query in QUERIES:
+        url = f'/api/products/search?q={query}&limit={args.limit}'
+        response, indexed = _timed(lambda: client.get(url), args.runs)
+        total_indexed = index.search(query, limit=0)[1]
+        (_, total_like), like = _timed(lambda: _like_search(app, query, args.limit), args.runs)
+        scenarios[query] = {
+            'index': {**indexed, 'matches': total_indexed, 'status': response.status_code},
+            'like_scan': {**like, 'matches': total_like},
+        }
+    print(json.dumps({
+        'meta': {**run_metadata(), 'products': args.products, 'runs': args.runs, 'limit': args.limit},
+        'index_build': {'seconds': round(build_s, 2), 'peak_python_mb': round(peak / 1024 / 1024, 1),
+                        'documents': len(index)},
+        'scenarios': scenarios,
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+"""Puebla una base de datos con volúmenes realistas para los benchmarks.
+
+Uso (desde ``backend/``)::
+
+    python -m bench.seed --database-url sqlite:////tmp/bench.db --days 90 --orders-per-day 150
+
+También acepta una URL de MySQL local (``mysql+pymysql://...``). Crea las
+tablas, un admin (id 1, usuario ``admin``/contraseña ``admin``), clientes,
+productos, menús diarios y meses de pedidos con sus estados, y recalcula los
+rollups de reportes.
+"""
+import argparse
+import random
+from datetime import date, datetime, timedelta
+
+from bench.common import load_app
+
+PAYMENT_METHODS = ['efectivo', 'yape', 'plin', 'tarjeta', None]
+DISHES = ['Lomo saltado', 'Arroz chaufa', 'Ceviche', 'Causa limeña', 'Ají de gallina', 'Tallarín saltado',
+          'Pollo a la brasa', 'Seco de res', 'Chicharrón', 'Papa a la huancaína', 'Anticuchos', 'Jalea mixta']
+
+
+def seed(app, users: int = 2000, products: int = 80, days: int = 90, orders_per_day: int = 150,
+         menu_size: int = 12, seed_value: int = 42) -> dict:
+    from sqlalchemy import insert
+    from models import (db, User, Product, ProductVersion, CatalogState, DailyMenuItem, Order, OrderItem, OrderInfo,
+                        OrderStatusHistory)
+    from money import order_total
+    from reports import rebuild_rollups
+
+    rng = random.Random(seed_value)
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        now = datetime.utcnow()
+
+        admin = User(username='admin', email='admin@example.com', is_admin=True)
+        admin.set_password('admin')
+        db.session.add(admin)
+        db.session.flush()
+        db.session.execute(insert(User), [{
+            'id': uid, 'username': f'cliente{uid}', 'first_name': rng.choice(['Ana', 'Luis', 'María', 'José', 'Rosa']),
+            'last_name': rng.choice(['Quispe', 'Flores', 'Huamán', 'Rojas', 'Torres']), 'phone': f'9{uid:08d}',
+            'is_admin': False, 'created_at': now - timedelta(days=days),
+        } for uid in range(2, users + 2)])
+        product_rows = [{
+            'id': pid, 'name': f'{DISHES[pid % len(DISHES)]} {pid}', 'description': 'Plato de la casa',
+            'price': round(rng.uniform(8, 45), 2), 'created_at': now - timedelta(days=days + 1),
+        } for pid in range(1, products + 1)]
+        db.session.execute(insert(Product), product_rows)
+        # Versión 1 de cada producto con el mismo id, así los items pueden referenciarla directamente
+        db.session.execute(insert(ProductVersion), [
+            {**{k: v for k, v in row.items() if k != 'id'}, 'id': row['id'], 'product_id': row['id'], 'version': 1}
+            for row in product_rows
+        ])
+        db.session.add(CatalogState(id=1, version=1))
+
+        today = date.today()
+        menu_rows = []
+        for offset in range(days + 1):
+            day = today - timedelta(days=offset)
+            menu_rows += [{'date': day, 'product_id': pid, 'created_at': now}
+                          for pid in rng.sample(range(1, products + 1), min(menu_size, products))]
+        db.session.execute(insert(DailyMenuItem), menu_rows)
+
+        prices = dict(db.session.query(Product.id, Product.price).all())
+        order_id = 0
+        item_rows, info_rows, status_rows, order_rows = [], [], [], []
+
+        def flush():
+            for model, rows in ((Order, order_rows), (OrderItem, item_rows),
+                                (OrderInfo, info_rows), (OrderStatusHistory, status_rows)):
+                if rows:
+                    db.session.execute(insert(model), rows)
+                    rows.clear()
+
+        for offset in range(days, -1, -1):
+            day_start = now - timedelta(days=offset)
+            for _ in range(orders_per_day):
+                order_id += 1
+                created_at = day_start.replace(hour=rng.randint(12, 23), minute=rng.randint(0, 59))
+                lines = [(rng.randint(1, products), rng.randint(1, 3)) for _ in range(rng.randint(1, 4))]
+                # Los pedidos de días anteriores están pagados; los de hoy siguen en cocina
+                status = 'pagado' if offset > 0 else rng.choice(['pendiente', 'entregado', 'pagado'])
+                changed_at = created_at if status == 'pendiente' else created_at + timedelta(minutes=30)
+                order_rows.append({'id': order_id, 'user_id': rng.randint(2, users + 1),
+                                   'total': order_total((qty, prices[pid]) for pid, qty in lines),
+                                   'created_at': created_at, 'status': status,
+                                   'status_updated_at': None if status == 'pendiente' else changed_at})
+                item_rows += [{'order_id': order_id, 'product_id': pid, 'product_version_id': pid, 'quantity': qty,
+                               'price_at_purchase': prices[pid]} for pid, qty in lines]
+                delivery = rng.random() < 0.3
+                info_rows.append({
+                    'order_id': order_id, 'order_type': 'delivery' if delivery else 'mesa',
+                    'table_number': None if delivery else rng.randint(1, 20),
+                    'delivery_address': 'Av. Principal 123' if delivery else None,
+                    'payment_method': rng.choice(PAYMENT_METHODS), 'created_at': created_at,
+                })
+                if status != 'pendiente':
+                    status_rows.append({'order_id': order_id, 'status': status, 'previous_status': 'pendiente',
+                                        'created_at': changed_at})
+            if len(order_rows) >= 5000:
+                flush()
+        flush()
+        db.session.commit()
+        rebuild_rollups(today - timedelta(days=days + 1), today + timedelta(days=1))
+
+    return {'users': users + 1, 'products': products, 'days': days, 'orders': order_id,
+            'menu_items': len(menu_rows)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Puebla una base de datos para benchmarks.')
+    parser.add_argument('--database-url', required=True)
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--products', type=int, default=80)
+    parser.add_argument('--days', type=int, default=90)
+    parser.add_argument('--orders-per-day', type=int, default=150)
+    args = parser.parse_args()
+    app = load_app(args.database_url)
+    print(seed(app, users=args.users, products=args.products, days=args.days, orders_per_day=args.orders_per_day))
+
+
+if __name__ == '__main__':
+    main()
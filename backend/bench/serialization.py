@@ -0,0 +1,79 @@
+"""Bytes enviados y CPU por petición: serialización, campos a elección y compresión.
+
+Uso (desde ``backend/``)::
+
+    python -m bench.serialization --days 30 --runs 30
+
+Siembra una base temporal y compara dos instancias de la app sobre los mismos
+datos: ``before`` (proveedor JSON de Flask, sin compresión) y ``after``
+(orjson si está instalado y gzip/brotli según ``Accept-Encoding``). Para cada
+endpoint mide los bytes del cuerpo y el tiempo de CPU del proceso por
+petición (``time.process_time``), con la respuesta completa y con
+``?fields=`` reducido a lo que suele mostrar una pantalla.
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from bench.common import admin_headers, load_app, run_metadata
+
+SCENARIOS = {
+    'admin_users': '/api/admin/users',
+    'admin_users_fields': '/api/admin/users?fields=id,username,email,is_admin',
+    'orders_page': '/api/orders/history?limit=200',
+    'orders_page_fields': '/api/orders/history?limit=200&fields=id,total,status,created_at,items.product_name',
+    'products': '/api/products/',
+    'products_fields': '/api/products/?fields=id,name,price',
+}
+
+
+def _measure(client, url: str, headers: dict, runs: int) -> dict:
+    client.get(url, headers=headers)
+    cpu = []
+    for _ in range(runs):
+        t0 = time.process_time()
+        response = client.get(url, headers=headers)
+        body = response.get_data()
+        cpu.append(time.process_time() - t0)
+    cpu.sort()
+    return {
+        'status': response.status_code,
+        'content_encoding': response.headers.get('Content-Encoding'),
+        'bytes': len(body),
+        'cpu_ms_p50': round(cpu[len(cpu) // 2] * 1000, 2),
+        'cpu_ms_mean': round(sum(cpu) / len(cpu) * 1000, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--days', type=int, default=30)
+    parser.add_argument('--orders-per-day', type=int, default=150)
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--runs', type=int, default=30)
+    args = parser.parse_args()
+
+    database_url = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='bench_serialization_'), 'bench.db')}"
+    before = load_app(database_url, JSON_PROVIDER='stdlib', COMPRESS_ENABLED=False)
+    after = load_app(database_url)
+    from bench.seed import seed
+    dataset = seed(before, users=args.users, days=args.days, orders_per_day=args.orders_per_day)
+
+    headers = admin_headers(before)
+    results = {}
+    for name, url in SCENARIOS.items():
+        results[name] = {
+            'before': _measure(before.test_client(), url, headers, args.runs),
+            'after': _measure(after.test_client(), url, {**headers, 'Accept-Encoding': 'br, gzip'}, args.runs),
+        }
+    print(json.dumps({
+        'meta': {**run_metadata(), 'dataset': dataset, 'runs': args.runs,
+                 'json_provider_after': type(after.json).__name__},
+        'scenarios': results,
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""Mide el coste de arranque de un worker: importar ``app`` y crear la aplicación.
+
+Uso (desde ``backend/``)::
+
+    python -m bench.startup --runs 10 --budget-ms 400
+
+Cada medición se hace en un intérprete nuevo, como un worker en frío. Con
+``--budget-ms`` el script termina con código 1 si la mediana de
+``import + create_app`` supera el presupuesto, para usarlo en CI.
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+from bench.common import BACKEND_DIR, run_metadata
+
+_PROBE = r'''
+import json, sys, time
+sys.path.insert(0, {backend!r})
+start = time.perf_counter()
+import app as app_module
+imported = time.perf_counter()
+app_module.create_app({{'SQLALCHEMY_DATABASE_URI': 'sqlite://'}})
+created = time.perf_counter()
+print(json.dumps({{'import_ms': (imported - start) * 1000, 'create_ms': (created - imported) * 1000,
+                  'modules': len(sys.modules), 'alembic_loaded': 'alembic' in sys.modules}}))
+'''
+
+
+def _measure_once() -> dict:
+    output = subprocess.run([sys.executable, '-c', _PROBE.format(backend=BACKEND_DIR)], cwd=BACKEND_DIR,
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def _slowest_imports(limit: int) -> list:
+    """Módulos con mayor tiempo acumulado según ``python -X importtime``."""
+    stderr = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c',
+         "import app; app.create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite://'})"],
+        cwd=BACKEND_DIR, capture_output=True, text=True, check=True,
+    ).stderr
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        # Profundidad 0 y 1: lo que importan app.py y create_app, sin desglosar más
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth <= 1 and name.strip() != 'app':
+            rows.append({'module': name.strip(), 'cumulative_ms': round(int(cumulative) / 1000, 1)})
+    return sorted(rows, key=lambda r: r['cumulative_ms'], reverse=True)[:limit]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--budget-ms', type=float, help='Máximo para la mediana de import + create_app.')
+    parser.add_argument('--top', type=int, default=10, help='Módulos más lentos a listar.')
+    args = parser.parse_args()
+
+    samples = [_measure_once() for _ in range(args.runs)]
+    total = [s['import_ms'] + s['create_ms'] for s in samples]
+    result = {
+        'meta': run_metadata(),
+        'runs': args.runs,
+        'import_ms_median': round(statistics.median(s['import_ms'] for s in samples), 1),
+        'create_app_ms_median': round(statistics.median(s['create_ms'] for s in samples), 1),
+        'total_ms_median': round(statistics.median(total), 1),
+        'modules_loaded': samples[-1]['modules'],
+        'alembic_loaded': samples[-1]['alembic_loaded'],
+        'slowest_imports': _slowest_imports(args.top),
+        'budget_ms': args.budget_ms,
+    }
+    print(json.dumps(result, indent=2))
+    if args.budget_ms is not None and result['total_ms_median'] > args.budget_ms:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
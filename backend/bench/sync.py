@@ -0,0 +1,76 @@
+"""Reconexión de una tableta: recarga completa frente a ``GET /api/sync?since=``.
+
+Uso (desde ``backend/``)::
+
+    python -m bench.sync --orders-per-day 300 --changes 10 --runs 20
+
+Siembra una base temporal, toma un cursor y aplica ``--changes`` escrituras
+típicas de un corte de Wi-Fi (cambios de estado, un pedido nuevo, un precio).
+Después compara, en bytes (sin comprimir y con gzip) y en milisegundos, lo que
+descarga la tableta al volver: la recarga de siempre (productos, menú de hoy,
+feed de pedidos y carrito) o solo los cambios desde el cursor.
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from bench.common import admin_headers, load_app, run_metadata, summarize
+
+RELOAD = ('/api/products/', '/api/menu/today', '/api/orders/', '/api/cart/')
+
+
+def _download(client, urls, headers: dict, runs: int) -> dict:
+    samples, sizes = [], {}
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        for encoding in ('identity', 'gzip'):
+            sizes[encoding] = sum(len(client.get(url, headers={**headers, 'Accept-Encoding': encoding}).get_data())
+                                  for url in urls)
+        samples.append((time.perf_counter() - t0) / 2)
+    return {**summarize(samples), 'bytes': sizes['identity'], 'bytes_gzip': sizes['gzip'], 'urls': len(urls)}
+
+
+def _apply_changes(client, headers: dict, count: int):
+    """Cambios de estado de pedidos en cocina, un pedido nuevo y un cambio de precio."""
+    feed = client.get('/api/orders/?fields=id', headers=headers).get_json()
+    for order in feed[:max(count - 2, 0)]:
+        client.put(f"/api/orders/{order['id']}/status", json={'status': 'entregado'}, headers=headers)
+    client.post('/api/admin/orders', json={'user_id': 2, 'order_type': 'mesa', 'table_number': 4,
+                                           'items': [{'product_id': 1, 'quantity': 2}]}, headers=headers)
+    client.put('/api/products/1', json={'price': '19.90'}, headers=headers)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--days', type=int, default=7)
+    parser.add_argument('--orders-per-day', type=int, default=300)
+    parser.add_argument('--users', type=int, default=500)
+    parser.add_argument('--changes', type=int, default=10)
+    parser.add_argument('--runs', type=int, default=20)
+    args = parser.parse_args()
+
+    app = load_app(f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='bench_sync_'), 'bench.db')}",
+                   SYNC_SETTLE_SECONDS=0)
+    from bench.seed import seed
+    dataset = seed(app, users=args.users, days=args.days, orders_per_day=args.orders_per_day)
+    headers = admin_headers(app)
+    client = app.test_client()
+
+    cursor = client.get('/api/sync', headers=headers).get_json()['cursor']
+    _apply_changes(client, headers, args.changes)
+    reload = _download(client, RELOAD, headers, args.runs)
+    delta = _download(client, [f'/api/sync?since={cursor}'], headers, args.runs)
+    full = _download(client, ['/api/sync'], headers, args.runs)
+    print(json.dumps({
+        'meta': {**run_metadata(), 'dataset': dataset, 'runs': args.runs, 'changes': args.changes},
+        'reload': reload,
+        'sync_full': full,
+        'sync_delta': delta,
+        'bytes_ratio': round(delta['bytes'] / reload['bytes'], 4),
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
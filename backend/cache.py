@@ -0,0 +1,121 @@
+"""Caché en proceso para respuestas JSON públicas (catálogo) y carritos.
+
+Cada entrada guarda el cuerpo ya serializado y su ETag. Las rutas de escritura
+invalidan explícitamente las claves afectadas; el TTL (``PUBLIC_CACHE_TTL``)
+solo acota cuánto puede tardar otro worker de gunicorn, que no recibe esa
+invalidación, en ver el cambio.
+"""
+from collections import OrderedDict
+import hashlib
+import threading
+import time
+
+from flask import current_app, request
+
+
+class ResponseCache:
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+        # Cada invalidación la incrementa: un cuerpo armado antes de ella no se guarda
+        self._generation = 0
+
+    def get_or_build(self, key: str, builder, ttl: float):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            generation = self._generation
+        if entry and entry[2] > now:
+            return entry[0], entry[1]
+        body = current_app.json.dumps(builder())
+        etag = body_etag(body)
+        with self._lock:
+            # Si se invalidó mientras se armaba, el cuerpo puede ser anterior al cambio: se sirve sin guardarlo
+            if generation == self._generation:
+                self._entries[key] = (body, etag, now + ttl)
+        return body, etag
+
+    def invalidate(self, *prefixes: str):
+        """Elimina las entradas cuya clave empieza por alguno de los prefijos."""
+        with self._lock:
+            self._generation += 1
+            for key in [k for k in self._entries if k.startswith(prefixes)]:
+                del self._entries[key]
+
+
+response_cache = ResponseCache()
+
+
+class SnapshotCache:
+    """Snapshots por clave (p. ej. el carrito de cada usuario) ligados a una versión.
+
+    Una entrada solo sirve mientras la versión pedida coincida con la guardada;
+    la versión vive en la base, así que un cambio hecho en otro worker también
+    la invalida. El TTL acota datos que no forman parte de la versión (precios
+    del catálogo). LRU con ``max_entries`` como máximo.
+    """
+
+    def __init__(self, max_entries: int = 10_000):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.max_entries = max_entries
+
+    def get(self, key, version):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if not entry or entry[0] != version or entry[3] <= now:
+                return None
+            self._entries.move_to_end(key)
+            return entry[1], entry[2]
+
+    def put(self, key, version, data, ttl: float):
+        """Serializa ``data`` y la guarda; devuelve ``(body, etag)``."""
+        body = current_app.json.dumps(data)
+        etag = body_etag(body)
+        with self._lock:
+            self._entries[key] = (version, body, etag, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return body, etag
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+cart_cache = SnapshotCache()
+
+
+def cached_json_response(key: str, builder):
+    """Respuesta JSON cacheada con ETag fuerte y soporte de ``If-None-Match``."""
+    ttl = current_app.config.get('PUBLIC_CACHE_TTL', 10)
+    body, etag = response_cache.get_or_build(key, builder, ttl)
+    # El navegador puede guardar la respuesta pero debe revalidarla siempre;
+    # la revalidación se resuelve con un 304 sin tocar la base de datos.
+    return etag_json_response(body, etag)
+
+
+def body_etag(body: str) -> str:
+    return hashlib.sha256(body.encode()).hexdigest()[:32]
+
+
+def etag_json_response(body: str, etag: str, cache_control: str = 'public, no-cache', status: int = 200):
+    """Respuesta con un cuerpo JSON ya serializado; 304 si coincide ``If-None-Match``.
+
+    La comparación es débil: si la respuesta salió comprimida su ETag vuelve como ``W/"..."``.
+    """
+    if status == 200 and request.if_none_match.contains_weak(etag):
+        response = current_app.response_class(status=304)
+    else:
+        response = current_app.response_class(body, status=status, mimetype='application/json')
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = cache_control
+    return response
+
+
+def invalidate_catalog():
+    """Invalida el catálogo y los carritos, que incluyen datos de los productos."""
+    response_cache.invalidate('products')
+    cart_cache.clear()
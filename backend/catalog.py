@@ -0,0 +1,117 @@
+"""Catálogo versionado de productos.
+
+Cada edición de un producto guarda una ``ProductVersion`` inmutable (nombre,
+descripción, precio e imagen) y los pedidos apuntan a la versión con la que se
+compraron, así que el historial nunca depende de filas que se editan después.
+Borrar un producto solo lo marca con ``deleted_at``.
+
+``CatalogState.version`` se incrementa con cada cambio del catálogo. Cada
+proceso guarda una instantánea en memoria de los productos vigentes ligada a
+esa versión: leerla cuesta una consulta por clave primaria y, mientras la
+versión no cambie, checkout y listados no vuelven a consultar precios. Como la
+versión vive en la base, un cambio hecho en otro worker de gunicorn invalida
+la instantánea en cuanto se lee la nueva versión.
+"""
+from collections import namedtuple
+from datetime import datetime
+import threading
+
+from flask import current_app
+from sqlalchemy import and_, select, update
+
+from models import db, CatalogState, Product, ProductVersion
+
+CATALOG_STATE_ID = 1
+VERSIONED_FIELDS = ('name', 'description', 'price', 'image_url')
+
+CatalogProduct = namedtuple('CatalogProduct', 'id version_id name description price image_url created_at')
+
+
+class CatalogSnapshot:
+    def __init__(self, version: int, products: dict):
+        self.version = version
+        self.products = products
+
+    def get(self, product_id):
+        return self.products.get(product_id)
+
+    def by_newest(self):
+        return sorted(self.products.values(), key=lambda p: (p.created_at or datetime.min, p.id), reverse=True)
+
+
+def catalog_version_subquery():
+    """La versión como subconsulta escalar, para leerla junto a otra consulta."""
+    return select(CatalogState.version).where(CatalogState.id == CATALOG_STATE_ID).scalar_subquery()
+
+
+def current_catalog_version() -> int:
+    return db.session.query(CatalogState.version).filter_by(id=CATALOG_STATE_ID).scalar() or 0
+
+
+def bump_catalog_version():
+    """Incrementa la versión del catálogo (sin commit)."""
+    result = db.session.execute(
+        update(CatalogState).where(CatalogState.id == CATALOG_STATE_ID)
+        .values(version=CatalogState.version + 1),
+        execution_options={'synchronize_session': False},
+    )
+    if result.rowcount == 0:
+        # Base creada con create_all (desarrollo, benchmarks): la fila aún no existe
+        db.session.add(CatalogState(id=CATALOG_STATE_ID, version=1))
+        db.session.flush()
+
+
+def _load_snapshot(version: int) -> CatalogSnapshot:
+    rows = (db.session.query(Product.id, ProductVersion.id, Product.name, Product.description, Product.price,
+                             Product.image_url, Product.created_at)
+            .outerjoin(ProductVersion, and_(ProductVersion.product_id == Product.id,
+                                            ProductVersion.version == Product.version))
+            .filter(Product.deleted_at.is_(None))
+            .all())
+    return CatalogSnapshot(version, {row[0]: CatalogProduct(*row) for row in rows})
+
+
+_snapshot_lock = threading.Lock()
+
+
+def get_catalog(app=None, version: int = None) -> CatalogSnapshot:
+    """Instantánea del catálogo vigente en la versión actual de la base.
+
+    ``version`` evita releerla si quien llama ya la obtuvo en esta transacción.
+    """
+    app = app or current_app._get_current_object()
+    if version is None:
+        version = current_catalog_version()
+    snapshot = app.extensions.get('catalog_snapshot')
+    if snapshot is not None and snapshot.version == version:
+        return snapshot
+    with _snapshot_lock:
+        snapshot = app.extensions.get('catalog_snapshot')
+        if snapshot is None or snapshot.version != version:
+            snapshot = _load_snapshot(version)
+            app.extensions['catalog_snapshot'] = snapshot
+    return snapshot
+
+
+def record_version(product: Product) -> ProductVersion:
+    """Guarda los campos actuales de ``product`` como su siguiente versión (sin commit)."""
+    product.version = (product.version or 0) + 1
+    product_version = ProductVersion(product=product, version=product.version,
+                                     **{field: getattr(product, field) for field in VERSIONED_FIELDS})
+    db.session.add(product_version)
+    bump_catalog_version()
+    return product_version
+
+
+def add_product(**fields) -> Product:
+    """Crea un producto con su primera versión (sin commit)."""
+    product = Product(version=0, **fields)
+    db.session.add(product)
+    record_version(product)
+    db.session.flush()
+    return product
+
+
+def soft_delete_product(product: Product):
+    product.deleted_at = datetime.utcnow()
+    bump_catalog_version()
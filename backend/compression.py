@@ -0,0 +1,89 @@
+"""Compresión gzip/brotli de respuestas grandes según ``Accept-Encoding``.
+
+Se comprimen las respuestas de texto (JSON, CSV...) de al menos
+``COMPRESS_MIN_BYTES``. Brotli se usa si el paquete ``brotli`` está instalado
+y el cliente lo acepta; si no, gzip. Las respuestas en streaming (SSE,
+exportaciones) no se tocan: comprimirlas obligaría a acumularlas enteras.
+
+Las respuestas con ETag (catálogo, menús, carritos) suelen repetirse
+idénticas: su versión comprimida se guarda por ``(etag, codificación)`` y las
+siguientes peticiones no vuelven a comprimir. El ETag pasa a débil, porque
+los bytes dependen de la codificación, y las revalidaciones (``If-None-Match``)
+ya comparan en débil.
+"""
+from collections import OrderedDict
+import gzip
+import threading
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_TYPES = ('application/json', 'application/x-ndjson', 'text/')
+
+
+class CompressedBodies:
+    """LRU de cuerpos comprimidos por ``(etag, codificación)``."""
+
+    def __init__(self, max_entries: int = 256):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.max_entries = max_entries
+
+    def get_or_compress(self, key, compress, data: bytes) -> bytes:
+        with self._lock:
+            body = self._entries.get(key)
+            if body is not None:
+                self._entries.move_to_end(key)
+                return body
+        body = compress(data)
+        with self._lock:
+            self._entries[key] = body
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return body
+
+
+def _encoders(app) -> dict:
+    level = app.config.get('COMPRESS_LEVEL', 6)
+    encoders = {'gzip': lambda data: gzip.compress(data, compresslevel=level, mtime=0)}
+    if brotli is not None:
+        encoders['br'] = lambda data: brotli.compress(data, quality=app.config.get('COMPRESS_BR_QUALITY', 4))
+    return encoders
+
+
+def init_compression(app):
+    if not app.config.get('COMPRESS_ENABLED', True):
+        return
+    encoders = _encoders(app)
+    # Preferencia del servidor ante empate de calidades: brotli comprime más a igual CPU
+    preference = [name for name in ('br', 'gzip') if name in encoders]
+    min_bytes = app.config.get('COMPRESS_MIN_BYTES', 1024)
+    cache = CompressedBodies()
+    app.extensions['compressed_bodies'] = cache
+
+    @app.after_request
+    def compress_response(response):
+        if (response.direct_passthrough or response.is_streamed or response.status_code != 200
+                or 'Content-Encoding' in response.headers
+                or not (response.mimetype or '').startswith(COMPRESSIBLE_TYPES)):
+            return response
+        response.vary.add('Accept-Encoding')
+        encoding = request.accept_encodings.best_match(preference)
+        if encoding is None:
+            return response
+        data = response.get_data()
+        if len(data) < min_bytes:
+            return response
+        etag, _ = response.get_etag()
+        if etag:
+            body = cache.get_or_compress((etag, encoding), encoders[encoding], data)
+            response.set_etag(etag, weak=True)
+        else:
+            body = encoders[encoding](data)
+        response.set_data(body)
+        response.headers['Content-Encoding'] = encoding
+        return response
@@ -0,0 +1,104 @@
+"""Perfiles del engine de SQLAlchemy según la base de datos (``DB_PROFILE``).
+
+- ``sqlite``: en cada conexión nueva activa WAL (los lectores no bloquean al
+  escritor), ``synchronous=NORMAL``, ``busy_timeout`` para esperar el lock en
+  lugar de fallar con "database is locked" y E/S con ``mmap``.
+- ``mysql``: pool dimensionado (``DB_POOL_SIZE`` + ``DB_MAX_OVERFLOW``),
+  reciclado antes del ``wait_timeout`` del servidor y ping solo cuando la
+  conexión estuvo ociosa más de ``DB_IDLE_PING_SECONDS``, en lugar de un
+  ``SELECT 1`` extra en cada checkout como hace ``pool_pre_ping``.
+- ``default``: opciones de SQLAlchemy con ``pool_pre_ping`` (comportamiento
+  anterior).
+
+``auto`` (por defecto) elige el perfil por el esquema de la URL de conexión.
+"""
+import time
+
+from sqlalchemy import event, exc
+from sqlalchemy.engine import make_url
+
+PROFILES = ('auto', 'sqlite', 'mysql', 'default')
+
+
+def resolve_profile(config) -> str:
+    profile = config.get('DB_PROFILE') or 'auto'
+    if profile not in PROFILES:
+        raise ValueError(f"DB_PROFILE desconocido: {profile!r} (opciones: {', '.join(PROFILES)})")
+    if profile != 'auto':
+        return profile
+    backend = make_url(config['SQLALCHEMY_DATABASE_URI']).get_backend_name()
+    if backend == 'sqlite':
+        return 'sqlite'
+    if backend in ('mysql', 'mariadb'):
+        return 'mysql'
+    return 'default'
+
+
+def engine_options(profile: str, config) -> dict:
+    if profile == 'sqlite':
+        # El timeout del driver es el mismo busy timeout, en segundos
+        return {'connect_args': {'timeout': config.get('SQLITE_BUSY_TIMEOUT_MS', 5000) / 1000}}
+    if profile == 'mysql':
+        return {
+            'pool_size': config.get('DB_POOL_SIZE', 10),
+            'max_overflow': config.get('DB_MAX_OVERFLOW', 10),
+            'pool_timeout': config.get('DB_POOL_TIMEOUT', 30),
+            'pool_recycle': config.get('DB_POOL_RECYCLE', 280),
+            # LIFO reutiliza las conexiones recientes y deja que las sobrantes envejezcan y se reciclen
+            'pool_use_lifo': True,
+        }
+    return {'pool_pre_ping': True}
+
+
+def _install_sqlite_pragmas(engine, config):
+    busy_timeout = int(config.get('SQLITE_BUSY_TIMEOUT_MS', 5000))
+    mmap_size = int(config.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))
+
+    @event.listens_for(engine, 'connect')
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        # busy_timeout primero: cambiar a WAL también necesita el lock
+        cursor.execute(f'PRAGMA busy_timeout={busy_timeout}')
+        cursor.execute('PRAGMA journal_mode=WAL')
+        cursor.execute('PRAGMA synchronous=NORMAL')
+        cursor.execute(f'PRAGMA mmap_size={mmap_size}')
+        cursor.execute('PRAGMA temp_store=MEMORY')
+        cursor.close()
+
+
+def _install_idle_ping(engine, config):
+    idle_seconds = float(config.get('DB_IDLE_PING_SECONDS', 30))
+
+    @event.listens_for(engine, 'checkin')
+    def mark_idle(dbapi_connection, connection_record):
+        connection_record.info['idle_since'] = time.monotonic()
+
+    @event.listens_for(engine, 'checkout')
+    def ping_if_idle(dbapi_connection, connection_record, connection_proxy):
+        idle_since = connection_record.info.get('idle_since')
+        if idle_since is None or time.monotonic() - idle_since < idle_seconds:
+            return
+        try:
+            cursor = dbapi_connection.cursor()
+            cursor.execute('SELECT 1')
+            cursor.close()
+        except Exception as error:
+            # El pool descarta la conexión y reintenta el checkout con una nueva
+            raise exc.DisconnectionError() from error
+
+
+def configure_engine_options(app) -> str:
+    """Resuelve el perfil y fija ``SQLALCHEMY_ENGINE_OPTIONS`` salvo que ya vengan en la config."""
+    profile = resolve_profile(app.config)
+    app.config['DB_PROFILE'] = profile
+    app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', engine_options(profile, app.config))
+    return profile
+
+
+def install_engine_events(app, engine):
+    """Registra los eventos del perfil en el engine ya creado por ``db.init_app``."""
+    profile = app.config['DB_PROFILE']
+    if profile == 'sqlite':
+        _install_sqlite_pragmas(engine, app.config)
+    elif profile == 'mysql':
+        _install_idle_ping(engine, app.config)
@@ -0,0 +1,145 @@
+"""Pub/sub de eventos de pedidos para la pantalla de cocina (SSE).
+
+Dos brokers intercambiables, elegidos con ``EVENTS_BROKER``:
+
+- ``memory`` (por defecto): en proceso; suficiente con un único worker.
+- ``spool``: un archivo SQLite local (``EVENTS_SPOOL_PATH``) compartido por
+  todos los workers de gunicorn del mismo host, como sustituto de un broker
+  externo. Los ids son globales, así que ``Last-Event-ID`` funciona aunque la
+  reconexión caiga en otro worker.
+
+Ambos guardan los últimos ``EVENTS_BACKLOG`` eventos para poder reanudar.
+"""
+from collections import deque
+from contextlib import contextmanager
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from flask import current_app
+
+
+class MemoryBroker:
+    def __init__(self, backlog: int = 1000):
+        self._events = deque(maxlen=backlog)
+        self._cond = threading.Condition()
+        self._last_id = 0
+
+    def publish(self, event_type: str, data: dict) -> int:
+        with self._cond:
+            self._last_id += 1
+            self._events.append({'id': self._last_id, 'type': event_type, 'data': json.dumps(data, default=str)})
+            self._cond.notify_all()
+            return self._last_id
+
+    def last_id(self) -> int:
+        with self._cond:
+            return self._last_id
+
+    def oldest_id(self) -> int:
+        with self._cond:
+            return self._events[0]['id'] if self._events else self._last_id + 1
+
+    def read_since(self, last_id: int, timeout: float) -> list:
+        """Eventos con id > last_id; espera hasta ``timeout`` segundos si no hay ninguno."""
+        with self._cond:
+            self._cond.wait_for(lambda: self._last_id > last_id, timeout=timeout)
+            return [e for e in self._events if e['id'] > last_id]
+
+
+class SpoolBroker:
+    def __init__(self, path: str, backlog: int = 1000, poll_interval: float = 0.5):
+        self.path = path
+        self.backlog = backlog
+        self.poll_interval = poll_interval
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS events ('
+                'id INTEGER PRIMARY KEY AUTOINCREMENT, type TEXT NOT NULL, data TEXT NOT NULL)'
+            )
+
+    @contextmanager
+    def _connect(self):
+        # Una conexión por llamada: sqlite3 no comparte conexiones entre hilos
+        conn = sqlite3.connect(self.path, timeout=5)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def publish(self, event_type: str, data: dict) -> int:
+        with self._connect() as conn:
+            event_id = conn.execute(
+                'INSERT INTO events (type, data) VALUES (?, ?)',
+                (event_type, json.dumps(data, default=str)),
+            ).lastrowid
+            conn.execute('DELETE FROM events WHERE id <= ?', (event_id - self.backlog,))
+            return event_id
+
+    def last_id(self) -> int:
+        # La poda nunca borra el último evento, así que MAX(id) es el último publicado
+        with self._connect() as conn:
+            return conn.execute('SELECT COALESCE(MAX(id), 0) FROM events').fetchone()[0]
+
+    def oldest_id(self) -> int:
+        with self._connect() as conn:
+            row = conn.execute('SELECT MIN(id) FROM events').fetchone()
+        return row[0] if row[0] is not None else self.last_id() + 1
+
+    def read_since(self, last_id: int, timeout: float) -> list:
+        deadline = time.monotonic() + timeout
+        while True:
+            with self._connect() as conn:
+                rows = conn.execute(
+                    'SELECT id, type, data FROM events WHERE id > ? ORDER BY id', (last_id,)
+                ).fetchall()
+            if rows or time.monotonic() >= deadline:
+                return [{'id': r[0], 'type': r[1], 'data': r[2]} for r in rows]
+            time.sleep(self.poll_interval)
+
+
+_broker_lock = threading.Lock()
+
+
+def get_broker(app=None):
+    """Broker de la aplicación, creado de forma perezosa en cada proceso."""
+    app = app or current_app._get_current_object()
+    with _broker_lock:
+        broker = app.extensions.get('order_events')
+        if broker is None:
+            backlog = app.config.get('EVENTS_BACKLOG', 1000)
+            if app.config.get('EVENTS_BROKER') == 'spool':
+                path = app.config.get('EVENTS_SPOOL_PATH') or os.path.join(app.instance_path, 'events.db')
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                broker = SpoolBroker(path, backlog=backlog)
+            else:
+                broker = MemoryBroker(backlog=backlog)
+            app.extensions['order_events'] = broker
+        return broker
+
+
+def order_event_data(order, status: str = 'pendiente') -> dict:
+    """Datos del evento de un pedido. Tomados antes del commit, no hace falta recargar el pedido después."""
+    return {
+        'order_id': order.id,
+        'user_id': order.user_id,
+        'status': status,
+        'total': float(order.total),
+        'created_at': order.created_at.isoformat() if order.created_at else None,
+    }
+
+
+def publish_order_event(event_type: str, order, status: str = 'pendiente'):
+    """Publica un evento de pedido. Llamar solo después del commit."""
+    get_broker().publish(event_type, order_event_data(order, status))
+
+
+def publish_order_events(event_type: str, events):
+    """Publica eventos ya armados con ``order_event_data``. Llamar solo después del commit."""
+    broker = get_broker()
+    for data in events:
+        broker.publish(event_type, data)
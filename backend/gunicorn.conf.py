@@ -0,0 +1,44 @@
+# Configuración de gunicorn; se carga sola al arrancar desde backend/ (`gunicorn app:app`).
+import gc
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+workers = int(os.environ.get('WEB_CONCURRENCY', '2'))
+# Hilos por worker: el stream SSE de pedidos mantiene conexiones abiertas
+threads = int(os.environ.get('GUNICORN_THREADS', '8'))
+worker_class = 'gthread'
+
+# Los eventos de cocina (SSE) tienen que verse desde todos los workers: con más
+# de uno, el broker por defecto es el spool compartido. Este archivo se lee antes
+# de importar la app, así que la configuración ya lo recibe.
+os.environ.setdefault('EVENTS_BROKER', 'spool' if workers > 1 else 'memory')
+if os.environ['EVENTS_BROKER'] == 'memory' and workers > 1:
+    raise RuntimeError(f'EVENTS_BROKER=memory no reparte eventos entre los {workers} workers; '
+                       'usa EVENTS_BROKER=spool o WEB_CONCURRENCY=1')
+
+# La app se importa una sola vez en el proceso maestro y los workers la
+# heredan con fork (copy-on-write): arrancan más rápido y comparten memoria.
+preload_app = os.environ.get('GUNICORN_PRELOAD', '1') == '1'
+
+
+def when_ready(server):
+    # Se llama tras precargar la app y antes de crear los workers. Congelar los
+    # objetos ya creados evita que el recolector de ciclos los toque (y con ello
+    # copie sus páginas) en cada worker.
+    if preload_app:
+        # El índice de búsqueda se construye una vez aquí y los workers lo heredan
+        from app import app
+        from search import warm_search_index
+
+        warm_search_index(app)
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    # Las conexiones abiertas en el maestro no pueden compartirse entre procesos:
+    # cada worker descarta el pool heredado (sin cerrarlo) y abre el suyo.
+    from app import app
+    from models import db
+
+    with app.app_context():
+        db.engine.dispose(close=False)
@@ -0,0 +1,119 @@
+"""Pipeline de imágenes subidas por el admin.
+
+El original se guarda con un nombre derivado del hash de su contenido, de modo
+que una URL nunca cambia de contenido y puede cachearse para siempre. Las
+variantes redimensionadas (JPEG y WebP en varios anchos) se generan en un hilo
+de fondo para no bloquear la petición del admin; mientras no existen, la ruta
+estática sirve el original.
+"""
+from concurrent.futures import ThreadPoolExecutor
+import glob
+import hashlib
+import logging
+import os
+import re
+import threading
+
+from werkzeug.utils import secure_filename
+
+logger = logging.getLogger(__name__)
+
+VARIANT_WIDTHS = (320, 640, 1024)
+VARIANT_FORMATS = ('webp', 'jpg')
+ALLOWED_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.webp', '.gif'}
+
+_HASHED_NAME = re.compile(r'^(?P<digest>[0-9a-f]{16})(?:_w(?P<width>\d+))?\.(?:jpe?g|png|webp|gif)$')
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    # Creación perezosa: con gunicorn --preload cada worker crea su propio hilo tras el fork
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='image-variants')
+        return _executor
+
+
+def save_upload(file, folder: str) -> str:
+    """Guarda el archivo con nombre por hash, encola sus variantes y devuelve su URL."""
+    ext = os.path.splitext(secure_filename(file.filename))[1].lower()
+    if ext not in ALLOWED_EXTENSIONS:
+        ext = '.jpg'
+    data = file.read()
+    digest = hashlib.sha256(data).hexdigest()[:16]
+    filename = f"{digest}{ext}"
+    path = os.path.join(folder, filename)
+    os.makedirs(folder, exist_ok=True)
+    if not os.path.exists(path):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as fh:
+            fh.write(data)
+        os.replace(tmp_path, path)
+    _get_executor().submit(generate_variants, path, folder, digest)
+    return f"/uploads/{filename}"
+
+
+def variant_name(digest: str, width: int, fmt: str) -> str:
+    return f"{digest}_w{width}.{fmt}"
+
+
+def generate_variants(path: str, folder: str, digest: str):
+    try:
+        from PIL import Image, ImageOps
+    except ImportError:
+        logger.warning('Pillow no está instalado; no se generan variantes de %s', path)
+        return
+    try:
+        with Image.open(path) as source:
+            source = ImageOps.exif_transpose(source)
+            if source.mode not in ('RGB', 'RGBA'):
+                source = source.convert('RGBA' if 'transparency' in source.info else 'RGB')
+            for width in VARIANT_WIDTHS:
+                resized = source.copy()
+                # Nunca se amplía: las imágenes pequeñas conservan su tamaño
+                resized.thumbnail((width, width * 4))
+                for fmt in VARIANT_FORMATS:
+                    target = os.path.join(folder, variant_name(digest, width, fmt))
+                    if os.path.exists(target):
+                        continue
+                    tmp_target = f"{target}.tmp"
+                    if fmt == 'jpg':
+                        resized.convert('RGB').save(tmp_target, 'JPEG', quality=80, optimize=True, progressive=True)
+                    else:
+                        resized.save(tmp_target, 'WEBP', quality=75, method=4)
+                    os.replace(tmp_target, target)
+    except Exception:
+        logger.exception('No se pudieron generar las variantes de %s', path)
+
+
+def is_immutable_name(filename: str) -> bool:
+    """True si el nombre deriva del hash del contenido (original o variante)."""
+    return bool(_HASHED_NAME.match(filename))
+
+
+def original_for(folder: str, filename: str):
+    """Nombre del original de una variante, si existe en disco."""
+    match = _HASHED_NAME.match(filename)
+    if not match:
+        return None
+    for candidate in glob.glob(os.path.join(folder, f"{match.group('digest')}.*")):
+        if not candidate.endswith('.tmp'):
+            return os.path.basename(candidate)
+    return None
+
+
+def variant_urls(image_url):
+    """URLs de las variantes por formato y ancho, o None si la imagen no es un upload con hash."""
+    if not image_url or not image_url.startswith('/uploads/'):
+        return None
+    match = _HASHED_NAME.match(image_url[len('/uploads/'):])
+    if not match or match.group('width'):
+        return None
+    digest = match.group('digest')
+    return {
+        fmt: {str(width): f"/uploads/{variant_name(digest, width, fmt)}" for width in VARIANT_WIDTHS}
+        for fmt in VARIANT_FORMATS
+    }
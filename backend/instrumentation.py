@@ -0,0 +1,192 @@
+"""Instrumentación opcional por petición (``INSTRUMENTATION_ENABLED=1``).
+
+Registra por petición el tiempo total, el número de sentencias SQL y el tiempo
+en base de datos (eventos del engine de SQLAlchemy), los expone en la cabecera
+``Server-Timing`` y los acumula en histogramas por endpoint que se leen en
+formato Prometheus desde ``/api/admin/metrics``. Las sentencias más lentas que
+``SLOW_QUERY_MS`` se registran con su texto.
+
+Con ``PROFILING_ENABLED=1``, un admin puede enviar ``X-Profile: 1`` para
+capturar esa petición con cProfile; el archivo ``.prof`` queda en
+``PROFILE_DIR`` y su nombre vuelve en ``X-Profile-File``.
+
+Las métricas son por proceso: con varios workers de gunicorn cada uno expone
+las suyas.
+"""
+import cProfile
+import io
+import logging
+import os
+import pstats
+import threading
+import time
+from collections import defaultdict
+
+from flask import Response, current_app, g, has_request_context, request
+from flask_jwt_extended import get_jwt, verify_jwt_in_request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from auth import admin_required
+
+logger = logging.getLogger(__name__)
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+        self.total += 1
+        self.sum += value
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.durations = defaultdict(lambda: Histogram(DURATION_BUCKETS))
+        self.db_durations = defaultdict(lambda: Histogram(DURATION_BUCKETS))
+        self.queries = defaultdict(lambda: Histogram(QUERY_BUCKETS))
+        self.requests = defaultdict(int)
+
+    def observe(self, endpoint: str, method: str, status: int, duration: float, db_time: float, queries: int):
+        key = (endpoint, method)
+        with self._lock:
+            self.durations[key].observe(duration)
+            self.db_durations[key].observe(db_time)
+            self.queries[key].observe(queries)
+            self.requests[(endpoint, method, str(status))] += 1
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            self._render_histograms(lines, 'http_request_duration_seconds',
+                                    'Tiempo total de la petición.', self.durations)
+            self._render_histograms(lines, 'http_request_db_seconds',
+                                    'Tiempo en base de datos por petición.', self.db_durations)
+            self._render_histograms(lines, 'http_request_sql_queries',
+                                    'Sentencias SQL por petición.', self.queries)
+            lines.append('# HELP http_requests_total Peticiones atendidas.')
+            lines.append('# TYPE http_requests_total counter')
+            for (endpoint, method, status), count in sorted(self.requests.items()):
+                lines.append(f'http_requests_total{{endpoint="{endpoint}",method="{method}",status="{status}"}} {count}')
+        return '\n'.join(lines) + '\n'
+
+    @staticmethod
+    def _render_histograms(lines, name, help_text, histograms):
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} histogram')
+        for (endpoint, method), hist in sorted(histograms.items()):
+            labels = f'endpoint="{endpoint}",method="{method}"'
+            for bound, count in zip(hist.buckets, hist.counts):
+                lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {count}')
+            lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {hist.total}')
+            lines.append(f'{name}_sum{{{labels}}} {hist.sum:.6f}')
+            lines.append(f'{name}_count{{{labels}}} {hist.total}')
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context() and 'sql_count' in g:
+        conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if not (has_request_context() and 'sql_count' in g):
+        return
+    starts = conn.info.get('query_start')
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    g.sql_count += 1
+    g.sql_time += elapsed
+    if elapsed * 1000 >= current_app.config.get('SLOW_QUERY_MS', 100):
+        logger.warning('Consulta lenta (%.1f ms) en %s %s: %s', elapsed * 1000,
+                       request.method, request.path, ' '.join(statement.split()))
+
+
+def _handle_error(context):
+    # La sentencia falló: sin after_cursor_execute, su inicio quedaría emparejado con la siguiente
+    if not (has_request_context() and 'sql_count' in g) or context.connection is None:
+        return
+    starts = context.connection.info.get('query_start')
+    if starts:
+        starts.pop()
+
+
+def _start_request():
+    g.request_start = time.perf_counter()
+    g.sql_count = 0
+    g.sql_time = 0.0
+    if current_app.config.get('PROFILING_ENABLED') and request.headers.get('X-Profile') == '1':
+        try:
+            verify_jwt_in_request(optional=True)
+            is_admin = bool(get_jwt().get('is_admin'))
+        except Exception:
+            is_admin = False
+        if is_admin:
+            g.profiler = cProfile.Profile()
+            g.profiler.enable()
+
+
+def _finish_request(response):
+    if 'request_start' not in g:
+        return response
+    duration = time.perf_counter() - g.request_start
+    endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+    current_app.extensions['instrumentation'].observe(
+        endpoint, request.method, response.status_code, duration, g.sql_time, g.sql_count)
+    response.headers['Server-Timing'] = (
+        f'db;dur={g.sql_time * 1000:.1f};desc="{g.sql_count} queries", total;dur={duration * 1000:.1f}'
+    )
+    profiler = g.pop('profiler', None)
+    if profiler:
+        profiler.disable()
+        response.headers['X-Profile-File'] = _save_profile(profiler)
+    return response
+
+
+def _save_profile(profiler) -> str:
+    directory = current_app.config.get('PROFILE_DIR') or os.path.join(current_app.instance_path, 'profiles')
+    os.makedirs(directory, exist_ok=True)
+    safe_path = request.path.strip('/').replace('/', '_') or 'root'
+    filename = f"{int(time.time() * 1000)}_{request.method}_{safe_path}.prof"
+    profiler.dump_stats(os.path.join(directory, filename))
+    summary = io.StringIO()
+    pstats.Stats(profiler, stream=summary).sort_stats('cumulative').print_stats(20)
+    logger.info('Perfil de %s %s guardado en %s\n%s', request.method, request.path, filename, summary.getvalue())
+    return filename
+
+
+@admin_required()
+def metrics():
+    registry = current_app.extensions['instrumentation']
+    return Response(registry.render(), mimetype='text/plain; version=0.0.4')
+
+
+_engine_events_installed = False
+
+
+def init_instrumentation(app):
+    """Activa la instrumentación si ``INSTRUMENTATION_ENABLED`` está en la config."""
+    global _engine_events_installed
+    if not app.config.get('INSTRUMENTATION_ENABLED'):
+        return
+    app.extensions['instrumentation'] = MetricsRegistry()
+    if not _engine_events_installed:
+        # Escucha a nivel de clase: el engine de Flask-SQLAlchemy se crea de forma perezosa
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+        event.listen(Engine, 'handle_error', _handle_error)
+        _engine_events_installed = True
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+    app.add_url_rule('/api/admin/metrics', 'metrics', metrics)
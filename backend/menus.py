@@ -0,0 +1,151 @@
+"""Menús por fecha y sus snapshots serializados.
+
+Cada escritura de un menú (un producto, un rango, una copia o una plantilla)
+vuelve a serializar en la misma transacción el menú de las fechas afectadas y
+lo guarda en ``DailyMenuSnapshot`` con su ETag. La lectura pública es una
+consulta por clave primaria que devuelve el JSON ya armado; el cambio de día
+a medianoche (hora local, ``BUSINESS_TIMEZONE``) es solo leer otra clave.
+
+Un snapshot guarda la versión del catálogo con la que se armó. Si después se
+edita o borra un producto, o la fecha nunca se escribió, la lectura arma el
+menú en memoria (``menu_cache``, por versión del catálogo) sin guardarlo: solo
+las escrituras y ``flask menu build-snapshots`` escriben en la tabla, así que
+una lectura pública nunca toma un bloqueo de escritura ni crea filas.
+"""
+from datetime import date, datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import insert
+
+from cache import SnapshotCache, body_etag
+from catalog import catalog_version_subquery, get_catalog
+from models import db, DailyMenuItem, DailyMenuSnapshot
+from serializers import serialize_product
+from sync import MENU, record_changes
+from timeutils import business_now
+from upsert import upsert_set
+
+MAX_MENU_DAYS = 62
+MAX_MENU_PRODUCTS = 100
+
+
+def business_today() -> date:
+    return business_now().date()
+
+
+def parse_day(value, name: str) -> date:
+    try:
+        return date.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise ValueError(f'{name} debe tener formato YYYY-MM-DD')
+
+
+def days_between(start: date, end: date) -> list:
+    """Fechas de ``start`` a ``end`` inclusive; ``ValueError`` si el rango es inválido o muy largo."""
+    if end < start:
+        raise ValueError('to no puede ser anterior a from')
+    count = (end - start).days + 1
+    if count > MAX_MENU_DAYS:
+        raise ValueError(f'Máximo {MAX_MENU_DAYS} días por petición')
+    return [start + timedelta(days=offset) for offset in range(count)]
+
+
+def validate_products(product_ids) -> list:
+    """Ids de productos vigentes, sin duplicados y en el orden recibido."""
+    if not isinstance(product_ids, list):
+        raise ValueError('Se espera una lista de product_id')
+    try:
+        ids = list(dict.fromkeys(int(pid) for pid in product_ids))
+    except (TypeError, ValueError):
+        raise ValueError('product_id inválido')
+    if len(ids) > MAX_MENU_PRODUCTS:
+        raise ValueError(f'Máximo {MAX_MENU_PRODUCTS} productos por día')
+    catalog = get_catalog()
+    missing = [pid for pid in ids if not catalog.get(pid)]
+    if missing:
+        raise ValueError(f'Producto {missing[0]} no existe')
+    return ids
+
+
+# Menús sin snapshot vigente ya armados en este proceso: ``fecha -> (body, etag)`` por versión del catálogo
+menu_cache = SnapshotCache(max_entries=512)
+
+
+def _products_by_day(dates) -> dict:
+    per_day = {day: [] for day in dates}
+    for day, product_id in (db.session.query(DailyMenuItem.date, DailyMenuItem.product_id)
+                            .filter(DailyMenuItem.date.in_(dates))
+                            .order_by(DailyMenuItem.date, DailyMenuItem.id)):
+        per_day[day].append(product_id)
+    return per_day
+
+
+def _serialize_menu(product_ids, catalog) -> list:
+    return [serialize_product(catalog.get(pid)) for pid in product_ids if catalog.get(pid)]
+
+
+def build_snapshots(dates) -> dict:
+    """Serializa y guarda el menú de cada fecha (sin commit); devuelve ``{fecha: (body, etag)}``."""
+    dates = list(dates)
+    catalog = get_catalog()
+    built_at = datetime.utcnow()
+    result = {}
+    for day, product_ids in _products_by_day(dates).items():
+        body = current_app.json.dumps(_serialize_menu(product_ids, catalog))
+        etag = body_etag(body)
+        upsert_set(DailyMenuSnapshot, keys={'date': day}, values={
+            'body': body, 'etag': etag, 'catalog_version': catalog.version, 'built_at': built_at,
+        })
+        result[day] = (body, etag)
+    return result
+
+
+def get_snapshots(start: date, end: date) -> dict:
+    """``{fecha: (body, etag)}`` del rango; los que falten o estén desfasados se arman en memoria sin guardarse."""
+    rows = (db.session.query(DailyMenuSnapshot.date, DailyMenuSnapshot.body, DailyMenuSnapshot.etag,
+                             DailyMenuSnapshot.catalog_version, catalog_version_subquery())
+            .filter(DailyMenuSnapshot.date >= start, DailyMenuSnapshot.date <= end)
+            .all())
+    snapshots = {day: (body, etag) for day, body, etag, version, current in rows if version == (current or 0)}
+    stale = [day for day in days_between(start, end) if day not in snapshots]
+    if not stale:
+        return snapshots
+    catalog = get_catalog()
+    missing = []
+    for day in stale:
+        cached = menu_cache.get(day, catalog.version)
+        if cached:
+            snapshots[day] = cached
+        else:
+            missing.append(day)
+    if missing:
+        ttl = current_app.config.get('PUBLIC_CACHE_TTL', 10)
+        for day, product_ids in _products_by_day(missing).items():
+            # Una escritura de esa fecha guarda un snapshot vigente, que tiene prioridad sobre esta entrada
+            snapshots[day] = menu_cache.put(day, catalog.version, _serialize_menu(product_ids, catalog), ttl)
+    return snapshots
+
+
+def replace_days(days: dict) -> dict:
+    """Sustituye el menú de cada fecha por su lista de productos y reconstruye sus snapshots (sin commit).
+
+    Las fechas quedan anotadas en el registro de cambios de ``/api/sync``.
+    """
+    dates = list(days)
+    record_changes(MENU, dates)
+    DailyMenuItem.query.filter(DailyMenuItem.date.in_(dates)).delete(synchronize_session=False)
+    now = datetime.utcnow()
+    rows = [{'date': day, 'product_id': pid, 'created_at': now} for day, ids in days.items() for pid in ids]
+    if rows:
+        db.session.execute(insert(DailyMenuItem), rows)
+    return build_snapshots(dates)
+
+
+def menus_between(start: date, end: date) -> dict:
+    """Productos de cada fecha del rango según ``DailyMenuItem``: ``{fecha: [product_id, ...]}``."""
+    menus = {day: [] for day in days_between(start, end)}
+    for day, product_id in (db.session.query(DailyMenuItem.date, DailyMenuItem.product_id)
+                            .filter(DailyMenuItem.date >= start, DailyMenuItem.date <= end)
+                            .order_by(DailyMenuItem.date, DailyMenuItem.id)):
+        menus[day].append(product_id)
+    return menus
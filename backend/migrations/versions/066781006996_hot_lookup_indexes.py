@@ -0,0 +1,43 @@
+"""hot lookup indexes
+
+Revision ID: 066781006996
+Revises: 0df0e4af65af
+Create Date: 2026-10-18 10:05:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '066781006996'
+down_revision = '0df0e4af65af'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Eliminar duplicados (date, product_id) antes de crear el índice único.
+    # La subconsulta derivada es necesaria para que MySQL acepte el DELETE.
+    op.execute(
+        "DELETE FROM daily_menu_item WHERE id NOT IN ("
+        "SELECT keep_id FROM (SELECT MIN(id) AS keep_id FROM daily_menu_item "
+        "GROUP BY date, product_id) AS keep)"
+    )
+    op.create_index('uq_daily_menu_item_date_product', 'daily_menu_item', ['date', 'product_id'], unique=True)
+    op.create_index('ix_cart_item_user_product', 'cart_item', ['user_id', 'product_id'], unique=False)
+    op.create_index('ix_order_created_at_id', 'order', ['created_at', 'id'], unique=False)
+    op.create_index('ix_order_user_created_at', 'order', ['user_id', 'created_at'], unique=False)
+    op.create_index(op.f('ix_order_item_order_id'), 'order_item', ['order_id'], unique=False)
+    op.create_index(op.f('ix_order_status_status'), 'order_status', ['status'], unique=False)
+    op.create_index(op.f('ix_product_created_at'), 'product', ['created_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_product_created_at'), table_name='product')
+    op.drop_index(op.f('ix_order_status_status'), table_name='order_status')
+    op.drop_index(op.f('ix_order_item_order_id'), table_name='order_item')
+    op.drop_index('ix_order_user_created_at', table_name='order')
+    op.drop_index('ix_order_created_at_id', table_name='order')
+    op.drop_index('ix_cart_item_user_product', table_name='cart_item')
+    op.drop_index('uq_daily_menu_item_date_product', table_name='daily_menu_item')
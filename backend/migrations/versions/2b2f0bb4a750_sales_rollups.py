@@ -0,0 +1,46 @@
+"""sales rollups
+
+Revision ID: 2b2f0bb4a750
+Revises: aa520e641296
+Create Date: 2026-10-18 11:55:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2b2f0bb4a750'
+down_revision = 'aa520e641296'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Tablas vacías: poblar con `flask reports rebuild --from AAAA-MM-DD` tras migrar
+    op.create_table('sales_rollup',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('hour', sa.Integer(), nullable=False),
+    sa.Column('order_type', sa.String(length=20), nullable=False),
+    sa.Column('payment_method', sa.String(length=40), nullable=False),
+    sa.Column('orders_count', sa.Integer(), nullable=False),
+    sa.Column('revenue', sa.Float(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('day', 'hour', 'order_type', 'payment_method', name='uq_sales_rollup_bucket')
+    )
+    op.create_table('product_sales_rollup',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('quantity', sa.Integer(), nullable=False),
+    sa.Column('revenue', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['product_id'], ['product.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('day', 'product_id', name='uq_product_sales_rollup_day_product')
+    )
+
+
+def downgrade():
+    op.drop_table('product_sales_rollup')
+    op.drop_table('sales_rollup')
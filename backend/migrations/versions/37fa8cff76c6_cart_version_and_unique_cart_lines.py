@@ -0,0 +1,62 @@
+"""cart version and unique cart lines
+
+Revision ID: 37fa8cff76c6
+Revises: 9262b20c485f
+Create Date: 2026-10-18 15:09:32.083878
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '37fa8cff76c6'
+down_revision = '9262b20c485f'
+branch_labels = None
+depends_on = None
+
+cart_item = sa.table(
+    'cart_item',
+    sa.column('id', sa.Integer),
+    sa.column('user_id', sa.Integer),
+    sa.column('product_id', sa.Integer),
+    sa.column('quantity', sa.Integer),
+)
+
+
+def _merge_duplicate_lines(conn):
+    """Deja una línea por (user_id, product_id): la más antigua, con la suma de cantidades."""
+    duplicates = conn.execute(
+        sa.select(cart_item.c.user_id, cart_item.c.product_id,
+                  sa.func.min(cart_item.c.id).label('keep_id'),
+                  sa.func.sum(cart_item.c.quantity).label('quantity'))
+        .group_by(cart_item.c.user_id, cart_item.c.product_id)
+        .having(sa.func.count() > 1)
+    ).fetchall()
+    for row in duplicates:
+        conn.execute(cart_item.update().where(cart_item.c.id == row.keep_id).values(quantity=row.quantity))
+        conn.execute(cart_item.delete().where(
+            cart_item.c.user_id == row.user_id,
+            cart_item.c.product_id == row.product_id,
+            cart_item.c.id != row.keep_id,
+        ))
+
+
+def upgrade():
+    _merge_duplicate_lines(op.get_bind())
+
+    with op.batch_alter_table('cart_item', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_cart_item_user_product'))
+        batch_op.create_index('ix_cart_item_user_product', ['user_id', 'product_id'], unique=True)
+
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('cart_version', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.drop_column('cart_version')
+
+    with op.batch_alter_table('cart_item', schema=None) as batch_op:
+        batch_op.drop_index('ix_cart_item_user_product')
+        batch_op.create_index(batch_op.f('ix_cart_item_user_product'), ['user_id', 'product_id'], unique=False)
@@ -0,0 +1,119 @@
+"""product versions and catalog state
+
+Revision ID: 44654d5a3af0
+Revises: 37fa8cff76c6
+Create Date: 2026-10-18 15:12:24.760566
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '44654d5a3af0'
+down_revision = '37fa8cff76c6'
+branch_labels = None
+depends_on = None
+
+product = sa.table(
+    'product',
+    sa.column('id', sa.Integer),
+    sa.column('name', sa.String),
+    sa.column('description', sa.Text),
+    sa.column('price', sa.Numeric),
+    sa.column('image_url', sa.String),
+    sa.column('created_at', sa.DateTime),
+)
+product_version = sa.table(
+    'product_version',
+    sa.column('id', sa.Integer),
+    sa.column('product_id', sa.Integer),
+    sa.column('version', sa.Integer),
+    sa.column('name', sa.String),
+    sa.column('description', sa.Text),
+    sa.column('price', sa.Numeric),
+    sa.column('image_url', sa.String),
+    sa.column('created_at', sa.DateTime),
+)
+order_item = sa.table(
+    'order_item',
+    sa.column('product_id', sa.Integer),
+    sa.column('product_version_id', sa.Integer),
+)
+catalog_state = sa.table(
+    'catalog_state',
+    sa.column('id', sa.Integer),
+    sa.column('version', sa.Integer),
+)
+
+
+def _backfill_versions(conn):
+    """Versión 1 de cada producto con sus datos actuales; los pedidos existentes apuntan a ella."""
+    conn.execute(product_version.insert().from_select(
+        ['product_id', 'version', 'name', 'description', 'price', 'image_url', 'created_at'],
+        sa.select(product.c.id, sa.literal(1), product.c.name, product.c.description, product.c.price,
+                  product.c.image_url, product.c.created_at),
+    ))
+    # Los items de productos que ya se borraron físicamente quedan sin versión
+    conn.execute(order_item.update().values(product_version_id=(
+        sa.select(product_version.c.id)
+        .where(product_version.c.product_id == order_item.c.product_id, product_version.c.version == 1)
+        .scalar_subquery()
+    )))
+    conn.execute(catalog_state.insert().values(id=1, version=1))
+
+
+def upgrade():
+    op.create_table('catalog_state',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('product_version',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=120), nullable=False),
+    sa.Column('description', sa.Text(), nullable=True),
+    sa.Column('price', sa.Numeric(precision=10, scale=2), nullable=False),
+    sa.Column('image_url', sa.String(length=255), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['product_id'], ['product.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('product_version', schema=None) as batch_op:
+        batch_op.create_index('uq_product_version_product_version', ['product_id', 'version'], unique=True)
+
+    with op.batch_alter_table('order_item', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('product_version_id', sa.Integer(), nullable=True))
+        batch_op.create_foreign_key('fk_order_item_product_version_id', 'product_version',
+                                    ['product_version_id'], ['id'])
+
+    with op.batch_alter_table('product', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+        batch_op.add_column(sa.Column('deleted_at', sa.DateTime(), nullable=True))
+        batch_op.create_index(batch_op.f('ix_product_deleted_at'), ['deleted_at'], unique=False)
+
+    _backfill_versions(op.get_bind())
+
+    # El índice se crea después del backfill para no mantenerlo fila a fila
+    with op.batch_alter_table('order_item', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_order_item_product_version_id'), ['product_version_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('product', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_product_deleted_at'))
+        batch_op.drop_column('deleted_at')
+        batch_op.drop_column('version')
+
+    with op.batch_alter_table('order_item', schema=None) as batch_op:
+        batch_op.drop_constraint('fk_order_item_product_version_id', type_='foreignkey')
+        batch_op.drop_index(batch_op.f('ix_order_item_product_version_id'))
+        batch_op.drop_column('product_version_id')
+
+    with op.batch_alter_table('product_version', schema=None) as batch_op:
+        batch_op.drop_index('uq_product_version_product_version')
+
+    op.drop_table('product_version')
+    op.drop_table('catalog_state')
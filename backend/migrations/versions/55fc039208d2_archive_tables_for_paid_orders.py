@@ -0,0 +1,92 @@
+"""archive tables for paid orders
+
+Revision ID: 55fc039208d2
+Revises: 68228bd7e33a
+Create Date: 2026-10-18 15:30:29.314460
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '55fc039208d2'
+down_revision = '68228bd7e33a'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('archived_order',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('total', sa.Numeric(precision=10, scale=2), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('status_updated_at', sa.DateTime(), nullable=True),
+    sa.Column('archived_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('archived_order', schema=None) as batch_op:
+        batch_op.create_index('ix_archived_order_created_at_id', ['created_at', 'id'], unique=False)
+        batch_op.create_index('ix_archived_order_user_created_at', ['user_id', 'created_at'], unique=False)
+
+    op.create_table('archived_order_info',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('order_id', sa.Integer(), nullable=False),
+    sa.Column('order_type', sa.String(length=20), nullable=False),
+    sa.Column('table_number', sa.Integer(), nullable=True),
+    sa.Column('delivery_address', sa.String(length=255), nullable=True),
+    sa.Column('delivery_phone', sa.String(length=40), nullable=True),
+    sa.Column('payment_method', sa.String(length=40), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['order_id'], ['archived_order.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('order_id')
+    )
+    op.create_table('archived_order_item',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('order_id', sa.Integer(), nullable=False),
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('product_version_id', sa.Integer(), nullable=True),
+    sa.Column('quantity', sa.Integer(), nullable=False),
+    sa.Column('price_at_purchase', sa.Numeric(precision=10, scale=2), nullable=False),
+    sa.ForeignKeyConstraint(['order_id'], ['archived_order.id'], ),
+    sa.ForeignKeyConstraint(['product_id'], ['product.id'], ),
+    sa.ForeignKeyConstraint(['product_version_id'], ['product_version.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('archived_order_item', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_archived_order_item_order_id'), ['order_id'], unique=False)
+
+    op.create_table('archived_order_status_history',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('order_id', sa.Integer(), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('previous_status', sa.String(length=20), nullable=True),
+    sa.Column('changed_by', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['changed_by'], ['user.id'], ),
+    sa.ForeignKeyConstraint(['order_id'], ['archived_order.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('archived_order_status_history', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_archived_order_status_history_order_id'), ['order_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('archived_order_status_history', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_archived_order_status_history_order_id'))
+
+    op.drop_table('archived_order_status_history')
+    with op.batch_alter_table('archived_order_item', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_archived_order_item_order_id'))
+
+    op.drop_table('archived_order_item')
+    op.drop_table('archived_order_info')
+    with op.batch_alter_table('archived_order', schema=None) as batch_op:
+        batch_op.drop_index('ix_archived_order_user_created_at')
+        batch_op.drop_index('ix_archived_order_created_at_id')
+
+    op.drop_table('archived_order')
@@ -0,0 +1,158 @@
+"""order status on order, status history, numeric money
+
+Revision ID: 5c1d7e93ab42
+Revises: 2b2f0bb4a750
+Create Date: 2026-10-18 15:40:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5c1d7e93ab42'
+down_revision = '2b2f0bb4a750'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 1000
+
+order_table = sa.table(
+    'order',
+    sa.column('id', sa.Integer),
+    sa.column('status', sa.String),
+    sa.column('status_updated_at', sa.DateTime),
+)
+order_status = sa.table(
+    'order_status',
+    sa.column('id', sa.Integer),
+    sa.column('order_id', sa.Integer),
+    sa.column('status', sa.String),
+    sa.column('created_at', sa.DateTime),
+    sa.column('updated_at', sa.DateTime),
+)
+status_history = sa.table(
+    'order_status_history',
+    sa.column('order_id', sa.Integer),
+    sa.column('status', sa.String),
+    sa.column('created_at', sa.DateTime),
+)
+
+MONEY_COLUMNS = (
+    ('product', 'price', sa.Numeric(10, 2)),
+    ('order_item', 'price_at_purchase', sa.Numeric(10, 2)),
+    ('sales_rollup', 'revenue', sa.Numeric(12, 2)),
+    ('product_sales_rollup', 'revenue', sa.Numeric(12, 2)),
+)
+
+
+def _backfill_status(conn):
+    """Copia order_status a order.status y al historial, por lotes de BATCH_SIZE filas."""
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            sa.select(order_status.c.id, order_status.c.order_id, order_status.c.status,
+                      order_status.c.created_at, order_status.c.updated_at)
+            .where(order_status.c.id > last_id)
+            .order_by(order_status.c.id)
+            .limit(BATCH_SIZE)
+        ).fetchall()
+        if not rows:
+            break
+        conn.execute(
+            order_table.update()
+            .where(order_table.c.id == sa.bindparam('b_order_id'))
+            .values(status=sa.bindparam('b_status'), status_updated_at=sa.bindparam('b_changed_at')),
+            [{'b_order_id': r.order_id, 'b_status': r.status, 'b_changed_at': r.updated_at or r.created_at}
+             for r in rows],
+        )
+        conn.execute(status_history.insert(), [
+            {'order_id': r.order_id, 'status': r.status, 'created_at': r.updated_at or r.created_at}
+            for r in rows
+        ])
+        last_id = rows[-1].id
+
+
+def _restore_status(conn):
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            sa.select(order_table.c.id, order_table.c.status, order_table.c.status_updated_at)
+            .where(order_table.c.id > last_id, order_table.c.status_updated_at.is_not(None))
+            .order_by(order_table.c.id)
+            .limit(BATCH_SIZE)
+        ).fetchall()
+        if not rows:
+            break
+        conn.execute(order_status.insert(), [
+            {'order_id': r.id, 'status': r.status, 'created_at': r.status_updated_at,
+             'updated_at': r.status_updated_at}
+            for r in rows
+        ])
+        last_id = rows[-1].id
+
+
+def upgrade():
+    op.create_table('order_status_history',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('order_id', sa.Integer(), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('previous_status', sa.String(length=20), nullable=True),
+    sa.Column('changed_by', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['changed_by'], ['user.id'], ),
+    sa.ForeignKeyConstraint(['order_id'], ['order.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('order_status_history', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_order_status_history_order_id'), ['order_id'], unique=False)
+
+    with op.batch_alter_table('order', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('status', sa.String(length=20), server_default='pendiente', nullable=False))
+        batch_op.add_column(sa.Column('status_updated_at', sa.DateTime(), nullable=True))
+        batch_op.alter_column('total', existing_type=sa.Float(), type_=sa.Numeric(10, 2), existing_nullable=False)
+
+    for table, column, type_ in MONEY_COLUMNS:
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.alter_column(column, existing_type=sa.Float(), type_=type_, existing_nullable=False)
+
+    _backfill_status(op.get_bind())
+
+    # El índice se crea después del backfill para no mantenerlo fila a fila
+    with op.batch_alter_table('order', schema=None) as batch_op:
+        batch_op.create_index('ix_order_status_created_at', ['status', 'created_at', 'id'], unique=False)
+
+    with op.batch_alter_table('order_status', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_order_status_status'))
+    op.drop_table('order_status')
+
+
+def downgrade():
+    op.create_table('order_status',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('order_id', sa.Integer(), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['order_id'], ['order.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('order_id')
+    )
+    with op.batch_alter_table('order_status', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_order_status_status'), ['status'], unique=False)
+
+    _restore_status(op.get_bind())
+
+    for table, column, type_ in MONEY_COLUMNS:
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.alter_column(column, existing_type=type_, type_=sa.Float(), existing_nullable=False)
+
+    with op.batch_alter_table('order', schema=None) as batch_op:
+        batch_op.drop_index('ix_order_status_created_at')
+        batch_op.alter_column('total', existing_type=sa.Numeric(10, 2), type_=sa.Float(), existing_nullable=False)
+        batch_op.drop_column('status_updated_at')
+        batch_op.drop_column('status')
+
+    with op.batch_alter_table('order_status_history', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_order_status_history_order_id'))
+    op.drop_table('order_status_history')
@@ -0,0 +1,54 @@
+"""menu snapshots and templates
+
+Revision ID: 68228bd7e33a
+Revises: 44654d5a3af0
+Create Date: 2026-10-18 15:17:12.500154
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '68228bd7e33a'
+down_revision = '44654d5a3af0'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('daily_menu_snapshot',
+    sa.Column('date', sa.Date(), nullable=False),
+    sa.Column('body', sa.Text(), nullable=False),
+    sa.Column('etag', sa.String(length=32), nullable=False),
+    sa.Column('catalog_version', sa.Integer(), nullable=False),
+    sa.Column('built_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('date')
+    )
+    op.create_table('menu_template',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=120), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('name')
+    )
+    op.create_table('menu_template_item',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('template_id', sa.Integer(), nullable=False),
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('weekday', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['product_id'], ['product.id'], ),
+    sa.ForeignKeyConstraint(['template_id'], ['menu_template.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('menu_template_item', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_menu_template_item_template_id'), ['template_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('menu_template_item', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_menu_template_item_template_id'))
+
+    op.drop_table('menu_template_item')
+    op.drop_table('menu_template')
+    op.drop_table('daily_menu_snapshot')
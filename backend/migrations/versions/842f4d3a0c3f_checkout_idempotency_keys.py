@@ -0,0 +1,34 @@
+"""checkout idempotency keys
+
+Revision ID: 842f4d3a0c3f
+Revises: 066781006996
+Create Date: 2026-10-18 10:40:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '842f4d3a0c3f'
+down_revision = '066781006996'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('idempotency_key',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('key', sa.String(length=255), nullable=False),
+    sa.Column('status_code', sa.Integer(), nullable=False),
+    sa.Column('response_body', sa.Text(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_id', 'key', name='uq_idempotency_key_user_key')
+    )
+
+
+def downgrade():
+    op.drop_table('idempotency_key')
@@ -0,0 +1,52 @@
+"""change log for delta sync
+
+Revision ID: 9a2b45097c31
+Revises: 55fc039208d2
+Create Date: 2026-10-18 15:37:32.567770
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9a2b45097c31'
+down_revision = '55fc039208d2'
+branch_labels = None
+depends_on = None
+
+change_log_state = sa.table(
+    'change_log_state',
+    sa.column('id', sa.Integer),
+    sa.column('compacted_through', sa.Integer),
+)
+
+
+def upgrade():
+    op.create_table('change_log',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('entity', sa.String(length=20), nullable=False),
+    sa.Column('entity_key', sa.String(length=40), nullable=False),
+    sa.Column('op', sa.String(length=10), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sqlite_autoincrement=True
+    )
+    with op.batch_alter_table('change_log', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_change_log_created_at'), ['created_at'], unique=False)
+
+    op.create_table('change_log_state',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('compacted_through', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.execute(change_log_state.insert().values(id=1, compacted_through=0))
+
+
+def downgrade():
+    op.drop_table('change_log_state')
+    with op.batch_alter_table('change_log', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_change_log_created_at'))
+
+    op.drop_table('change_log')
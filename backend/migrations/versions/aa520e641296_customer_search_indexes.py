@@ -0,0 +1,29 @@
+"""customer search indexes
+
+Revision ID: aa520e641296
+Revises: 842f4d3a0c3f
+Create Date: 2026-10-18 11:20:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'aa520e641296'
+down_revision = '842f4d3a0c3f'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # username y email ya tienen índice por su restricción UNIQUE
+    op.create_index(op.f('ix_user_first_name'), 'user', ['first_name'], unique=False)
+    op.create_index(op.f('ix_user_last_name'), 'user', ['last_name'], unique=False)
+    op.create_index(op.f('ix_user_phone'), 'user', ['phone'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_user_phone'), table_name='user')
+    op.drop_index(op.f('ix_user_last_name'), table_name='user')
+    op.drop_index(op.f('ix_user_first_name'), table_name='user')
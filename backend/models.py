@@ -13,10 +13,12 @@ class User(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
     # Campos de cliente (no requieren acceso a la web)
-    first_name = db.Column(db.String(120), nullable=True)
-    last_name = db.Column(db.String(120), nullable=True)
-    phone = db.Column(db.String(40), nullable=True)
+    first_name = db.Column(db.String(120), nullable=True, index=True)
+    last_name = db.Column(db.String(120), nullable=True, index=True)
+    phone = db.Column(db.String(40), nullable=True, index=True)
     address = db.Column(db.String(255), nullable=True)
+    # Se incrementa con cada cambio del carrito: sirve de ETag y de control de concurrencia
+    cart_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
 
     orders = db.relationship('Order', backref='user', lazy=True)
     cart_items = db.relationship('CartItem', backref='user', lazy=True)
@@ -31,14 +33,44 @@ class Product(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(120), nullable=False)
     description = db.Column(db.Text, nullable=True)
-    price = db.Column(db.Float, nullable=False)
+    price = db.Column(db.Numeric(10, 2), nullable=False)
     image_url = db.Column(db.String(255), nullable=True)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    # Número de la versión vigente en product_version; los campos de arriba son su copia editable
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+    # Borrado lógico: los pedidos y menús antiguos siguen apuntando al producto
+    deleted_at = db.Column(db.DateTime, nullable=True, index=True)
 
     order_items = db.relationship('OrderItem', backref='product', lazy=True)
     cart_items = db.relationship('CartItem', backref='product', lazy=True)
+    versions = db.relationship('ProductVersion', backref='product', lazy=True)
+
+class ProductVersion(db.Model):
+    """Foto inmutable de un producto; se crea una por cada edición (ver catalog.py)."""
+    __table_args__ = (
+        db.Index('uq_product_version_product_version', 'product_id', 'version', unique=True),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    product_id = db.Column(db.Integer, db.ForeignKey('product.id'), nullable=False)
+    version = db.Column(db.Integer, nullable=False)
+    name = db.Column(db.String(120), nullable=False)
+    description = db.Column(db.Text, nullable=True)
+    price = db.Column(db.Numeric(10, 2), nullable=False)
+    image_url = db.Column(db.String(255), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class CatalogState(db.Model):
+    """Fila única con la versión del catálogo; cambia con cada alta, edición o baja de producto."""
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
 
 class CartItem(db.Model):
+    __table_args__ = (
+        # Único: una línea por producto, lo que permite el upsert de cantidades
+        db.Index('ix_cart_item_user_product', 'user_id', 'product_id', unique=True),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     product_id = db.Column(db.Integer, db.ForeignKey('product.id'), nullable=False)
@@ -46,21 +78,37 @@ class CartItem(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
 class Order(db.Model):
+    __table_args__ = (
+        # Listado del admin (todos los pedidos) y del cliente (sus pedidos), ordenados por fecha
+        db.Index('ix_order_created_at_id', 'created_at', 'id'),
+        db.Index('ix_order_user_created_at', 'user_id', 'created_at'),
+        # Feed (no pagados) e historial (pagados): filtro por estado y orden por fecha con un solo índice
+        db.Index('ix_order_status_created_at', 'status', 'created_at', 'id'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    total = db.Column(db.Float, nullable=False, default=0.0)
+    total = db.Column(db.Numeric(10, 2), nullable=False, default=0)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Estado actual: 'pendiente', 'entregado' o 'pagado'. El historial está en OrderStatusHistory.
+    status = db.Column(db.String(20), nullable=False, default='pendiente', server_default='pendiente')
+    status_updated_at = db.Column(db.DateTime, nullable=True)
 
     items = db.relationship('OrderItem', backref='order', lazy=True)
     info = db.relationship('OrderInfo', backref='order', uselist=False, lazy=True)
-    status_rel = db.relationship('OrderStatus', backref='order', uselist=False, lazy=True)
+    status_history = db.relationship('OrderStatusHistory', backref='order', lazy=True,
+                                     order_by='OrderStatusHistory.id')
 
 class OrderItem(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    order_id = db.Column(db.Integer, db.ForeignKey('order.id'), nullable=False)
+    order_id = db.Column(db.Integer, db.ForeignKey('order.id'), nullable=False, index=True)
     product_id = db.Column(db.Integer, db.ForeignKey('product.id'), nullable=False)
+    # Versión del producto al comprar: el historial muestra su nombre, no el actual
+    product_version_id = db.Column(db.Integer, db.ForeignKey('product_version.id'), nullable=True, index=True)
     quantity = db.Column(db.Integer, nullable=False, default=1)
-    price_at_purchase = db.Column(db.Float, nullable=False)
+    price_at_purchase = db.Column(db.Numeric(10, 2), nullable=False)
+
+    product_version = db.relationship('ProductVersion')
 
 class OrderInfo(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -72,18 +120,175 @@ class OrderInfo(db.Model):
     payment_method = db.Column(db.String(40), nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
-class OrderStatus(db.Model):
+class OrderStatusHistory(db.Model):
+    """Registro de solo inserción de los cambios de estado de un pedido (auditoría)."""
     id = db.Column(db.Integer, primary_key=True)
-    order_id = db.Column(db.Integer, db.ForeignKey('order.id'), nullable=False, unique=True)
-    # Estados permitidos: 'pendiente', 'entregado', 'pagado'
-    status = db.Column(db.String(20), nullable=False, default='pendiente')
+    order_id = db.Column(db.Integer, db.ForeignKey('order.id'), nullable=False, index=True)
+    status = db.Column(db.String(20), nullable=False)
+    previous_status = db.Column(db.String(20), nullable=True)
+    changed_by = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class ArchivedOrder(db.Model):
+    """Pedido pagado hace más de ``ARCHIVE_AFTER_DAYS`` días, movido fuera de las tablas vivas (ver archive.py).
+
+    Las tablas ``archived_*`` replican columnas y relaciones de ``Order``,
+    ``OrderItem``, ``OrderInfo`` y ``OrderStatusHistory`` y conservan los ids
+    originales, así que se leen con las mismas consultas y serializadores.
+    """
+    __table_args__ = (
+        db.Index('ix_archived_order_created_at_id', 'created_at', 'id'),
+        db.Index('ix_archived_order_user_created_at', 'user_id', 'created_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    total = db.Column(db.Numeric(10, 2), nullable=False, default=0)
+    created_at = db.Column(db.DateTime)
+    status = db.Column(db.String(20), nullable=False)
+    status_updated_at = db.Column(db.DateTime, nullable=True)
+    archived_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    user = db.relationship('User', backref=db.backref('archived_orders', lazy=True))
+    items = db.relationship('ArchivedOrderItem', lazy=True)
+    info = db.relationship('ArchivedOrderInfo', uselist=False, lazy=True)
+    status_history = db.relationship('ArchivedOrderStatusHistory', lazy=True,
+                                     order_by='ArchivedOrderStatusHistory.id')
+
+class ArchivedOrderItem(db.Model):
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    order_id = db.Column(db.Integer, db.ForeignKey('archived_order.id'), nullable=False, index=True)
+    product_id = db.Column(db.Integer, db.ForeignKey('product.id'), nullable=False)
+    product_version_id = db.Column(db.Integer, db.ForeignKey('product_version.id'), nullable=True)
+    quantity = db.Column(db.Integer, nullable=False, default=1)
+    price_at_purchase = db.Column(db.Numeric(10, 2), nullable=False)
+
+    product_version = db.relationship('ProductVersion')
+
+class ArchivedOrderInfo(db.Model):
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    order_id = db.Column(db.Integer, db.ForeignKey('archived_order.id'), nullable=False, unique=True)
+    order_type = db.Column(db.String(20), nullable=False)
+    table_number = db.Column(db.Integer, nullable=True)
+    delivery_address = db.Column(db.String(255), nullable=True)
+    delivery_phone = db.Column(db.String(40), nullable=True)
+    payment_method = db.Column(db.String(40), nullable=True)
+    created_at = db.Column(db.DateTime)
+
+class ArchivedOrderStatusHistory(db.Model):
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    order_id = db.Column(db.Integer, db.ForeignKey('archived_order.id'), nullable=False, index=True)
+    status = db.Column(db.String(20), nullable=False)
+    previous_status = db.Column(db.String(20), nullable=True)
+    changed_by = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
+    created_at = db.Column(db.DateTime)
+
+class IdempotencyKey(db.Model):
+    """Respuesta guardada de un checkout, para repetirla ante reintentos con la misma clave."""
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'key', name='uq_idempotency_key_user_key'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    key = db.Column(db.String(255), nullable=False)
+    status_code = db.Column(db.Integer, nullable=False)
+    response_body = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class RevokedToken(db.Model):
+    """JWT revocados (logout) hasta su expiración; ver auth.RevocationList."""
+    id = db.Column(db.Integer, primary_key=True)
+    jti = db.Column(db.String(64), nullable=False, unique=True)
+    token_type = db.Column(db.String(10), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+    revoked_at = db.Column(db.DateTime, default=datetime.utcnow)
 
 class DailyMenuItem(db.Model):
+    __table_args__ = (
+        db.Index('uq_daily_menu_item_date_product', 'date', 'product_id', unique=True),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     product_id = db.Column(db.Integer, db.ForeignKey('product.id'), nullable=False)
     date = db.Column(db.Date, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
-    product = db.relationship('Product', backref='daily_menu_items')
\ No newline at end of file
+    product = db.relationship('Product', backref='daily_menu_items')
+
+class DailyMenuSnapshot(db.Model):
+    """Menú de un día ya serializado (ver menus.py): leerlo es una consulta por clave primaria."""
+    date = db.Column(db.Date, primary_key=True)
+    body = db.Column(db.Text, nullable=False)
+    etag = db.Column(db.String(32), nullable=False)
+    # Versión del catálogo con la que se serializó; si cambió, el snapshot se reconstruye al leerlo
+    catalog_version = db.Column(db.Integer, nullable=False)
+    built_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class MenuTemplate(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(120), unique=True, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    items = db.relationship('MenuTemplateItem', backref='template', lazy=True, cascade='all, delete-orphan',
+                            order_by='MenuTemplateItem.id')
+
+class MenuTemplateItem(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    template_id = db.Column(db.Integer, db.ForeignKey('menu_template.id'), nullable=False, index=True)
+    product_id = db.Column(db.Integer, db.ForeignKey('product.id'), nullable=False)
+    # 0 = lunes ... 6 = domingo; NULL = todos los días
+    weekday = db.Column(db.Integer, nullable=True)
+
+class SalesRollup(db.Model):
+    """Ventas pagadas agregadas por hora local, tipo de pedido y medio de pago.
+
+    Se mantiene de forma incremental al marcar (o desmarcar) un pedido como
+    pagado; ``flask reports rebuild`` la recalcula desde los pedidos.
+    """
+    __table_args__ = (
+        db.UniqueConstraint('day', 'hour', 'order_type', 'payment_method', name='uq_sales_rollup_bucket'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    day = db.Column(db.Date, nullable=False)
+    hour = db.Column(db.Integer, nullable=False)
+    order_type = db.Column(db.String(20), nullable=False)
+    # '' cuando el pedido no tiene medio de pago (NULL rompería la restricción única)
+    payment_method = db.Column(db.String(40), nullable=False, default='')
+    orders_count = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Numeric(12, 2), nullable=False, default=0)
+
+class ProductSalesRollup(db.Model):
+    """Unidades e ingresos pagados por producto y día local."""
+    __table_args__ = (
+        db.UniqueConstraint('day', 'product_id', name='uq_product_sales_rollup_day_product'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    day = db.Column(db.Date, nullable=False)
+    product_id = db.Column(db.Integer, db.ForeignKey('product.id'), nullable=False)
+    quantity = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Numeric(12, 2), nullable=False, default=0)
+
+class ChangeLog(db.Model):
+    """Una escritura sobre una entidad que ven las tabletas; el id es el cursor de ``/api/sync`` (ver sync.py)."""
+    __table_args__ = (
+        # AUTOINCREMENT en SQLite: un id no se reutiliza aunque la compactación borre las filas más nuevas
+        {'sqlite_autoincrement': True},
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    entity = db.Column(db.String(20), nullable=False)
+    # Id de la entidad, o la fecha ISO en los menús
+    entity_key = db.Column(db.String(40), nullable=False)
+    op = db.Column(db.String(10), nullable=False)
+    # Dueño de pedidos y carritos: cada cliente solo sincroniza los suyos
+    user_id = db.Column(db.Integer, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+class ChangeLogState(db.Model):
+    """Fila única: cursor hasta el que se compactó el registro; uno anterior exige resincronizar todo."""
+    id = db.Column(db.Integer, primary_key=True)
+    compacted_through = db.Column(db.Integer, nullable=False, default=0)
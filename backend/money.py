@@ -0,0 +1,40 @@
+"""Importes monetarios.
+
+En la base se guardan como ``Numeric(10, 2)`` y en Python se manejan como
+``Decimal``, de modo que los totales no acumulan errores de coma flotante. En
+JSON siguen saliendo como números (``MoneyJSONProvider``), igual que antes.
+"""
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+
+from flask.json.provider import DefaultJSONProvider
+
+CENT = Decimal('0.01')
+
+
+def to_money(value) -> Decimal:
+    """Convierte un importe recibido (str, int, float) a ``Decimal`` con dos decimales.
+
+    Lanza ``ValueError`` si no es un número finito.
+    """
+    try:
+        amount = Decimal(str(value).strip())
+    except (InvalidOperation, TypeError):
+        raise ValueError(f'Importe inválido: {value!r}')
+    if not amount.is_finite():
+        raise ValueError(f'Importe inválido: {value!r}')
+    return amount.quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+def order_total(lines) -> Decimal:
+    """Total de un pedido a partir de pares ``(cantidad, precio_unitario)``."""
+    return sum((quantity * to_money(price) for quantity, price in lines), Decimal('0.00'))
+
+
+class MoneyJSONProvider(DefaultJSONProvider):
+    """Serializa ``Decimal`` como número en lugar de la cadena que usa Flask por defecto."""
+
+    @staticmethod
+    def default(o):
+        if isinstance(o, Decimal):
+            return float(o)
+        return DefaultJSONProvider.default(o)
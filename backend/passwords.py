@@ -0,0 +1,95 @@
+"""Hash de contraseñas en un pool acotado.
+
+scrypt/PBKDF2 son lentos a propósito. Aquí se ejecutan en un pool de
+``PASSWORD_HASH_WORKERS`` hilos (hashlib libera el GIL mientras calcula) con
+como mucho ``PASSWORD_HASH_QUEUE`` trabajos esperando: una ráfaga de logins
+limita su propio consumo de CPU y, si la cola está llena, la petición se
+rechaza de inmediato con ``HashingBusy`` (503) en lugar de acumularse y dejar
+sin hilos a los pedidos.
+
+``verify_password`` además vuelve a hashear la contraseña en el login si el
+hash guardado usa parámetros distintos de ``PASSWORD_HASH_METHOD``.
+"""
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from functools import lru_cache
+import threading
+
+from flask import current_app
+from werkzeug.security import check_password_hash, generate_password_hash
+
+
+class HashingBusy(Exception):
+    """El pool de hashing está saturado; reintentar más tarde."""
+
+
+class HashingPool:
+    def __init__(self, workers: int = 2, queue_size: int = 16, timeout: float = 10.0):
+        self.workers = workers
+        self.timeout = timeout
+        # Trabajos en curso + en espera; al agotarse se rechaza sin encolar
+        self._slots = threading.BoundedSemaphore(workers + queue_size)
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        # Creación perezosa: con gunicorn --preload cada worker crea sus hilos tras el fork
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='password-hash')
+            return self._executor
+
+    def run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            raise HashingBusy()
+        try:
+            future = self._get_executor().submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            raise HashingBusy()
+
+
+def get_hashing_pool(app=None) -> HashingPool:
+    app = app or current_app._get_current_object()
+    pool = app.extensions.get('password_hashing')
+    if pool is None:
+        pool = app.extensions.setdefault('password_hashing', HashingPool(
+            workers=app.config.get('PASSWORD_HASH_WORKERS', 2),
+            queue_size=app.config.get('PASSWORD_HASH_QUEUE', 16),
+            timeout=app.config.get('PASSWORD_HASH_TIMEOUT', 10.0),
+        ))
+    return pool
+
+
+@lru_cache(maxsize=8)
+def _method_prefix(method: str) -> str:
+    # 'scrypt' se guarda como 'scrypt:32768:8:1'; se obtiene el prefijo real una vez por método
+    return generate_password_hash('', method=method).split('$', 1)[0]
+
+
+def _method() -> str:
+    return current_app.config.get('PASSWORD_HASH_METHOD', 'scrypt')
+
+
+def hash_password(password: str) -> str:
+    return get_hashing_pool().run(generate_password_hash, password, _method())
+
+
+def needs_rehash(password_hash: str) -> bool:
+    return password_hash.split('$', 1)[0] != _method_prefix(_method())
+
+
+def verify_password(user, password: str) -> bool:
+    """Comprueba la contraseña y, si es correcta y el hash está desactualizado, lo renueva (sin commit)."""
+    if not user.password_hash or not password:
+        return False
+    pool = get_hashing_pool()
+    if not pool.run(check_password_hash, user.password_hash, password):
+        return False
+    if needs_rehash(user.password_hash):
+        user.password_hash = pool.run(generate_password_hash, password, _method())
+    return True
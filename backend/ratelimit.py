@@ -0,0 +1,148 @@
+"""Rate limiting con token bucket para login y registro.
+
+Cada regla es ``"capacidad/segundos"``: el bucket admite ráfagas de
+``capacidad`` intentos y se recarga a ``capacidad / segundos`` fichas por
+segundo. Dos almacenes, elegidos con ``RATE_LIMIT_STORE``:
+
+- ``memory`` (por defecto): por proceso; con N workers el límite efectivo es
+  hasta N veces el configurado.
+- ``sqlite``: archivo local (``RATE_LIMIT_SQLITE_PATH``) compartido por todos
+  los workers del mismo host, igual que el broker ``spool`` de eventos.
+"""
+from contextlib import contextmanager
+import math
+import os
+import sqlite3
+import threading
+import time
+
+from flask import current_app, jsonify, request
+
+
+def parse_rule(rule: str):
+    """``"5/60"`` -> ``(5.0, 5/60)``: capacidad y fichas por segundo."""
+    capacity, seconds = rule.split('/')
+    capacity = float(capacity)
+    return capacity, capacity / float(seconds)
+
+
+def _refill(tokens: float, updated: float, now: float, capacity: float, rate: float) -> float:
+    return min(capacity, tokens + (now - updated) * rate)
+
+
+class MemoryStore:
+    def __init__(self, max_keys: int = 100_000):
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self.max_keys = max_keys
+
+    def take(self, key: str, capacity: float, rate: float):
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (capacity, now))
+            tokens = _refill(tokens, updated, now, capacity, rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            if len(self._buckets) >= self.max_keys and key not in self._buckets:
+                self._prune(now, rate, capacity)
+            self._buckets[key] = (tokens, now)
+        return allowed, 0 if allowed else math.ceil((1 - tokens) / rate)
+
+    def _prune(self, now: float, rate: float, capacity: float):
+        # Un bucket que ya se habría rellenado del todo equivale a no tenerlo
+        full_after = capacity / rate
+        for key in [k for k, (_, updated) in self._buckets.items() if now - updated >= full_after]:
+            del self._buckets[key]
+
+
+class SQLiteStore:
+    # Cada cuántas llamadas se borran buckets sin uso en el último día (ya estarían llenos)
+    PURGE_EVERY = 1000
+    PURGE_AGE = 24 * 3600
+
+    def __init__(self, path: str):
+        self.path = path
+        self._calls = 0
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('CREATE TABLE IF NOT EXISTS buckets ('
+                         'key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)')
+
+    @contextmanager
+    def _connect(self):
+        # Una conexión por llamada: sqlite3 no comparte conexiones entre hilos
+        conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def take(self, key: str, capacity: float, rate: float):
+        # Reloj de pared: los workers no comparten el monotónico
+        now = time.time()
+        with self._connect() as conn:
+            # IMMEDIATE toma el lock de escritura antes de leer: leer-calcular-escribir es atómico
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                row = conn.execute('SELECT tokens, updated FROM buckets WHERE key = ?', (key,)).fetchone()
+                tokens = _refill(row[0], row[1], now, capacity, rate) if row else capacity
+                allowed = tokens >= 1
+                if allowed:
+                    tokens -= 1
+                conn.execute('INSERT INTO buckets (key, tokens, updated) VALUES (?, ?, ?) '
+                             'ON CONFLICT(key) DO UPDATE SET tokens = excluded.tokens, updated = excluded.updated',
+                             (key, tokens, now))
+                conn.execute('COMMIT')
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+            self._calls += 1
+            if self._calls % self.PURGE_EVERY == 0:
+                conn.execute('DELETE FROM buckets WHERE updated < ?', (now - self.PURGE_AGE,))
+        return allowed, 0 if allowed else math.ceil((1 - tokens) / rate)
+
+
+_store_lock = threading.Lock()
+
+
+def get_store(app=None):
+    app = app or current_app._get_current_object()
+    with _store_lock:
+        store = app.extensions.get('rate_limit_store')
+        if store is None:
+            if app.config.get('RATE_LIMIT_STORE') == 'sqlite':
+                path = app.config.get('RATE_LIMIT_SQLITE_PATH') or os.path.join(app.instance_path, 'ratelimit.db')
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                store = SQLiteStore(path)
+            else:
+                store = MemoryStore()
+            app.extensions['rate_limit_store'] = store
+        return store
+
+
+def client_ip() -> str:
+    # Con TRUSTED_PROXIES, ProxyFix ya dejó en remote_addr la IP del cliente
+    return request.remote_addr or 'unknown'
+
+
+def enforce(*limits):
+    """Consume una ficha de cada ``(nombre, identificador, clave_de_config)``.
+
+    Devuelve una respuesta 429 con ``Retry-After`` si alguno se agotó, o None.
+    Sin regla configurada (valor vacío) ese límite no se aplica.
+    """
+    if not current_app.config.get('RATE_LIMIT_ENABLED', True):
+        return None
+    store = get_store()
+    for name, identifier, config_key in limits:
+        rule = current_app.config.get(config_key)
+        if not rule or not identifier:
+            continue
+        capacity, rate = parse_rule(rule)
+        allowed, retry_after = store.take(f'{name}:{identifier}', capacity, rate)
+        if not allowed:
+            response = jsonify({'message': 'Demasiados intentos, inténtalo más tarde'})
+            response.headers['Retry-After'] = str(retry_after)
+            return response, 429
+    return None
@@ -0,0 +1,112 @@
+"""Mantenimiento de las tablas de rollup de ventas.
+
+Los reportes leen ``SalesRollup``/``ProductSalesRollup`` en lugar de recorrer
+todos los pedidos. ``apply_paid_order`` suma (o resta) un pedido en la misma
+transacción que cambia su estado; ``rebuild_rollups`` recalcula un rango de
+días con GROUP BY sobre los pedidos pagados, vivos y archivados.
+"""
+from collections import defaultdict
+from datetime import datetime, time, timedelta, timezone
+from decimal import Decimal
+
+from sqlalchemy import func, insert
+
+from archive import TIERS
+from models import db, Order, SalesRollup, ProductSalesRollup
+from timeutils import business_tz, to_business_time
+from upsert import upsert_increment
+
+
+def apply_paid_order(order: Order, sign: int = 1):
+    """Suma el pedido a los rollups (``sign=-1`` lo resta si deja de estar pagado)."""
+    local = to_business_time(order.created_at)
+    info = order.info
+    upsert_increment(SalesRollup, keys={
+        'day': local.date(),
+        'hour': local.hour,
+        'order_type': info.order_type if info else 'mesa',
+        'payment_method': (info.payment_method if info else None) or '',
+    }, deltas={'orders_count': sign, 'revenue': sign * order.total})
+
+    per_product = defaultdict(lambda: [0, Decimal('0')])
+    for item in order.items:
+        per_product[item.product_id][0] += item.quantity
+        per_product[item.product_id][1] += item.quantity * item.price_at_purchase
+    for product_id, (quantity, revenue) in per_product.items():
+        upsert_increment(ProductSalesRollup, keys={'day': local.date(), 'product_id': product_id},
+                         deltas={'quantity': sign * quantity, 'revenue': sign * revenue})
+
+
+def _utc_bounds(day_from, day_to):
+    """Límites UTC (sin zona) de los días locales [day_from, day_to]."""
+    tz = business_tz()
+
+    def to_utc(day):
+        return datetime.combine(day, time.min, tzinfo=tz).astimezone(timezone.utc).replace(tzinfo=None)
+    return to_utc(day_from), to_utc(day_to + timedelta(days=1))
+
+
+def _utc_hour_bucket(column):
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'sqlite':
+        return func.strftime('%Y-%m-%d %H', column)
+    if dialect == 'postgresql':
+        return func.to_char(column, 'YYYY-MM-DD HH24')
+    return func.date_format(column, '%Y-%m-%d %H')
+
+
+def _local_bucket(bucket: str):
+    # Exacto para zonas con desfase de horas enteras (p. ej. America/Lima)
+    local = to_business_time(datetime.strptime(bucket, '%Y-%m-%d %H'))
+    return local.date(), local.hour
+
+
+def rebuild_rollups(day_from, day_to) -> dict:
+    """Recalcula los rollups de los días locales [day_from, day_to] y hace commit."""
+    start, end = _utc_bounds(day_from, day_to)
+    sales = defaultdict(lambda: [0, Decimal('0')])
+    products = defaultdict(lambda: [0, Decimal('0')])
+    # Los pedidos pagados antiguos pueden estar ya en el archivo: se suman ambos niveles
+    for tier in TIERS:
+        order, item, info = tier.order, tier.item, tier.info
+        paid_in_range = (order.status == 'pagado') & (order.created_at >= start) & (order.created_at < end)
+        bucket = _utc_hour_bucket(order.created_at).label('bucket')
+        order_type = func.coalesce(info.order_type, 'mesa').label('order_type')
+        payment_method = func.coalesce(info.payment_method, '').label('payment_method')
+        for row in (db.session.query(bucket, order_type, payment_method,
+                                     func.count(order.id), func.sum(order.total))
+                    .outerjoin(info, info.order_id == order.id)
+                    .filter(paid_in_range)
+                    .group_by(bucket, order_type, payment_method)):
+            day, hour = _local_bucket(row[0])
+            sales[(day, hour, row[1], row[2])][0] += row[3]
+            sales[(day, hour, row[1], row[2])][1] += row[4] or 0
+
+        for row in (db.session.query(bucket, item.product_id, func.sum(item.quantity),
+                                     func.sum(item.quantity * item.price_at_purchase))
+                    .select_from(order)
+                    .join(item, item.order_id == order.id)
+                    .filter(paid_in_range)
+                    .group_by(bucket, item.product_id)):
+            day, _ = _local_bucket(row[0])
+            products[(day, row[1])][0] += row[2]
+            products[(day, row[1])][1] += row[3] or 0
+
+    day_filter = (SalesRollup.day >= day_from) & (SalesRollup.day <= day_to)
+    SalesRollup.query.filter(day_filter).delete(synchronize_session=False)
+    ProductSalesRollup.query.filter(
+        (ProductSalesRollup.day >= day_from) & (ProductSalesRollup.day <= day_to)
+    ).delete(synchronize_session=False)
+    if sales:
+        db.session.execute(insert(SalesRollup), [
+            {'day': day, 'hour': hour, 'order_type': ot, 'payment_method': pm,
+             'orders_count': count, 'revenue': revenue}
+            for (day, hour, ot, pm), (count, revenue) in sales.items()
+        ])
+    if products:
+        db.session.execute(insert(ProductSalesRollup), [
+            {'day': day, 'product_id': product_id, 'quantity': quantity, 'revenue': revenue}
+            for (day, product_id), (quantity, revenue) in products.items()
+        ])
+    db.session.commit()
+    return {'sales_rows': len(sales), 'product_rows': len(products)}
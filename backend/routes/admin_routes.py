@@ -1,18 +1,89 @@
-from flask import Blueprint, jsonify, request
-from flask_jwt_extended import jwt_required, get_jwt
+from flask import Blueprint, Response, jsonify, request, stream_with_context
+from auth import admin_required
+from sqlalchemy import func, insert, or_
 from models import db, User, Order
-from models import Product, OrderItem, OrderInfo
+from archive import TIERS
+from models import OrderItem, OrderInfo
+from catalog import get_catalog
+from events import order_event_data, publish_order_event, publish_order_events
+from money import order_total
+from passwords import HashingBusy, hash_password
+from exports import EXPORT_STATUSES, chronological, export_query, export_tiers, generate_csv, generate_ndjson
+from serializers import USER_SUMMARY, plan_from_request
+from sync import USER as USER_CHANGE, record_change, record_order_changes
+from routes.order_routes import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, apply_order_filters, orders_page_response
 
 admin_bp = Blueprint('admin', __name__, url_prefix='/api/admin')
 
+@admin_bp.errorhandler(HashingBusy)
+def hashing_busy(_error):
+    response = jsonify({'message': 'Servidor ocupado, inténtalo en unos segundos'})
+    response.headers['Retry-After'] = '1'
+    return response, 503
+
 @admin_bp.get('/users')
-@jwt_required()
+@admin_required()
 def list_users():
-    claims = get_jwt()
-    if not claims.get('is_admin'):
-        return jsonify({'message': 'No autorizado'}), 403
-    users = User.query.all()
-    return jsonify([{
+    """Usuarios sin sus pedidos; ``?include=orders`` añade el resumen de cada uno.
+
+    Para listas largas, ``/customers`` pagina y trae solo el número de pedidos y el último.
+    """
+    try:
+        plan = plan_from_request(USER_SUMMARY)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    users = User.query.options(*plan.load_options(User)).all()
+    return jsonify(plan.dump_many(users)), 200
+
+def _escape_like(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+@admin_bp.get('/customers')
+@admin_required()
+def list_customers():
+    """Directorio paginado de clientes con búsqueda por prefijo.
+
+    ``q`` busca por prefijo en nombre, apellido, teléfono, usuario y email (con
+    índice en cada columna); ``role=customer`` excluye administradores. Pagina
+    por keyset sobre ``id`` descendente con ``limit``/``cursor`` y devuelve el
+    siguiente cursor en ``X-Next-Cursor``.
+    """
+    try:
+        limit = min(max(int(request.args.get('limit', DEFAULT_PAGE_SIZE)), 1), MAX_PAGE_SIZE)
+        cursor = int(request.args['cursor']) if request.args.get('cursor') else None
+    except ValueError:
+        return jsonify({'message': 'limit o cursor inválido'}), 400
+
+    query = User.query
+    q = (request.args.get('q') or '').strip()
+    if q:
+        pattern = _escape_like(q) + '%'
+        query = query.filter(or_(*[
+            column.like(pattern, escape='\\')
+            for column in (User.first_name, User.last_name, User.phone, User.username, User.email)
+        ]))
+    if request.args.get('role') == 'customer':
+        query = query.filter(or_(User.is_admin.is_(False), User.is_admin.is_(None)))
+    if cursor is not None:
+        query = query.filter(User.id < cursor)
+    users = query.order_by(User.id.desc()).limit(limit + 1).all()
+    next_cursor = str(users[limit - 1].id) if len(users) > limit else None
+    users = users[:limit]
+
+    # Agregados solo para los clientes de la página, sumando pedidos vivos y archivados
+    # (usa ix_order_user_created_at e ix_archived_order_user_created_at)
+    stats = {}
+    user_ids = [u.id for u in users]
+    for tier in TIERS if user_ids else ():
+        order = tier.order
+        rows = (db.session.query(order.user_id, func.count(order.id), func.max(order.created_at))
+                .filter(order.user_id.in_(user_ids)).group_by(order.user_id))
+        for user_id, order_count, last_order_at in rows:
+            previous_count, previous_last = stats.get(user_id, (0, None))
+            stats[user_id] = (previous_count + order_count,
+                              max(last_order_at, previous_last) if previous_last else last_order_at)
+
+    response = jsonify([{
         'id': u.id,
         'username': u.username,
         'email': u.email,
@@ -21,28 +92,24 @@ def list_users():
         'last_name': u.last_name,
         'phone': u.phone,
         'address': u.address,
-        'orders': [{
-            'id': o.id,
-            'total': o.total,
-            'created_at': o.created_at.isoformat(),
-            'info': (
-                {
-                  'order_type': (o.info.order_type if o.info else None),
-                  'table_number': (o.info.table_number if o.info else None),
-                  'delivery_address': (o.info.delivery_address if o.info else None),
-                  'delivery_phone': (o.info.delivery_phone if o.info else None),
-                  'payment_method': (o.info.payment_method if o.info else None)
-                } if o.info else None
-            )
-        } for o in u.orders]
-    } for u in users]), 200
+        'order_count': stats[u.id][0] if u.id in stats else 0,
+        'last_order_at': stats[u.id][1].isoformat() if u.id in stats else None,
+    } for u in users])
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response, 200
+
+@admin_bp.get('/customers/<int:user_id>/orders')
+@admin_required()
+def list_customer_orders(user_id: int):
+    """Pedidos de un cliente, con los mismos filtros y paginación que ``/api/orders``."""
+    if not db.session.get(User, user_id):
+        return jsonify({'message': 'Cliente no encontrado'}), 404
+    return orders_page_response(user_id=user_id)
 
 @admin_bp.post('/users')
-@jwt_required()
+@admin_required()
 def create_user_by_admin():
-    claims = get_jwt()
-    if not claims.get('is_admin'):
-        return jsonify({'message': 'No autorizado'}), 403
     data = request.get_json() or {}
     username = data.get('username', '').strip()
     email = (data.get('email') or '').strip()
@@ -69,17 +136,16 @@ def create_user_by_admin():
                 first_name=first_name or None, last_name=last_name or None,
                 phone=phone or None, address=address or None)
     if password:
-        user.set_password(password)
+        user.password_hash = hash_password(password)
     db.session.add(user)
+    db.session.flush()
+    record_change(USER_CHANGE, user.id)
     db.session.commit()
     return jsonify({'id': user.id, 'username': user.username, 'email': user.email, 'is_admin': user.is_admin}), 201
 
 @admin_bp.put('/users/<int:user_id>')
-@jwt_required()
+@admin_required()
 def update_user_by_admin(user_id: int):
-    claims = get_jwt()
-    if not claims.get('is_admin'):
-        return jsonify({'message': 'No autorizado'}), 403
     user = User.query.get_or_404(user_id)
     data = request.get_json() or {}
 
@@ -101,16 +167,14 @@ def update_user_by_admin(user_id: int):
     user.phone = phone or None
     user.address = address or None
     user.email = email or None
+    record_change(USER_CHANGE, user.id)
     db.session.commit()
     return jsonify({'message': 'Cliente actualizado'}), 200
 
-@admin_bp.post('/orders')
-@jwt_required()
-def create_order_by_admin():
-    claims = get_jwt()
-    if not claims.get('is_admin'):
-        return jsonify({'message': 'No autorizado'}), 403
-    data = request.get_json() or {}
+MAX_BATCH_ORDERS = 200
+
+def _parse_order_payload(data: dict):
+    """Valida y normaliza un pedido. Devuelve ``(pedido, None)`` o ``(None, mensaje)``."""
     user_id = data.get('user_id')
     items = data.get('items') or []
     order_type = (data.get('order_type') or '').strip().lower()
@@ -120,11 +184,15 @@ def create_order_by_admin():
     payment_method = (data.get('payment_method') or '').strip()
 
     if not user_id:
-        return jsonify({'message': 'user_id es requerido'}), 400
+        return None, 'user_id es requerido'
+    try:
+        user_id = int(user_id)
+    except (TypeError, ValueError):
+        return None, 'user_id inválido'
     if not items:
-        return jsonify({'message': 'items es requerido'}), 400
+        return None, 'items es requerido'
     if order_type not in ('mesa', 'delivery'):
-        return jsonify({'message': "order_type debe ser 'mesa' o 'delivery'"}), 400
+        return None, "order_type debe ser 'mesa' o 'delivery'"
 
     # Validación mesa/delivery
     if order_type == 'mesa':
@@ -134,29 +202,144 @@ def create_order_by_admin():
                 raise ValueError
             table_number = tn
         except Exception:
-            return jsonify({'message': 'Número de mesa inválido'}), 400
+            return None, 'Número de mesa inválido'
     if order_type == 'delivery':
         if not delivery_address:
-            return jsonify({'message': 'Dirección de entrega requerida'}), 400
+            return None, 'Dirección de entrega requerida'
 
-    order = Order(user_id=user_id, total=0.0)
-    db.session.add(order)
-    total = 0.0
-    for i in items:
-        pid = i.get('product_id')
-        qty = int(i.get('quantity', 1))
-        p = Product.query.get(pid)
-        if not p:
+    try:
+        lines = [(int(i.get('product_id')), max(1, int(i.get('quantity', 1)))) for i in items]
+    except (AttributeError, TypeError, ValueError):
+        return None, 'items inválido'
+    return {
+        'user_id': user_id,
+        'lines': lines,
+        'info': {
+            'order_type': order_type,
+            'table_number': table_number if order_type == 'mesa' else None,
+            'delivery_address': delivery_address if order_type == 'delivery' else None,
+            'delivery_phone': delivery_phone if order_type == 'delivery' else None,
+            'payment_method': payment_method or None,
+        },
+    }, None
+
+def _load_products(product_ids) -> dict:
+    """Productos vigentes pedidos, desde la instantánea del catálogo (misma versión para todo el pedido)."""
+    catalog = get_catalog()
+    return {pid: catalog.get(pid) for pid in product_ids if catalog.get(pid)}
+
+@admin_bp.post('/orders')
+@admin_required()
+def create_order_by_admin():
+    parsed, error = _parse_order_payload(request.get_json() or {})
+    if error:
+        return jsonify({'message': error}), 400
+    if not db.session.get(User, parsed['user_id']):
+        return jsonify({'message': 'Cliente no existe'}), 404
+
+    products = _load_products(pid for pid, _ in parsed['lines'])
+    for pid, _ in parsed['lines']:
+        if pid not in products:
             return jsonify({'message': f'Producto {pid} no existe'}), 404
-        oi = OrderItem(order=order, product_id=pid, quantity=max(1, qty), price_at_purchase=p.price)
-        db.session.add(oi)
-        total += max(1, qty) * p.price
-    order.total = total
-    info = OrderInfo(order=order, order_type=order_type,
-                     table_number=table_number if order_type == 'mesa' else None,
-                     delivery_address=delivery_address if order_type == 'delivery' else None,
-                     delivery_phone=delivery_phone if order_type == 'delivery' else None,
-                     payment_method=payment_method or None)
-    db.session.add(info)
+
+    total = order_total((qty, products[pid].price) for pid, qty in parsed['lines'])
+    order = Order(user_id=parsed['user_id'], total=total)
+    db.session.add(order)
+    for pid, qty in parsed['lines']:
+        db.session.add(OrderItem(order=order, product_id=pid, product_version_id=products[pid].version_id,
+                                 quantity=qty, price_at_purchase=products[pid].price))
+    db.session.add(OrderInfo(order=order, **parsed['info']))
+    db.session.flush()
+    record_order_changes([order])
     db.session.commit()
-    return jsonify({'message': 'Pedido creado', 'order_id': order.id, 'total': total}), 201
\ No newline at end of file
+    publish_order_event('order_created', order)
+    return jsonify({'message': 'Pedido creado', 'order_id': order.id, 'total': total}), 201
+
+@admin_bp.post('/orders/batch')
+@admin_required()
+def create_orders_batch():
+    """Crea varios pedidos en una sola transacción (carga de comandas en hora punta).
+
+    Todo se valida antes de escribir: si algún pedido es inválido no se crea
+    ninguno y se devuelve el error de cada uno por su índice.
+    """
+    payload = (request.get_json() or {}).get('orders')
+    if not isinstance(payload, list) or not payload:
+        return jsonify({'message': 'orders es requerido'}), 400
+    if len(payload) > MAX_BATCH_ORDERS:
+        return jsonify({'message': f'Máximo {MAX_BATCH_ORDERS} pedidos por lote'}), 400
+
+    parsed_orders = []
+    errors = []
+    for index, raw in enumerate(payload):
+        parsed, error = _parse_order_payload(raw if isinstance(raw, dict) else {})
+        if error:
+            errors.append({'index': index, 'message': error})
+        parsed_orders.append(parsed)
+
+    valid = [p for p in parsed_orders if p]
+    products = _load_products(pid for p in valid for pid, _ in p['lines'])
+    user_ids = {p['user_id'] for p in valid}
+    existing_users = {uid for (uid,) in db.session.query(User.id).filter(User.id.in_(user_ids))} if user_ids else set()
+    for index, parsed in enumerate(parsed_orders):
+        if not parsed:
+            continue
+        missing = [pid for pid, _ in parsed['lines'] if pid not in products]
+        if missing:
+            errors.append({'index': index, 'message': f'Producto {missing[0]} no existe'})
+        elif parsed['user_id'] not in existing_users:
+            errors.append({'index': index, 'message': 'Cliente no existe'})
+    if errors:
+        return jsonify({'message': 'Lote inválido', 'errors': sorted(errors, key=lambda e: e['index'])}), 400
+
+    orders = [Order(user_id=p['user_id'], total=order_total((qty, products[pid].price) for pid, qty in p['lines']))
+              for p in parsed_orders]
+    db.session.add_all(orders)
+    db.session.flush()
+    db.session.execute(insert(OrderItem), [
+        {'order_id': order.id, 'product_id': pid, 'product_version_id': products[pid].version_id,
+         'quantity': qty, 'price_at_purchase': products[pid].price}
+        for order, parsed in zip(orders, parsed_orders) for pid, qty in parsed['lines']
+    ])
+    db.session.execute(insert(OrderInfo), [
+        {'order_id': order.id, **parsed['info']} for order, parsed in zip(orders, parsed_orders)
+    ])
+    record_order_changes(orders)
+    # Ids y totales se leen antes del commit: después los pedidos expiran y cada uno costaría un SELECT
+    results = [{'index': index, 'order_id': order.id, 'total': order.total} for index, order in enumerate(orders)]
+    events = [order_event_data(order) for order in orders]
+    db.session.commit()
+    publish_order_events('order_created', events)
+    return jsonify({'message': 'Pedidos creados', 'results': results}), 201
+
+EXPORT_FORMATS = {
+    'csv': (generate_csv, 'text/csv'),
+    'ndjson': (generate_ndjson, 'application/x-ndjson'),
+}
+
+@admin_bp.get('/orders/export')
+@admin_required()
+def export_orders():
+    """Exporta pedidos en streaming: ``format=csv|ndjson``, ``status`` (por defecto ``pagado``, o ``all``)
+    y los filtros de ``/api/orders`` (``from``/``to``, ``order_type``, ``payment_method``...)."""
+    fmt = (request.args.get('format') or 'csv').strip().lower()
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({'message': "format debe ser 'csv' o 'ndjson'"}), 400
+    status = (request.args.get('status') or 'pagado').strip().lower()
+    if status != 'all' and status not in EXPORT_STATUSES:
+        return jsonify({'message': 'status inválido'}), 400
+    try:
+        # Con status=pagado o all también se exporta el archivo de pedidos
+        query = chronological([apply_order_filters(export_query(status, tier), request.args, tier)
+                               for tier in export_tiers(status)])
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+
+    generate, mimetype = EXPORT_FORMATS[fmt]
+    period = '_'.join(filter(None, (request.args.get('from'), request.args.get('to')))) or 'todo'
+    # stream_with_context mantiene la sesión de BD abierta mientras el generador lee el cursor
+    return Response(stream_with_context(generate(query)), mimetype=mimetype, headers={
+        'Content-Disposition': f'attachment; filename=pedidos_{status}_{period}.{fmt}',
+        'Cache-Control': 'no-store',
+        'X-Accel-Buffering': 'no',
+    })
@@ -1,8 +1,24 @@
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import create_access_token, jwt_required, get_jwt
-from models import db, User
+from flask_jwt_extended import (create_access_token, create_refresh_token, decode_token, jwt_required,
+                                get_jwt, get_jwt_identity)
+from datetime import datetime
+import click
+from models import db, User, RevokedToken
+from auth import get_revocation_list
+from passwords import HashingBusy, hash_password, verify_password
+import ratelimit
+from sync import USER, record_change
 
-auth_bp = Blueprint('auth', __name__, url_prefix='/api/auth')
+auth_bp = Blueprint('auth', __name__, url_prefix='/api/auth', cli_group='auth')
+
+@auth_bp.errorhandler(HashingBusy)
+def hashing_busy(_error):
+    response = jsonify({'message': 'Servidor ocupado, inténtalo en unos segundos'})
+    response.headers['Retry-After'] = '1'
+    return response, 503
+
+def _token_claims(user: User) -> dict:
+    return {'is_admin': user.is_admin, 'username': user.username}
 
 @auth_bp.post('/register')
 def register():
@@ -12,14 +28,19 @@ def register():
     password = data.get('password')
     if not all([username, email, password]):
         return jsonify({'message': 'Faltan campos requeridos'}), 400
+    limited = ratelimit.enforce(('register:ip', ratelimit.client_ip(), 'REGISTER_RATE_PER_IP'))
+    if limited:
+        return limited
     if User.query.filter((User.username == username) | (User.email == email)).first():
         return jsonify({'message': 'Usuario o correo ya existe'}), 400
     user = User(username=username, email=email)
     # Primer usuario registrado será admin por conveniencia en desarrollo
     if User.query.count() == 0:
         user.is_admin = True
-    user.set_password(password)
+    user.password_hash = hash_password(password)
     db.session.add(user)
+    db.session.flush()
+    record_change(USER, user.id)
     db.session.commit()
     return jsonify({'message': 'Registro exitoso', 'is_admin': user.is_admin}), 201
 
@@ -28,22 +49,60 @@ def login():
     data = request.get_json() or {}
     username = data.get('username')
     password = data.get('password')
+    limited = ratelimit.enforce(
+        ('login:ip', ratelimit.client_ip(), 'LOGIN_RATE_PER_IP'),
+        ('login:user', (username or '').strip().lower(), 'LOGIN_RATE_PER_USER'),
+    )
+    if limited:
+        return limited
     user = User.query.filter_by(username=username).first()
-    if not user or not user.check_password(password):
+    if not user or not verify_password(user, password):
         return jsonify({'message': 'Credenciales inválidas'}), 401
-    claims = {'is_admin': user.is_admin, 'username': user.username}
+    # verify_password pudo renovar un hash con parámetros antiguos
+    db.session.commit()
+    claims = _token_claims(user)
     # PyJWT puede exigir que 'sub' (identity) sea cadena; usamos str(user.id)
     access_token = create_access_token(identity=str(user.id), additional_claims=claims)
-    return jsonify({'access_token': access_token, 'user': {
+    refresh_token = create_refresh_token(identity=str(user.id))
+    return jsonify({'access_token': access_token, 'refresh_token': refresh_token, 'user': {
         'id': user.id,
         'username': user.username,
         'email': user.email,
         'is_admin': user.is_admin
     }}), 200
 
+@auth_bp.post('/refresh')
+@jwt_required(refresh=True)
+def refresh():
+    # Los claims se releen de la base: un cambio de rol se aplica en el siguiente refresh
+    user = db.session.get(User, int(get_jwt_identity()))
+    if not user:
+        return jsonify({'message': 'Usuario no existe'}), 401
+    access_token = create_access_token(identity=str(user.id), additional_claims=_token_claims(user))
+    return jsonify({'access_token': access_token}), 200
+
 @auth_bp.post('/logout')
-@jwt_required()
+@jwt_required(verify_type=False)
 def logout():
-    # En JWT, el logout se maneja en el cliente (borrar token).
-    # Endpoint informativo para UX.
-    return jsonify({'message': 'Logout exitoso'}), 200
\ No newline at end of file
+    # Revoca el token con el que se llama (access o refresh) y, si viene en el
+    # cuerpo, también el refresh token de la sesión
+    revocations = get_revocation_list()
+    user_id = int(get_jwt_identity())
+    revocations.revoke(get_jwt(), user_id=user_id)
+    refresh_token = (request.get_json(silent=True) or {}).get('refresh_token')
+    if refresh_token:
+        try:
+            payload = decode_token(refresh_token)
+        except Exception:
+            payload = None
+        if payload and payload.get('sub') == str(user_id):
+            revocations.revoke(payload, user_id=user_id)
+    db.session.commit()
+    return jsonify({'message': 'Logout exitoso'}), 200
+
+@auth_bp.cli.command('purge-revoked')
+def purge_revoked():
+    """Borra los tokens revocados que ya expiraron."""
+    deleted = RevokedToken.query.filter(RevokedToken.expires_at <= datetime.utcnow()).delete(synchronize_session=False)
+    db.session.commit()
+    click.echo(f'{deleted} tokens expirados eliminados')
\ No newline at end of file
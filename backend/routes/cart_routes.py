@@ -1,47 +1,169 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app, abort
 from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
-from models import db, Product, CartItem, Order, OrderItem, OrderInfo, User
+from sqlalchemy import insert, update
+from sqlalchemy.exc import IntegrityError
+from models import db, CartItem, Order, OrderItem, OrderInfo, User, IdempotencyKey
+from events import publish_order_event
+from money import order_total
+from cache import cart_cache, etag_json_response
+from catalog import catalog_version_subquery, get_catalog
+from upsert import upsert_increment, upsert_set
+from sync import record_cart_changes, record_order_changes
 
 cart_bp = Blueprint('cart', __name__, url_prefix='/api/cart')
 
+class _CartChanged(Exception):
+    pass
+
+CART_OPS = ('add', 'set', 'remove')
+MAX_CART_OPS = 100
+
+def _cart_snapshot(user_id: int, cart_version: int, catalog) -> dict:
+    # Solo las líneas: nombres y precios salen de la instantánea del catálogo
+    lines = (db.session.query(CartItem.id, CartItem.product_id, CartItem.quantity)
+             .filter(CartItem.user_id == user_id)
+             .order_by(CartItem.id)
+             .all())
+    rows = [(item_id, quantity, catalog.get(product_id)) for item_id, product_id, quantity in lines
+            if catalog.get(product_id)]
+    items = [{
+        'id': item_id,
+        'product': {'id': p.id, 'name': p.name, 'price': p.price, 'image_url': p.image_url},
+        'quantity': quantity,
+        'subtotal': quantity * p.price,
+    } for item_id, quantity, p in rows]
+    total = order_total((quantity, p.price) for _, quantity, p in rows)
+    return {'items': items, 'total': total, 'version': cart_version}
+
+def _cart_response(user_id: int, status: int = 200):
+    """Carrito desde la caché de snapshots (o recién construido), con ETag e ``If-None-Match``."""
+    cart_version, catalog_version = _cart_versions(user_id)
+    # El snapshot depende del carrito y de los precios: vale mientras no cambie ninguna de las dos versiones
+    version = (cart_version, catalog_version)
+    cached = cart_cache.get(user_id, version)
+    if cached is None:
+        catalog = get_catalog(version=catalog_version)
+        cached = cart_cache.put(user_id, version, _cart_snapshot(user_id, cart_version, catalog),
+                                current_app.config.get('PUBLIC_CACHE_TTL', 10))
+    body, etag = cached
+    return etag_json_response(body, etag, 'private, no-cache', status)
+
+def cart_snapshot(user_id: int) -> dict:
+    """El carrito como dict (lo mismo que ``GET /api/cart/``), para anidarlo en otras respuestas."""
+    cart_version, catalog_version = _cart_versions(user_id)
+    return _cart_snapshot(user_id, cart_version, get_catalog(version=catalog_version))
+
+def _cart_versions(user_id: int):
+    """Versión del carrito y del catálogo en una sola consulta."""
+    row = (db.session.query(User.cart_version, catalog_version_subquery())
+           .filter(User.id == user_id).one_or_none())
+    return (row[0] or 0, row[1] or 0) if row else (0, 0)
+
+def _bump_cart_version(user_id: int, expected: int = None) -> bool:
+    """Incrementa la versión del carrito y anota el cambio (sin commit); False si ``expected`` ya no es la actual."""
+    stmt = update(User).where(User.id == user_id).values(cart_version=User.cart_version + 1)
+    if expected is not None:
+        stmt = stmt.where(User.cart_version == expected)
+    if db.session.execute(stmt, execution_options={'synchronize_session': False}).rowcount != 1:
+        return False
+    record_cart_changes([user_id])
+    return True
+
 @cart_bp.get('/')
 @jwt_required()
 def get_cart():
     user_id = int(get_jwt_identity())
-    items = CartItem.query.filter_by(user_id=user_id).all()
-    result = []
-    total = 0.0
-    for i in items:
-        total += i.quantity * i.product.price
-        result.append({
-            'id': i.id,
-            'product': {
-                'id': i.product.id,
-                'name': i.product.name,
-                'price': i.product.price,
-                'image_url': i.product.image_url
-            },
-            'quantity': i.quantity,
-            'subtotal': i.quantity * i.product.price
-        })
-    return jsonify({'items': result, 'total': total}), 200
+    return _cart_response(user_id)
+
+def _parse_operations(data):
+    """Valida la lista de operaciones y la reduce a un efecto final por producto.
+
+    Devuelve ``({product_id: (op, cantidad)}, None)`` o ``(None, (mensaje, status))``.
+    """
+    operations = data.get('operations')
+    if not isinstance(operations, list) or not operations:
+        return None, ('Se requiere una lista de operaciones', 400)
+    if len(operations) > MAX_CART_OPS:
+        return None, (f'Máximo {MAX_CART_OPS} operaciones por petición', 400)
+    effects = {}
+    for index, raw in enumerate(operations):
+        try:
+            op = raw.get('op')
+            product_id = int(raw.get('product_id'))
+            quantity = int(raw.get('quantity', 1 if op == 'add' else 0))
+        except (AttributeError, TypeError, ValueError):
+            return None, (f'Operación {index} inválida', 400)
+        if op not in CART_OPS:
+            return None, (f"Operación {index}: op debe ser 'add', 'set' o 'remove'", 400)
+        if op == 'set' and quantity == 0:
+            op = 'remove'
+        if op != 'remove' and quantity < 1:
+            return None, (f'Operación {index}: cantidad inválida', 400)
+        previous = effects.get(product_id)
+        if op == 'add' and previous and previous[0] != 'remove':
+            # add tras add suma; add tras set deja un set con la suma
+            effects[product_id] = (previous[0], previous[1] + quantity)
+        elif op == 'add' and previous:
+            effects[product_id] = ('set', quantity)
+        else:
+            effects[product_id] = (op, quantity)
+    return effects, None
+
+@cart_bp.patch('/')
+@jwt_required()
+def patch_cart():
+    """Aplica varias operaciones ``add``/``set``/``remove`` en una sola transacción.
+
+    Con ``version`` en el cuerpo, falla con 409 si el carrito cambió desde esa versión.
+    """
+    user_id = int(get_jwt_identity())
+    data = request.get_json() or {}
+    effects, error = _parse_operations(data)
+    if error:
+        return jsonify({'message': error[0]}), error[1]
+    expected = data.get('version')
+    if expected is not None and not isinstance(expected, int):
+        return jsonify({'message': 'version inválida'}), 400
+
+    catalog = get_catalog()
+    missing = [pid for pid, (op, _) in effects.items() if op != 'remove' and not catalog.get(pid)]
+    if missing:
+        return jsonify({'message': 'Producto no encontrado', 'product_ids': missing}), 404
+
+    # La versión es la primera escritura: serializa los cambios concurrentes del mismo carrito
+    if not _bump_cart_version(user_id, expected):
+        db.session.rollback()
+        return jsonify({'message': 'El carrito cambió, vuelve a cargarlo', 'version': _cart_versions(user_id)[0]}), 409
+    removed = [pid for pid, (op, _) in effects.items() if op == 'remove']
+    if removed:
+        (CartItem.query.filter(CartItem.user_id == user_id, CartItem.product_id.in_(removed))
+         .delete(synchronize_session=False))
+    for product_id, (op, quantity) in effects.items():
+        keys = {'user_id': user_id, 'product_id': product_id}
+        if op == 'add':
+            upsert_increment(CartItem, keys=keys, deltas={'quantity': quantity})
+        elif op == 'set':
+            upsert_set(CartItem, keys=keys, values={'quantity': quantity})
+    db.session.commit()
+    return _cart_response(user_id)
 
 @cart_bp.post('/')
 @jwt_required()
 def add_to_cart():
     user_id = int(get_jwt_identity())
     data = request.get_json() or {}
-    product_id = data.get('product_id')
+    try:
+        product_id = int(data.get('product_id'))
+    except (TypeError, ValueError):
+        return jsonify({'message': 'product_id inválido'}), 400
     quantity = int(data.get('quantity', 1))
-    p = Product.query.get_or_404(product_id)
-    item = CartItem.query.filter_by(user_id=user_id, product_id=product_id).first()
-    if item:
-        item.quantity += quantity
-    else:
-        item = CartItem(user_id=user_id, product_id=product_id, quantity=quantity)
-        db.session.add(item)
+    if not get_catalog().get(product_id):
+        abort(404)
+    _bump_cart_version(user_id)
+    upsert_increment(CartItem, keys={'user_id': user_id, 'product_id': product_id}, deltas={'quantity': quantity})
     db.session.commit()
-    return jsonify({'message': 'Agregado al carrito', 'item_id': item.id}), 201
+    item_id = db.session.query(CartItem.id).filter_by(user_id=user_id, product_id=product_id).scalar()
+    return jsonify({'message': 'Agregado al carrito', 'item_id': item_id}), 201
 
 @cart_bp.put('/<int:item_id>')
 @jwt_required()
@@ -53,6 +175,7 @@ def update_cart_item(item_id):
     data = request.get_json() or {}
     quantity = int(data.get('quantity', item.quantity))
     item.quantity = max(1, quantity)
+    _bump_cart_version(user_id)
     db.session.commit()
     return jsonify({'message': 'Cantidad actualizada'}), 200
 
@@ -64,18 +187,47 @@ def delete_cart_item(item_id):
     if item.user_id != user_id:
         return jsonify({'message': 'No autorizado'}), 403
     db.session.delete(item)
+    _bump_cart_version(user_id)
     db.session.commit()
     return jsonify({'message': 'Item eliminado'}), 200
 
+def _replay(record: IdempotencyKey):
+    response = current_app.response_class(record.response_body, status=record.status_code,
+                                          mimetype='application/json')
+    response.headers['Idempotent-Replayed'] = 'true'
+    return response
+
+def _find_idempotent(user_id: int, key: str):
+    if not key:
+        return None
+    return IdempotencyKey.query.filter_by(user_id=user_id, key=key).first()
+
 @cart_bp.post('/checkout')
 @jwt_required()
 def checkout():
-    # Identidad por defecto: el usuario autenticado
+    # Identidad por defecto: el usuario autenticado. Siempre se usa su carrito,
+    # también cuando un admin registra el pedido a nombre de un cliente.
     current_identity = int(get_jwt_identity())
     user_id = current_identity
-    items = CartItem.query.filter_by(user_id=user_id).all()
-    if not items:
+
+    # Un doble clic reenvía la misma clave: se devuelve la respuesta ya guardada
+    idempotency_key = (request.headers.get('Idempotency-Key') or '').strip()
+    if len(idempotency_key) > 255:
+        return jsonify({'message': 'Idempotency-Key demasiado larga'}), 400
+    previous = _find_idempotent(current_identity, idempotency_key)
+    if previous:
+        return _replay(previous)
+
+    # Todas las líneas se cobran con la misma versión del catálogo, aunque se edite un precio a la vez
+    catalog = get_catalog()
+    cart_lines = (db.session.query(CartItem.product_id, CartItem.quantity)
+                  .filter(CartItem.user_id == current_identity)
+                  .all())
+    if not cart_lines:
         return jsonify({'message': 'Carrito vacío'}), 400
+    if any(not catalog.get(product_id) for product_id, _ in cart_lines):
+        return jsonify({'message': 'Un producto del carrito ya no está disponible'}), 409
+    lines = [(catalog.get(product_id), quantity) for product_id, quantity in cart_lines]
     data = request.get_json() or {}
     order_type = (data.get('order_type') or '').strip().lower()
     table_number = data.get('table_number')
@@ -86,21 +238,15 @@ def checkout():
 
     # Si es admin y manda user_id, registrar el pedido para ese cliente
     claims = get_jwt()
-    clear_admin_cart = False
     if claims.get('is_admin') and override_user_id:
         try:
             candidate_id = int(override_user_id)
-            # Verificar que exista el usuario destino
-            if not User.query.get(candidate_id):
-                return jsonify({'message': 'Cliente destino no existe'}), 404
-            user_id = candidate_id
-            # Marcar para limpiar también el carrito del admin para mantener la UI consistente
-            clear_admin_cart = True
         except Exception:
             return jsonify({'message': 'user_id inválido'}), 400
-        # Usar los items del carrito del ADMIN para generar el pedido del cliente
-        # Esto permite que el operador arme el pedido y lo asigne al cliente seleccionado
-        items = CartItem.query.filter_by(user_id=current_identity).all()
+        # Verificar que exista el usuario destino
+        if not db.session.get(User, candidate_id):
+            return jsonify({'message': 'Cliente destino no existe'}), 404
+        user_id = candidate_id
 
     if order_type not in ('mesa', 'delivery'):
         return jsonify({'message': "order_type debe ser 'mesa' o 'delivery'"}), 400
@@ -116,27 +262,44 @@ def checkout():
         if not delivery_address:
             return jsonify({'message': 'Dirección de entrega requerida'}), 400
 
-    order = Order(user_id=user_id, total=0.0)
-    db.session.add(order)
-    total = 0.0
-    for i in items:
-        oi = OrderItem(order=order, product_id=i.product_id, quantity=i.quantity, price_at_purchase=i.product.price)
-        db.session.add(oi)
-        total += i.quantity * i.product.price
-        db.session.delete(i)
-    order.total = total
-    info = OrderInfo(order=order, order_type=order_type, table_number=table_number if order_type == 'mesa' else None,
-                     delivery_address=delivery_address if order_type == 'delivery' else None,
-                     delivery_phone=delivery_phone if order_type == 'delivery' else None,
-                     payment_method=payment_method)
-    db.session.add(info)
-    
-    # Si el pedido lo realizó un administrador en nombre de un cliente,
-    # limpiamos también el carrito del administrador para evitar confusiones en la interfaz.
-    if clear_admin_cart:
-        admin_items = CartItem.query.filter_by(user_id=current_identity).all()
-        for ai in admin_items:
-            db.session.delete(ai)
-    
-    db.session.commit()
-    return jsonify({'message': 'Pedido finalizado', 'order_id': order.id, 'total': total, 'order_type': order_type}), 201
\ No newline at end of file
+    try:
+        # Vaciar el carrito es la primera escritura de la transacción: si otro
+        # checkout concurrente ya lo vació (o cambió), el número de filas no coincide.
+        deleted = (CartItem.query.filter_by(user_id=current_identity)
+                   .delete(synchronize_session=False))
+        if deleted != len(lines):
+            raise _CartChanged()
+        _bump_cart_version(current_identity)
+
+        total = order_total((quantity, product.price) for product, quantity in lines)
+        order = Order(user_id=user_id, total=total)
+        db.session.add(order)
+        db.session.flush()
+        db.session.execute(insert(OrderItem), [
+            {'order_id': order.id, 'product_id': product.id, 'product_version_id': product.version_id,
+             'quantity': quantity, 'price_at_purchase': product.price}
+            for product, quantity in lines
+        ])
+        info = OrderInfo(order_id=order.id, order_type=order_type,
+                         table_number=table_number if order_type == 'mesa' else None,
+                         delivery_address=delivery_address if order_type == 'delivery' else None,
+                         delivery_phone=delivery_phone if order_type == 'delivery' else None,
+                         payment_method=payment_method)
+        db.session.add(info)
+        record_order_changes([order])
+
+        body = {'message': 'Pedido finalizado', 'order_id': order.id, 'total': total, 'order_type': order_type}
+        if idempotency_key:
+            db.session.add(IdempotencyKey(user_id=current_identity, key=idempotency_key, status_code=201,
+                                          response_body=current_app.json.dumps(body)))
+        db.session.commit()
+    except (_CartChanged, IntegrityError):
+        db.session.rollback()
+        # Otra petición con la misma clave ganó la carrera: repetir su respuesta
+        previous = _find_idempotent(current_identity, idempotency_key)
+        if previous:
+            return _replay(previous)
+        return jsonify({'message': 'El carrito cambió durante el checkout, inténtalo de nuevo'}), 409
+
+    publish_order_event('order_created', order)
+    return jsonify(body), 201
@@ -1,58 +1,203 @@
 from flask import Blueprint, jsonify, request
-from flask_jwt_extended import jwt_required, get_jwt
-from datetime import date
-from models import db, Product, DailyMenuItem
+import click
+from datetime import timedelta
+from sqlalchemy.exc import IntegrityError
+from auth import admin_required
+from models import db, DailyMenuItem, MenuTemplate, MenuTemplateItem
+from cache import body_etag, etag_json_response
+from catalog import get_catalog
+from menus import (MAX_MENU_DAYS, build_snapshots, business_today, days_between, get_snapshots, menus_between,
+                   parse_day, replace_days, validate_products)
+from sync import MENU, record_change
 
-menu_bp = Blueprint('menu', __name__, url_prefix='/api/menu')
+menu_bp = Blueprint('menu', __name__, url_prefix='/api/menu', cli_group='menu')
+
+def _day_response(day):
+    body, etag = get_snapshots(day, day)[day]
+    return etag_json_response(body, etag)
 
 @menu_bp.get('/today')
 def get_today_menu():
-    today = date.today()
-    items = DailyMenuItem.query.filter_by(date=today).all()
-    products = [
-        {
-            'id': i.product.id,
-            'name': i.product.name,
-            'description': i.product.description,
-            'price': i.product.price,
-            'image_url': i.product.image_url,
-        }
-        for i in items
-    ]
-    return jsonify(products), 200
+    return _day_response(business_today())
+
+@menu_bp.get('/days/<day>')
+def get_menu_for_day(day: str):
+    try:
+        day = parse_day(day, 'fecha')
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    return _day_response(day)
+
+@menu_bp.get('/days')
+def get_menu_range():
+    """Menús de ``from`` a ``to`` (por defecto, los 7 días desde hoy) como ``{fecha: [productos]}``."""
+    try:
+        start = parse_day(request.args['from'], 'from') if request.args.get('from') else business_today()
+        end = parse_day(request.args['to'], 'to') if request.args.get('to') else start + timedelta(days=6)
+        snapshots = get_snapshots(start, end)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    # Los snapshots ya son JSON: se concatenan sin volver a serializar
+    body = '{' + ','.join(f'"{day.isoformat()}":{snapshots[day][0]}' for day in sorted(snapshots)) + '}'
+    return etag_json_response(body, body_etag(body))
+
+@menu_bp.put('/days')
+@admin_required()
+def replace_menu_days():
+    """Sustituye en una transacción el menú de varias fechas: ``{"days": {"YYYY-MM-DD": [product_id, ...]}}``."""
+    raw = (request.get_json() or {}).get('days')
+    if not isinstance(raw, dict) or not raw:
+        return jsonify({'message': 'days es requerido'}), 400
+    if len(raw) > MAX_MENU_DAYS:
+        return jsonify({'message': f'Máximo {MAX_MENU_DAYS} días por petición'}), 400
+    try:
+        days = {parse_day(key, 'fecha'): validate_products(ids) for key, ids in raw.items()}
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    replace_days(days)
+    db.session.commit()
+    return jsonify({'message': 'Menús actualizados', 'dates': sorted(d.isoformat() for d in days)}), 200
+
+@menu_bp.post('/copy')
+@admin_required()
+def copy_menu_days():
+    """Copia ``days`` días desde ``source_from`` a partir de ``target_from`` (p. ej. la semana pasada a la próxima)."""
+    data = request.get_json() or {}
+    try:
+        count = int(data.get('days', 7))
+    except (TypeError, ValueError):
+        count = 0
+    if count < 1:
+        return jsonify({'message': 'days inválido'}), 400
+    try:
+        source_from = parse_day(data.get('source_from'), 'source_from')
+        target_from = parse_day(data.get('target_from'), 'target_from')
+        source = menus_between(source_from, source_from + timedelta(days=count - 1))
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    # Los productos borrados desde entonces no se copian
+    catalog = get_catalog()
+    days = {target_from + (day - source_from): [pid for pid in ids if catalog.get(pid)]
+            for day, ids in source.items()}
+    replace_days(days)
+    db.session.commit()
+    return jsonify({'message': 'Menús copiados', 'dates': sorted(d.isoformat() for d in days)}), 200
+
+def _serialize_template(template: MenuTemplate) -> dict:
+    return {
+        'id': template.id,
+        'name': template.name,
+        'items': [{'product_id': item.product_id, 'weekday': item.weekday} for item in template.items],
+    }
+
+@menu_bp.get('/templates')
+@admin_required()
+def list_menu_templates():
+    templates = MenuTemplate.query.order_by(MenuTemplate.name).all()
+    return jsonify([_serialize_template(t) for t in templates]), 200
+
+@menu_bp.post('/templates')
+@admin_required()
+def create_menu_template():
+    """``{"name": ..., "items": [{"product_id": 1, "weekday": 4}, ...]}``; sin ``weekday`` vale para todos los días."""
+    data = request.get_json() or {}
+    name = (data.get('name') or '').strip()
+    items = data.get('items')
+    if not name:
+        return jsonify({'message': 'Nombre requerido'}), 400
+    if not isinstance(items, list) or not items:
+        return jsonify({'message': 'items es requerido'}), 400
+    try:
+        weekdays = [None if item.get('weekday') is None else int(item['weekday']) for item in items]
+        if any(w is not None and not 0 <= w <= 6 for w in weekdays):
+            raise ValueError('weekday debe estar entre 0 (lunes) y 6 (domingo)')
+        product_ids = [item.get('product_id') for item in items]
+        validate_products(list(dict.fromkeys(product_ids)))
+    except AttributeError:
+        return jsonify({'message': 'items inválido'}), 400
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    template = MenuTemplate(name=name, items=[
+        MenuTemplateItem(product_id=int(pid), weekday=weekday) for pid, weekday in zip(product_ids, weekdays)
+    ])
+    db.session.add(template)
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({'message': 'Ya existe una plantilla con ese nombre'}), 400
+    return jsonify(_serialize_template(template)), 201
+
+@menu_bp.delete('/templates/<int:template_id>')
+@admin_required()
+def delete_menu_template(template_id: int):
+    template = MenuTemplate.query.get_or_404(template_id)
+    db.session.delete(template)
+    db.session.commit()
+    return jsonify({'message': 'Plantilla eliminada'}), 200
+
+@menu_bp.post('/templates/<int:template_id>/apply')
+@admin_required()
+def apply_menu_template(template_id: int):
+    """Sustituye el menú de cada fecha de ``from`` a ``to`` por los productos de la plantilla para ese día."""
+    template = MenuTemplate.query.get_or_404(template_id)
+    data = request.get_json() or {}
+    try:
+        start = parse_day(data.get('from'), 'from')
+        end = parse_day(data.get('to'), 'to') if data.get('to') else start + timedelta(days=6)
+        dates = days_between(start, end)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    catalog = get_catalog()
+    days = {day: list(dict.fromkeys(item.product_id for item in template.items
+                                    if item.weekday in (None, day.weekday()) and catalog.get(item.product_id)))
+            for day in dates}
+    replace_days(days)
+    db.session.commit()
+    return jsonify({'message': 'Plantilla aplicada', 'dates': [d.isoformat() for d in dates]}), 200
 
 @menu_bp.post('/add')
-@jwt_required()
+@admin_required()
 def add_to_today_menu():
-    claims = get_jwt()
-    if not claims.get('is_admin'):
-        return jsonify({'message': 'No autorizado'}), 403
     data = request.get_json() or {}
     product_id = data.get('product_id')
     if not product_id:
         return jsonify({'message': 'product_id es requerido'}), 400
-    product = Product.query.get(product_id)
-    if not product:
+    try:
+        product_id = int(product_id)
+    except (TypeError, ValueError):
+        return jsonify({'message': 'product_id inválido'}), 400
+    if not get_catalog().get(product_id):
         return jsonify({'message': 'Producto no encontrado'}), 404
-    today = date.today()
+    today = business_today()
     exists = DailyMenuItem.query.filter_by(product_id=product_id, date=today).first()
     if exists:
         return jsonify({'message': 'El producto ya está en el menú de hoy'}), 200
     item = DailyMenuItem(product_id=product_id, date=today)
     db.session.add(item)
+    build_snapshots([today])
+    record_change(MENU, today)
     db.session.commit()
     return jsonify({'message': 'Añadido al menú de hoy'}), 201
 
 @menu_bp.delete('/remove/<int:product_id>')
-@jwt_required()
+@admin_required()
 def remove_from_today_menu(product_id: int):
-    claims = get_jwt()
-    if not claims.get('is_admin'):
-        return jsonify({'message': 'No autorizado'}), 403
-    today = date.today()
+    today = business_today()
     item = DailyMenuItem.query.filter_by(product_id=product_id, date=today).first()
     if not item:
         return jsonify({'message': 'No encontrado en el menú de hoy'}), 404
     db.session.delete(item)
+    build_snapshots([today])
+    record_change(MENU, today)
+    db.session.commit()
+    return jsonify({'message': 'Eliminado del menú de hoy'}), 200
+
+@menu_bp.cli.command('build-snapshots')
+@click.option('--days', default=7, show_default=True, help='Días a preparar desde hoy (hora local).')
+def build_snapshots_command(days: int):
+    """Reconstruye los snapshots de menú de hoy en adelante (p. ej. con un cron a medianoche)."""
+    today = business_today()
+    built = build_snapshots(days_between(today, today + timedelta(days=days - 1)))
     db.session.commit()
-    return jsonify({'message': 'Eliminado del menú de hoy'}), 200
\ No newline at end of file
+    click.echo(f'{len(built)} snapshots de menú reconstruidos')
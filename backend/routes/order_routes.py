@@ -1,108 +1,229 @@
-from flask import Blueprint, jsonify, request
-from datetime import datetime
+from flask import Blueprint, Response, current_app, jsonify, request
+from datetime import datetime, timedelta
 from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
-from models import db, Order, OrderItem, OrderInfo, User, OrderStatus
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import contains_eager, joinedload, selectinload
+from models import db, Order, OrderStatusHistory
+from events import get_broker, publish_order_event
+from reports import apply_paid_order
+from serializers import ORDER, plan_from_request
+from sync import record_order_changes
+from archive import ARCHIVE, LIVE, archive_paid_orders, is_archived, newest_archived_at, tier_counts, tiers_for
+import base64
+import click
+import heapq
+import json
 
-order_bp = Blueprint('order', __name__, url_prefix='/api/orders')
+order_bp = Blueprint('order', __name__, url_prefix='/api/orders', cli_group='orders')
 
-@order_bp.get('/')
-@jwt_required()
-def get_orders():
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+def orders_feed_query(paid=None, user_id=None, tier=LIVE):
+    """Consulta única para los listados de pedidos de un nivel (vivo o archivo).
+
+    El estado es una columna indexada de ``Order`` y usuario, info, items y
+    versiones de producto se cargan en bloque, de modo que el número de consultas no
+    depende de la cantidad de pedidos. ``paid=None`` no filtra por estado y
+    ``user_id=None`` incluye los pedidos de todos los clientes.
+    """
+    order = tier.order
+    query = (
+        order.query
+        .outerjoin(tier.info, tier.info.order_id == order.id)
+        .options(
+            contains_eager(order.info),
+            joinedload(order.user),
+            selectinload(order.items).joinedload(tier.item.product_version),
+        )
+    )
+    if paid:
+        query = query.filter(order.status == 'pagado')
+    elif paid is not None:
+        query = query.filter(order.status != 'pagado')
+    if user_id is not None:
+        query = query.filter(order.user_id == user_id)
+    return query.order_by(order.created_at.desc(), order.id.desc())
+
+def _parse_date(value: str, name: str):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d')
+    except ValueError:
+        raise ValueError(f'{name} debe tener formato YYYY-MM-DD')
+
+def apply_order_filters(query, args, tier=LIVE):
+    """Aplica en SQL los filtros opcionales de la query string.
+
+    Espera que la tabla de info del nivel ya esté unida a la consulta. Lanza ``ValueError``
+    con un mensaje para el cliente si algún parámetro es inválido.
+    """
+    order, info = tier.order, tier.info
+    date_from = args.get('from')
+    if date_from:
+        query = query.filter(order.created_at >= _parse_date(date_from, 'from'))
+    date_to = args.get('to')
+    if date_to:
+        # 'to' es inclusivo: se incluye el día completo
+        query = query.filter(order.created_at < _parse_date(date_to, 'to') + timedelta(days=1))
+    order_type = (args.get('order_type') or '').strip().lower()
+    if order_type:
+        query = query.filter(info.order_type == order_type)
+    payment_method = (args.get('payment_method') or '').strip().lower()
+    if payment_method:
+        query = query.filter(info.payment_method == payment_method)
+    table_number = args.get('table_number')
+    if table_number:
+        try:
+            query = query.filter(info.table_number == int(table_number))
+        except ValueError:
+            raise ValueError('table_number inválido')
+    customer = args.get('customer')
+    if customer:
+        try:
+            query = query.filter(order.user_id == int(customer))
+        except ValueError:
+            raise ValueError('customer inválido')
+    return query
+
+def encode_cursor(order: Order) -> str:
+    raw = f"{order.created_at.isoformat()}|{order.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+def decode_cursor(cursor: str):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created_at, order_id = base64.urlsafe_b64decode(padded.encode()).decode().split('|')
+        return datetime.fromisoformat(created_at), int(order_id)
+    except Exception:
+        raise ValueError('cursor inválido')
+
+def page_size(args):
+    """``limit`` de la query string, o ``None`` sin ``limit`` ni ``cursor`` (lista completa, por compatibilidad)."""
+    limit = args.get('limit')
+    if limit is None and args.get('cursor') is None:
+        return None
+    try:
+        return min(max(int(limit or DEFAULT_PAGE_SIZE), 1), MAX_PAGE_SIZE)
+    except ValueError:
+        raise ValueError('limit inválido')
+
+def paginate_orders(query, args, tier=LIVE):
+    """Paginación por keyset sobre (created_at, id), ambos descendentes.
+
+    Devuelve ``(orders, has_more)``.
+    """
+    limit = page_size(args)
+    if limit is None:
+        return query.all(), False
+    order = tier.order
+    cursor = args.get('cursor')
+    if cursor:
+        created_at, order_id = decode_cursor(cursor)
+        query = query.filter(or_(
+            order.created_at < created_at,
+            and_(order.created_at == created_at, order.id < order_id),
+        ))
+    orders = query.limit(limit + 1).all()
+    return orders[:limit], len(orders) > limit
+
+def _archive_cannot_contribute(live_page, limit) -> bool:
+    """El archivo está vacío o la página viva ya está completa con pedidos más recientes que todo él."""
+    newest = newest_archived_at()
+    if newest is None:
+        return True
+    orders, has_more = live_page
+    return limit is not None and has_more and orders[-1].created_at > newest
+
+def orders_page_response(paid=None, user_id=None):
+    """Pedidos de ambos niveles con filtros, paginación y campos (``fields``/``include``) de la query string.
+
+    Cada nivel aporta su página ya ordenada y se mezclan por (created_at, id):
+    el cursor es el mismo que si todos los pedidos vivieran en una sola tabla.
+    """
+    try:
+        plan = plan_from_request(ORDER)
+        limit = page_size(request.args)
+        pages = []
+        for tier in tiers_for(paid):
+            if tier is ARCHIVE and _archive_cannot_contribute(pages[0], limit):
+                continue
+            query = apply_order_filters(orders_feed_query(paid, user_id, tier), request.args, tier)
+            pages.append(paginate_orders(query.options(*plan.load_options(tier.order)), request.args, tier))
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    orders = list(heapq.merge(*(page for page, _ in pages), key=lambda o: (o.created_at, o.id), reverse=True))
+    next_cursor = None
+    if limit is not None and (len(orders) > limit or any(has_more for _, has_more in pages)):
+        orders = orders[:limit]
+        next_cursor = encode_cursor(orders[-1])
+    response = jsonify(plan.dump_many(orders))
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response, 200
+
+def _orders_response(paid: bool):
     user_id = int(get_jwt_identity())
     claims = get_jwt()
-    
     # Si es admin, puede ver todos los pedidos, sino solo los suyos
-    if claims.get('is_admin'):
-        orders = Order.query.order_by(Order.created_at.desc()).all()
-    else:
-        orders = Order.query.filter_by(user_id=user_id).order_by(Order.created_at.desc()).all()
-    
-    result = []
-    for order in orders:
-        # Filtrar pedidos pagados fuera del listado principal
-        status_obj = OrderStatus.query.filter_by(order_id=order.id).first()
-        status_value = status_obj.status if status_obj else 'pendiente'
-        if status_value == 'pagado':
-            continue
-        # Obtener información del usuario que hizo el pedido
-        user = User.query.get(order.user_id)
-        
-        # Obtener items del pedido
-        items = []
-        for item in order.items:
-            items.append({
-                'id': item.id,
-                'product_name': item.product.name,
-                'quantity': item.quantity,
-                'price_at_purchase': item.price_at_purchase,
-                'subtotal': item.quantity * item.price_at_purchase
-            })
-        
-        # Obtener información adicional del pedido
-        order_info = order.info
-        order_data = {
-            'id': order.id,
-            'user_id': order.user_id,
-            'user_name': f"{user.first_name or ''} {user.last_name or ''}".strip() or user.username,
-            'total': order.total,
-            'created_at': order.created_at.isoformat(),
-            'items': items,
-            'order_type': order_info.order_type if order_info else 'mesa',
-            'table_number': order_info.table_number if order_info else None,
-            'delivery_address': order_info.delivery_address if order_info else None,
-            'delivery_phone': order_info.delivery_phone if order_info else None,
-            'payment_method': order_info.payment_method if order_info else None,
-            'status': status_value
-        }
-        result.append(order_data)
-    
-    return jsonify(result), 200
+    visible_user = None if claims.get('is_admin') else user_id
+    return orders_page_response(paid=paid, user_id=visible_user)
+
+@order_bp.get('/')
+@jwt_required()
+def get_orders():
+    # Los pedidos pagados quedan fuera del listado principal
+    return _orders_response(paid=False)
 
 @order_bp.get('/history')
 @jwt_required()
 def get_orders_history():
+    return _orders_response(paid=True)
+
+@order_bp.get('/stream')
+@jwt_required()
+def stream_orders():
+    """Server-Sent Events con altas de pedidos y cambios de estado.
+
+    Se reanuda desde la cabecera ``Last-Event-ID`` (o ``?last_event_id=``). Si el
+    id ya no está en el backlog se emite ``resync`` para que el cliente vuelva a
+    pedir el listado completo.
+    """
     user_id = int(get_jwt_identity())
-    claims = get_jwt()
+    is_admin = bool(get_jwt().get('is_admin'))
+    broker = get_broker()
+    heartbeat = current_app.config.get('EVENTS_HEARTBEAT', 15)
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    try:
+        cursor = int(last_event_id) if last_event_id else None
+    except ValueError:
+        cursor = None
 
-    if claims.get('is_admin'):
-        orders = Order.query.order_by(Order.created_at.desc()).all()
-    else:
-        orders = Order.query.filter_by(user_id=user_id).order_by(Order.created_at.desc()).all()
-
-    result = []
-    for order in orders:
-        status_obj = OrderStatus.query.filter_by(order_id=order.id).first()
-        status_value = status_obj.status if status_obj else 'pendiente'
-        if status_value != 'pagado':
-            continue
-        user = User.query.get(order.user_id)
-        items = []
-        for item in order.items:
-            items.append({
-                'id': item.id,
-                'product_name': item.product.name,
-                'quantity': item.quantity,
-                'price_at_purchase': item.price_at_purchase,
-                'subtotal': item.quantity * item.price_at_purchase
-            })
-        order_info = order.info
-        order_data = {
-            'id': order.id,
-            'user_id': order.user_id,
-            'user_name': f"{user.first_name or ''} {user.last_name or ''}".strip() or user.username,
-            'total': order.total,
-            'created_at': order.created_at.isoformat(),
-            'items': items,
-            'order_type': order_info.order_type if order_info else 'mesa',
-            'table_number': order_info.table_number if order_info else None,
-            'delivery_address': order_info.delivery_address if order_info else None,
-            'delivery_phone': order_info.delivery_phone if order_info else None,
-            'payment_method': order_info.payment_method if order_info else None,
-            'status': status_value
-        }
-        result.append(order_data)
-
-    return jsonify(result), 200
+    def generate():
+        nonlocal cursor
+        yield 'retry: 3000\n\n'
+        latest = broker.last_id()
+        if cursor is None:
+            cursor = latest
+        elif cursor > latest or cursor < broker.oldest_id() - 1:
+            # Backlog perdido (reinicio o poda): el cliente debe recargar
+            cursor = latest
+            yield f'id: {cursor}\nevent: resync\ndata: {{}}\n\n'
+        while True:
+            events = broker.read_since(cursor, timeout=heartbeat)
+            if not events:
+                yield ': keep-alive\n\n'
+                continue
+            for event in events:
+                cursor = event['id']
+                if not is_admin and json.loads(event['data']).get('user_id') != user_id:
+                    continue
+                yield f"id: {event['id']}\nevent: {event['type']}\ndata: {event['data']}\n\n"
+
+    return Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        # Evita que nginx/Render acumulen la respuesta en buffer
+        'X-Accel-Buffering': 'no',
+    })
 
 @order_bp.put('/<int:order_id>/status')
 @jwt_required()
@@ -118,20 +239,46 @@ def update_order_status(order_id: int):
 
     order = Order.query.get(order_id)
     if not order:
+        if is_archived(order_id):
+            return jsonify({'error': 'El pedido está archivado y no se puede modificar'}), 409
         return jsonify({'error': 'Pedido no encontrado'}), 404
 
     # Solo admin o dueño del pedido puede actualizar
     if not (claims.get('is_admin') or order.user_id == user_id):
         return jsonify({'error': 'No autorizado'}), 403
 
-    status_obj = OrderStatus.query.filter_by(order_id=order_id).first()
+    previous_status = order.status
     now = datetime.utcnow()
-    if not status_obj:
-        status_obj = OrderStatus(order_id=order_id, status=new_status, created_at=now, updated_at=now)
-        db.session.add(status_obj)
-    else:
-        status_obj.status = new_status
-        status_obj.updated_at = now
+    # Transición condicional: si otra petición cambió el estado desde la lectura (p. ej. dos "pagado"
+    # a la vez), no coincide ninguna fila y los rollups no se aplican dos veces
+    changed = (Order.query.filter(Order.id == order_id, Order.status == previous_status)
+               .update({Order.status: new_status, Order.status_updated_at: now}, synchronize_session='evaluate'))
+    if changed != 1:
+        db.session.rollback()
+        return jsonify({'error': 'El pedido cambió mientras se actualizaba, inténtalo de nuevo'}), 409
+    db.session.add(OrderStatusHistory(order_id=order_id, status=new_status, previous_status=previous_status,
+                                      changed_by=user_id, created_at=now))
+    record_order_changes([order])
+
+    # Los rollups de ventas se actualizan en la misma transacción
+    if new_status == 'pagado' and previous_status != 'pagado':
+        apply_paid_order(order, 1)
+    elif previous_status == 'pagado' and new_status != 'pagado':
+        apply_paid_order(order, -1)
 
     db.session.commit()
-    return jsonify({'message': 'Estado actualizado', 'order_id': order_id, 'status': new_status}), 200
\ No newline at end of file
+    publish_order_event('order_status_changed', order, new_status)
+    return jsonify({'message': 'Estado actualizado', 'order_id': order_id, 'status': new_status}), 200
+
+@order_bp.cli.command('archive')
+@click.option('--older-than-days', type=int, default=None,
+              help='Antigüedad mínima del pago (por defecto ARCHIVE_AFTER_DAYS).')
+@click.option('--batch-size', type=int, default=None, help='Pedidos por transacción (por defecto ARCHIVE_BATCH_SIZE).')
+@click.option('--max-batches', type=int, default=None, help='Detenerse tras N lotes (para acotar la duración).')
+def archive_orders_command(older_than_days, batch_size, max_batches):
+    """Mueve a las tablas de archivo los pedidos pagados hace más de N días."""
+    config = current_app.config
+    moved = archive_paid_orders(older_than_days if older_than_days is not None else config['ARCHIVE_AFTER_DAYS'],
+                                batch_size or config['ARCHIVE_BATCH_SIZE'], max_batches)
+    counts = tier_counts()
+    click.echo(f"{moved} pedidos archivados ({counts['live']} en tablas vivas, {counts['archive']} en archivo)")
@@ -1,42 +1,73 @@
-from flask import Blueprint, request, jsonify, current_app
-from flask_jwt_extended import jwt_required, get_jwt
-from models import db, Product
-from werkzeug.utils import secure_filename
-import os
-import time
+from flask import Blueprint, request, jsonify, current_app, abort
+from sqlalchemy.exc import IntegrityError
+from auth import admin_required
+from models import db, Product, CartItem, DailyMenuItem, User
+from catalog import VERSIONED_FIELDS, add_product, get_catalog, record_version, soft_delete_product
+from cache import cached_json_response, invalidate_catalog
+from images import save_upload
+from menus import business_today
+from money import to_money
+from search import get_search_index, index_product_change
+from serializers import PRODUCT, plan_from_request
+from sync import DELETE, MENU, PRODUCT as PRODUCT_CHANGE, record_cart_changes, record_change, record_changes
 
 product_bp = Blueprint('products', __name__, url_prefix='/api/products')
 
+SEARCH_DEFAULT_LIMIT = 20
+SEARCH_MAX_LIMIT = 100
+
 @product_bp.get('/')
 def list_products():
-  products = Product.query.order_by(Product.created_at.desc()).all()
-  return jsonify([
-    {
-      'id': p.id,
-      'name': p.name,
-      'description': p.description,
-      'price': p.price,
-      'image_url': p.image_url
-    } for p in products
-  ]), 200
+  try:
+    plan = plan_from_request(PRODUCT)
+  except ValueError as e:
+    return jsonify({'message': str(e)}), 400
+  # Desde la instantánea del catálogo: reconstruir la respuesta no consulta la base.
+  # Una entrada por combinación de campos; todas empiezan por 'products' y se invalidan juntas
+  return cached_json_response(f'products:{plan.key}', lambda: plan.dump_many(get_catalog().by_newest()))
+
+@product_bp.get('/search')
+def search_products():
+  """Búsqueda sin acentos ni mayúsculas, por prefijo y tolerante a erratas (``?q=&limit=&cursor=``).
+
+  Devuelve una página de productos por relevancia; si hay más, ``X-Next-Cursor`` trae el cursor de la siguiente.
+  """
+  query = (request.args.get('q') or '').strip()
+  if not query:
+    return jsonify({'message': 'q es requerido'}), 400
+  try:
+    limit = min(int(request.args.get('limit', SEARCH_DEFAULT_LIMIT)), SEARCH_MAX_LIMIT)
+    offset = int(request.args.get('cursor', 0))
+  except ValueError:
+    return jsonify({'message': 'limit y cursor deben ser enteros'}), 400
+  if limit < 1 or offset < 0:
+    return jsonify({'message': 'limit y cursor deben ser positivos'}), 400
+  try:
+    plan = plan_from_request(PRODUCT)
+  except ValueError as e:
+    return jsonify({'message': str(e)}), 400
+  index, catalog = get_search_index()
+  # El índice puede ir por detrás de la base: solo cuentan los productos vigentes
+  ids, total = index.search(query, limit=limit, offset=offset, live=catalog.products)
+  response = jsonify(plan.dump_many(map(catalog.get, ids)))
+  if offset + limit < total:
+    response.headers['X-Next-Cursor'] = str(offset + limit)
+  return response, 200
 
 @product_bp.get('/<int:product_id>')
 def get_product(product_id):
-  p = Product.query.get_or_404(product_id)
-  return jsonify({
-    'id': p.id,
-    'name': p.name,
-    'description': p.description,
-    'price': p.price,
-    'image_url': p.image_url
-  }), 200
+  try:
+    plan = plan_from_request(PRODUCT)
+  except ValueError as e:
+    return jsonify({'message': str(e)}), 400
+  p = get_catalog().get(product_id)
+  if p is None:
+    abort(404)
+  return jsonify(plan.dump(p)), 200
 
 @product_bp.post('/')
-@jwt_required()
+@admin_required()
 def create_product():
-  claims = get_jwt()
-  if not claims.get('is_admin'):
-    return jsonify({'message': 'No autorizado'}), 403
 
   image_url = None
   if request.content_type and 'multipart/form-data' in request.content_type:
@@ -45,12 +76,7 @@ def create_product():
     description = request.form.get('description')
     file = request.files.get('image')
     if file and file.filename:
-      filename = secure_filename(file.filename)
-      filename = f"{int(time.time())}_{filename}"
-      file_path = os.path.join(current_app.config['UPLOAD_FOLDER'], filename)
-      os.makedirs(current_app.config['UPLOAD_FOLDER'], exist_ok=True)
-      file.save(file_path)
-      image_url = f"/uploads/{filename}"
+      image_url = save_upload(file, current_app.config['UPLOAD_FOLDER'])
   else:
     data = request.get_json() or {}
     name = data.get('name')
@@ -64,60 +90,80 @@ def create_product():
   if price is None or (isinstance(price, str) and not price.strip()):
     return jsonify({'message': 'Precio requerido'}), 400
   try:
-    price_val = float(price)
-  except (TypeError, ValueError):
+    price_val = to_money(price)
+  except ValueError:
     return jsonify({'message': 'Precio inválido'}), 400
 
-  p = Product(name=name, description=description, price=price_val, image_url=image_url)
-  db.session.add(p)
+  p = add_product(name=name, description=description, price=price_val, image_url=image_url)
+  record_change(PRODUCT_CHANGE, p.id)
   db.session.commit()
+  invalidate_catalog()
+  index_product_change(p)
   return jsonify({'message': 'Producto creado', 'id': p.id}), 201
 
 @product_bp.put('/<int:product_id>')
-@jwt_required()
+@admin_required()
 def update_product(product_id):
-  claims = get_jwt()
-  if not claims.get('is_admin'):
-    return jsonify({'message': 'No autorizado'}), 403
 
-  p = Product.query.get_or_404(product_id)
+  p = Product.query.filter_by(id=product_id, deleted_at=None).first_or_404()
+  before = tuple(getattr(p, field) for field in VERSIONED_FIELDS)
   if request.content_type and 'multipart/form-data' in request.content_type:
     name = request.form.get('name', p.name)
     description = request.form.get('description', p.description)
     price = request.form.get('price', p.price)
     file = request.files.get('image')
     if file and file.filename:
-      filename = secure_filename(file.filename)
-      filename = f"{int(time.time())}_{filename}"
-      file_path = os.path.join(current_app.config['UPLOAD_FOLDER'], filename)
-      os.makedirs(current_app.config['UPLOAD_FOLDER'], exist_ok=True)
-      file.save(file_path)
-      p.image_url = f"/uploads/{filename}"
+      p.image_url = save_upload(file, current_app.config['UPLOAD_FOLDER'])
     p.name = name
     p.description = description
     if price is not None:
       try:
-        p.price = float(price)
-      except:
+        p.price = to_money(price)
+      except ValueError:
         pass
   else:
     data = request.get_json() or {}
     p.name = data.get('name', p.name)
     p.description = data.get('description', p.description)
     if 'price' in data:
-      p.price = float(data['price'])
+      try:
+        p.price = to_money(data['price'])
+      except ValueError:
+        return jsonify({'message': 'Precio inválido'}), 400
     p.image_url = data.get('image_url', p.image_url)
 
-  db.session.commit()
-  return jsonify({'message': 'Producto actualizado'}), 200
+  # Cada cambio visible para el cliente es una versión nueva; los pedidos ya hechos conservan la suya
+  if tuple(getattr(p, field) for field in VERSIONED_FIELDS) != before:
+    record_version(p)
+    record_change(PRODUCT_CHANGE, p.id)
+  try:
+    db.session.commit()
+  except IntegrityError:
+    # Otra edición concurrente ya creó esta versión
+    db.session.rollback()
+    return jsonify({'message': 'El producto cambió mientras se editaba, inténtalo de nuevo'}), 409
+  invalidate_catalog()
+  index_product_change(p)
+  return jsonify({'message': 'Producto actualizado', 'version': p.version}), 200
 
 @product_bp.delete('/<int:product_id>')
-@jwt_required()
+@admin_required()
 def delete_product(product_id):
-  claims = get_jwt()
-  if not claims.get('is_admin'):
-    return jsonify({'message': 'No autorizado'}), 403
-  p = Product.query.get_or_404(product_id)
-  db.session.delete(p)
+  p = Product.query.filter_by(id=product_id, deleted_at=None).first_or_404()
+  soft_delete_product(p)
+  # Sale de los carritos (con nueva versión para quien lo tenía) y de los menús de hoy en adelante;
+  # pedidos y menús pasados lo siguen referenciando
+  holders = CartItem.query.with_entities(CartItem.user_id).filter_by(product_id=product_id)
+  upcoming_menu = DailyMenuItem.query.filter(DailyMenuItem.product_id == product_id,
+                                             DailyMenuItem.date >= business_today())
+  record_change(PRODUCT_CHANGE, product_id, DELETE)
+  record_cart_changes(user_id for (user_id,) in holders)
+  record_changes(MENU, (day for (day,) in upcoming_menu.with_entities(DailyMenuItem.date)))
+  (User.query.filter(User.id.in_(holders.scalar_subquery()))
+   .update({User.cart_version: User.cart_version + 1}, synchronize_session=False))
+  CartItem.query.filter_by(product_id=product_id).delete(synchronize_session=False)
+  upcoming_menu.delete(synchronize_session=False)
   db.session.commit()
+  invalidate_catalog()
+  index_product_change(p)
   return jsonify({'message': 'Producto eliminado'}), 200
\ No newline at end of file
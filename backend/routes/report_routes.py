@@ -0,0 +1,113 @@
+from flask import Blueprint, jsonify, request
+from auth import admin_required
+from datetime import datetime, timedelta
+from sqlalchemy import func
+import click
+from models import db, Product, SalesRollup, ProductSalesRollup
+from reports import rebuild_rollups
+from timeutils import business_now
+
+report_bp = Blueprint('reports', __name__, url_prefix='/api/admin/reports', cli_group='reports')
+
+DEFAULT_RANGE_DAYS = 30
+
+def _date_range():
+    """Rango de días locales desde ``from``/``to`` (por defecto, los últimos 30 días)."""
+    today = business_now().date()
+    try:
+        day_to = datetime.strptime(request.args['to'], '%Y-%m-%d').date() if request.args.get('to') else today
+        day_from = (datetime.strptime(request.args['from'], '%Y-%m-%d').date() if request.args.get('from')
+                    else day_to - timedelta(days=DEFAULT_RANGE_DAYS - 1))
+    except ValueError:
+        raise ValueError('from/to deben tener formato YYYY-MM-DD')
+    if day_from > day_to:
+        raise ValueError('from no puede ser posterior a to')
+    return day_from, day_to
+
+def _report(build):
+    try:
+        day_from, day_to = _date_range()
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    in_range = (SalesRollup.day >= day_from) & (SalesRollup.day <= day_to)
+    return jsonify({'from': day_from.isoformat(), 'to': day_to.isoformat(), **build(in_range, day_from, day_to)}), 200
+
+@report_bp.get('/revenue')
+@admin_required()
+def revenue():
+    group = request.args.get('group', 'day')
+    if group not in ('day', 'hour'):
+        return jsonify({'message': "group debe ser 'day' o 'hour'"}), 400
+
+    def build(in_range, day_from, day_to):
+        columns = [SalesRollup.day] + ([SalesRollup.hour] if group == 'hour' else [])
+        rows = (db.session.query(*columns, func.sum(SalesRollup.orders_count), func.sum(SalesRollup.revenue))
+                .filter(in_range).group_by(*columns)
+                # Cubetas que quedaron en cero al desmarcar pedidos pagados
+                .having(func.sum(SalesRollup.orders_count) != 0)
+                .order_by(*columns).all())
+        data = []
+        for row in rows:
+            entry = {'day': row[0].isoformat(), 'orders': row[-2], 'revenue': row[-1]}
+            if group == 'hour':
+                entry['hour'] = row[1]
+            data.append(entry)
+        return {
+            'group': group,
+            'rows': data,
+            'totals': {'orders': sum(r['orders'] for r in data), 'revenue': sum(r['revenue'] for r in data)},
+        }
+    return _report(build)
+
+@report_bp.get('/top-products')
+@admin_required()
+def top_products():
+    try:
+        limit = min(max(int(request.args.get('limit', 10)), 1), 100)
+    except ValueError:
+        return jsonify({'message': 'limit inválido'}), 400
+
+    def build(in_range, day_from, day_to):
+        quantity = func.sum(ProductSalesRollup.quantity).label('quantity')
+        rows = (db.session.query(ProductSalesRollup.product_id, Product.name, quantity,
+                                 func.sum(ProductSalesRollup.revenue))
+                .join(Product, Product.id == ProductSalesRollup.product_id)
+                .filter(ProductSalesRollup.day >= day_from, ProductSalesRollup.day <= day_to)
+                .group_by(ProductSalesRollup.product_id, Product.name)
+                .having(quantity != 0)
+                .order_by(quantity.desc())
+                .limit(limit).all())
+        return {'rows': [{'product_id': r[0], 'name': r[1], 'quantity': r[2], 'revenue': r[3]} for r in rows]}
+    return _report(build)
+
+def _breakdown(column, name):
+    def build(in_range, day_from, day_to):
+        rows = (db.session.query(column, func.sum(SalesRollup.orders_count), func.sum(SalesRollup.revenue))
+                .filter(in_range).group_by(column)
+                .having(func.sum(SalesRollup.orders_count) != 0)
+                .order_by(column).all())
+        return {'rows': [{name: r[0] or None, 'orders': r[1], 'revenue': r[2]} for r in rows]}
+    return _report(build)
+
+@report_bp.get('/order-types')
+@admin_required()
+def order_types():
+    # Mesa vs delivery
+    return _breakdown(SalesRollup.order_type, 'order_type')
+
+@report_bp.get('/payment-methods')
+@admin_required()
+def payment_methods():
+    return _breakdown(SalesRollup.payment_method, 'payment_method')
+
+@report_bp.cli.command('rebuild')
+@click.option('--from', 'day_from', type=click.DateTime(formats=['%Y-%m-%d']), required=True,
+              help='Primer día local (YYYY-MM-DD).')
+@click.option('--to', 'day_to', type=click.DateTime(formats=['%Y-%m-%d']), default=None,
+              help='Último día local (por defecto, hoy).')
+def rebuild_command(day_from, day_to):
+    """Recalcula los rollups de ventas desde los pedidos pagados."""
+    day_to = day_to.date() if day_to else business_now().date()
+    result = rebuild_rollups(day_from.date(), day_to)
+    click.echo(f"Rollups recalculados: {result['sales_rows']} filas de ventas, "
+               f"{result['product_rows']} filas de productos")
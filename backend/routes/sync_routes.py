@@ -0,0 +1,147 @@
+from flask import Blueprint, current_app, jsonify, request
+from datetime import timedelta
+from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
+from models import Order, User
+from catalog import get_catalog
+from menus import business_today, days_between, get_snapshots
+from serializers import ORDER, USER_SUMMARY, serialize_product
+from sync import (ADMIN_ENTITIES, DEFAULT_ENTITIES, DELETE, PRODUCT, SYNC_ENTITIES, compact_change_log,
+                  compacted_through, decode_sync_cursor, encode_sync_cursor, latest_change_id, read_changes,
+                  settled_cursor, visible_to)
+from routes.cart_routes import cart_snapshot
+from routes.order_routes import orders_feed_query
+import click
+
+sync_bp = Blueprint('sync', __name__, url_prefix='/api/sync', cli_group='sync')
+
+def _requested_entities(is_admin: bool) -> list:
+    raw = request.args.get('entities')
+    names = [n.strip() for n in raw.split(',') if n.strip()] if raw else list(DEFAULT_ENTITIES)
+    for name in names:
+        if name not in SYNC_ENTITIES:
+            raise ValueError(f'Entidad desconocida: {name}')
+        if name in ADMIN_ENTITIES and not is_admin:
+            raise ValueError(f'{name} solo está disponible para administradores')
+    return names
+
+def _split(changes: dict, load):
+    """``(cargados, borrados)``: lo borrado o ya inexistente (o fuera de vista) va a ``deleted``."""
+    wanted = [int(key) for key, op in changes.items() if op != DELETE]
+    found = load(wanted) if wanted else []
+    present = {obj.id for obj in found}
+    deleted = sorted(int(key) for key in changes if int(key) not in present)
+    return found, deleted
+
+def _products(changes: dict = None) -> dict:
+    catalog = get_catalog()
+    if changes is None:
+        return {'upserted': [serialize_product(p) for p in catalog.by_newest()], 'deleted': []}
+    found, deleted = _split(changes, lambda ids: [catalog.get(pid) for pid in sorted(ids) if catalog.get(pid)])
+    return {'upserted': [serialize_product(p) for p in found], 'deleted': deleted}
+
+def _menus(dates) -> dict:
+    if not dates:
+        return {'upserted': {}, 'deleted': []}
+    snapshots = get_snapshots(min(dates), max(dates))
+    # Los snapshots ya son JSON; se vuelven a leer para anidarlos en la respuesta
+    return {'upserted': {day.isoformat(): current_app.json.loads(snapshots[day][0]) for day in sorted(dates)},
+            'deleted': []}
+
+def _orders(visible_user, changes: dict = None) -> dict:
+    """Pedidos del feed (no pagados); uno que se pagó, se archivó o dejó de verse sale en ``deleted``."""
+    plan = ORDER.plan()
+    query = orders_feed_query(paid=False, user_id=visible_user)
+    if changes is None:
+        return {'upserted': plan.dump_many(query.all()), 'deleted': []}
+    found, deleted = _split(changes, lambda ids: query.filter(Order.id.in_(ids)).all())
+    return {'upserted': plan.dump_many(found), 'deleted': deleted}
+
+def _users(changes: dict = None) -> dict:
+    plan = USER_SUMMARY.plan()
+    query = User.query.order_by(User.id)
+    if changes is None:
+        return {'upserted': plan.dump_many(query.all()), 'deleted': []}
+    found, deleted = _split(changes, lambda ids: query.filter(User.id.in_(ids)).all())
+    return {'upserted': plan.dump_many(found), 'deleted': deleted}
+
+@sync_bp.get('')
+@jwt_required()
+def sync():
+    """Cambios desde ``since`` (cursor de la respuesta anterior) de ``entities`` (por defecto
+    ``products,menus,orders,cart``; ``users`` solo admin).
+
+    Sin ``since``, o si el cursor es anterior a la última compactación, devuelve
+    el estado completo con ``full: true``. Con ``has_more`` hay que repetir la
+    petición con el nuevo cursor.
+    """
+    user_id = int(get_jwt_identity())
+    is_admin = bool(get_jwt().get('is_admin'))
+    try:
+        names = _requested_entities(is_admin)
+        since = decode_sync_cursor(request.args['since']) if request.args.get('since') else None
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    config = current_app.config
+    today = business_today()
+    menu_days = days_between(today, today + timedelta(days=config['SYNC_MENU_DAYS'] - 1))
+    visible_user = None if is_admin else user_id
+
+    # El cursor se fija antes de leer: lo que cambie mientras tanto llega (otra vez) en la próxima sincronización
+    cursor = settled_cursor(config['SYNC_SETTLE_SECONDS'])
+    full = since is None or not compacted_through() <= since[0] <= latest_change_id()
+    body = {'full': full, 'has_more': False}
+    if full:
+        sections = {
+            'products': _products,
+            'menus': lambda: _menus(menu_days),
+            'orders': lambda: _orders(visible_user),
+            'cart': lambda: cart_snapshot(user_id),
+            'users': _users,
+        }
+        for name in names:
+            body[name] = sections[name]()
+    else:
+        since_id, since_day = since
+        entities = {SYNC_ENTITIES[name] for name in names}
+        # Los menús y el carrito llevan nombres y precios del catálogo: un cambio de producto también los
+        # cambia, así que se leen los cambios de productos aunque no se devuelvan
+        if 'menus' in names or 'cart' in names:
+            entities.add(PRODUCT)
+        raw_changes, last_id, has_more = read_changes(since_id, sorted(entities), visible_to(user_id, is_admin),
+                                                      config['SYNC_MAX_CHANGES'])
+        changes = {name: raw_changes[SYNC_ENTITIES[name]] for name in names}
+        products_changed = bool(raw_changes.get(PRODUCT))
+        # Si se pasa de página, el cursor es el último cambio leído, pero nunca más allá del asentado: lo
+        # que sigue aún no se asentó y llega en la próxima sincronización. Si no, el asentado (sin retroceder)
+        if has_more and last_id <= cursor:
+            cursor = last_id
+        else:
+            cursor = max(cursor, since_id)
+            has_more = False
+        body['has_more'] = has_more
+        if 'products' in names:
+            body['products'] = _products(changes['products'])
+        if 'menus' in names:
+            if since_day != today or products_changed:
+                dates = menu_days
+            else:
+                dates = [day for day in menu_days if day.isoformat() in changes['menus']]
+            body['menus'] = _menus(dates)
+        if 'orders' in names:
+            body['orders'] = _orders(visible_user, changes['orders'])
+        if 'cart' in names:
+            body['cart'] = cart_snapshot(user_id) if changes['cart'] or products_changed else None
+        if 'users' in names:
+            body['users'] = _users(changes['users'])
+    body['cursor'] = encode_sync_cursor(cursor, today)
+    return jsonify(body), 200
+
+@sync_bp.cli.command('compact')
+@click.option('--older-than-days', type=int, default=None,
+              help='Borrar cambios con más de N días (por defecto SYNC_RETENTION_DAYS).')
+def compact_command(older_than_days):
+    """Compacta el registro de cambios de /api/sync; los cursores anteriores resincronizarán todo."""
+    days = older_than_days if older_than_days is not None else current_app.config['SYNC_RETENTION_DAYS']
+    result = compact_change_log(days)
+    click.echo(f"{result['superseded']} cambios superados y {result['pruned']} antiguos borrados; "
+               f"quedan {result['remaining']} (compactado hasta {result['compacted_through']})")
@@ -0,0 +1,279 @@
+"""Búsqueda de productos con un índice invertido en memoria.
+
+Nombres y descripciones se normalizan (NFKD sin diacríticos y ``casefold``)
+antes de partirse en palabras, así que "aji", "AJÍ" y "ají" son el mismo
+término. Cada término de la consulta se compara con el vocabulario del índice
+de tres formas, de más a menos peso: igual, como prefijo ("chau" → "chaufa") y
+por trigramas para errores de tipeo ("cevice" → "ceviche"). Una coincidencia
+en el nombre pesa más que en la descripción. Se devuelven los productos que
+casan con todos los términos de la consulta o, si no hay ninguno, los que
+casan con alguno.
+
+El índice vive en cada proceso y está ligado a ``CatalogState.version`` como
+la instantánea del catálogo: las altas, ediciones y bajas hechas en este
+worker lo actualizan en el momento; si la versión de la base avanza por un
+cambio de otro worker, se reconstruye en segundo plano desde la instantánea
+mientras se sigue respondiendo con el índice anterior. Los resultados se
+filtran siempre contra la instantánea vigente, de modo que un producto
+borrado no aparece aunque el índice aún lo tenga.
+"""
+from bisect import bisect_left, insort
+from collections import Counter, defaultdict
+import heapq
+import re
+import threading
+import unicodedata
+
+from flask import current_app
+
+from catalog import current_catalog_version, get_catalog
+
+FIELD_WEIGHTS = (('name', 3.0), ('description', 1.0))
+PREFIX_FACTOR = 0.6
+FUZZY_FACTOR = 0.4
+FUZZY_MIN_LENGTH = 3
+FUZZY_MIN_SIMILARITY = 0.35
+MAX_EXPANSIONS = 50
+
+_TOKEN_RE = re.compile(r'[^\W_]+')
+
+
+def fold(text: str) -> str:
+    """Minúsculas y sin diacríticos: ``'Ají de Gallina'`` → ``'aji de gallina'``."""
+    decomposed = unicodedata.normalize('NFKD', text or '')
+    return ''.join(ch for ch in decomposed if not unicodedata.combining(ch)).casefold()
+
+
+def tokenize(text: str) -> list:
+    return _TOKEN_RE.findall(fold(text))
+
+
+def trigrams(token: str) -> set:
+    # Con relleno al estilo de pg_trgm: el inicio de la palabra cuenta más
+    padded = f'  {token} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class SearchIndex:
+    def __init__(self, version: int = None):
+        self.version = version
+        self._postings = {}                  # término -> {product_id: peso}
+        self._vocabulary = []                # términos ordenados, para buscar prefijos
+        self._trigrams = defaultdict(set)    # trigrama -> términos
+        self._trigram_counts = {}            # término -> nº de trigramas
+        self._documents = {}                 # product_id -> {término: peso}
+        self._names = {}                     # product_id -> nombre normalizado (desempate)
+        self._lock = threading.RLock()
+
+    @classmethod
+    def build(cls, products, version: int) -> 'SearchIndex':
+        index = cls(version)
+        for product in products:
+            index._add(product, keep_sorted=False)
+        index._vocabulary.sort()
+        return index
+
+    def __len__(self):
+        return len(self._documents)
+
+    def _add(self, product, keep_sorted: bool = True):
+        weights = {}
+        for field, weight in FIELD_WEIGHTS:
+            for token in tokenize(getattr(product, field)):
+                if weight > weights.get(token, 0):
+                    weights[token] = weight
+        self._documents[product.id] = weights
+        self._names[product.id] = fold(product.name)
+        for token, weight in weights.items():
+            postings = self._postings.get(token)
+            if postings is None:
+                postings = self._postings[token] = {}
+                grams = trigrams(token)
+                self._trigram_counts[token] = len(grams)
+                for gram in grams:
+                    self._trigrams[gram].add(token)
+                if keep_sorted:
+                    insort(self._vocabulary, token)
+                else:
+                    self._vocabulary.append(token)
+            postings[product.id] = weight
+
+    def _remove(self, product_id):
+        weights = self._documents.pop(product_id, None)
+        self._names.pop(product_id, None)
+        for token in weights or ():
+            postings = self._postings[token]
+            postings.pop(product_id, None)
+            if postings:
+                continue
+            # Término sin productos: sale del vocabulario y de los trigramas
+            del self._postings[token]
+            del self._trigram_counts[token]
+            for gram in trigrams(token):
+                tokens = self._trigrams[gram]
+                tokens.discard(token)
+                if not tokens:
+                    del self._trigrams[gram]
+            position = bisect_left(self._vocabulary, token)
+            if position < len(self._vocabulary) and self._vocabulary[position] == token:
+                del self._vocabulary[position]
+
+    def upsert(self, product):
+        """Indexa (o reindexa) un producto con ``id``, ``name`` y ``description``."""
+        with self._lock:
+            self._remove(product.id)
+            self._add(product)
+
+    def remove(self, product_id):
+        with self._lock:
+            self._remove(product_id)
+
+    def _expand(self, term: str) -> dict:
+        """Términos del vocabulario que casan con ``term`` y el factor de cada uno."""
+        matches = {}
+        if term in self._postings:
+            matches[term] = 1.0
+        position = bisect_left(self._vocabulary, term)
+        expansions = 0
+        while position < len(self._vocabulary) and expansions < MAX_EXPANSIONS:
+            token = self._vocabulary[position]
+            if not token.startswith(term):
+                break
+            if token != term:
+                # Cuanto más completo el prefijo, más se parece a una coincidencia exacta
+                matches[token] = PREFIX_FACTOR * (0.5 + 0.5 * len(term) / len(token))
+                expansions += 1
+            position += 1
+        if len(term) >= FUZZY_MIN_LENGTH:
+            grams = trigrams(term)
+            shared = Counter()
+            for gram in grams:
+                shared.update(self._trigrams.get(gram, ()))
+            for token, count in shared.items():
+                similarity = count / (len(grams) + self._trigram_counts[token] - count)
+                if similarity >= FUZZY_MIN_SIMILARITY and token not in matches:
+                    matches[token] = FUZZY_FACTOR * similarity
+        return matches
+
+    def _term_scores(self, expansions: dict, within=None) -> dict:
+        """``{product_id: mejor puntuación}`` para un término; ``within`` limita los productos a mirar."""
+        best = {}
+        postings = [(self._postings[token], factor) for token, factor in expansions.items()]
+        if within is not None and len(within) * len(postings) < sum(len(p) for p, _ in postings):
+            # Pocos candidatos: se consulta cada uno en vez de recorrer las listas enteras
+            for product_id in within:
+                score = max((p[product_id] * factor for p, factor in postings if product_id in p), default=0)
+                if score:
+                    best[product_id] = score
+            return best
+        for product_postings, factor in postings:
+            for product_id, weight in product_postings.items():
+                if within is not None and product_id not in within:
+                    continue
+                score = weight * factor
+                if score > best.get(product_id, 0):
+                    best[product_id] = score
+        return best
+
+    def search(self, query: str, limit: int = None, offset: int = 0, live=None) -> tuple:
+        """``(ids, total)``: la página ``[offset, offset + limit)`` de productos por relevancia.
+
+        Cuentan los productos que casan con todos los términos; si no hay
+        ninguno, los que casan con alguno (primero los que cubren más).
+        ``live`` (p. ej. los productos de la instantánea) descarta los que ya
+        no existen.
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        with self._lock:
+            expansions = sorted((self._expand(term) for term in terms),
+                                key=lambda e: sum(len(self._postings[token]) for token in e))
+            scores, matched = {}, None
+            if expansions and expansions[0]:
+                # Del término más raro al más común: cada uno solo puntúa a los que ya casaban
+                scores = self._term_scores(expansions[0], live)
+                for term_expansions in expansions[1:]:
+                    if not scores:
+                        break
+                    term_scores = self._term_scores(term_expansions, scores)
+                    scores = {pid: scores[pid] + score for pid, score in term_scores.items()}
+            if not scores and len(expansions) > 1:
+                scores, matched = defaultdict(float), Counter()
+                for term_expansions in expansions:
+                    for product_id, score in self._term_scores(term_expansions, live).items():
+                        scores[product_id] += score
+                        matched[product_id] += 1
+            names = self._names
+
+            def rank(pid):
+                return -(matched[pid] if matched else 0), -scores[pid], names.get(pid, ''), pid
+
+            if limit is None:
+                ids = sorted(scores, key=rank)[offset:]
+            else:
+                # Solo se ordena lo que hace falta para la página
+                ids = heapq.nsmallest(offset + limit, scores, key=rank)[offset:]
+        return ids, len(scores)
+
+
+_build_lock = threading.Lock()
+
+
+def _rebuild_in_background(app, catalog):
+    state = app.extensions.setdefault('search_rebuild', {'running': False})
+    with _build_lock:
+        if state['running']:
+            return
+        state['running'] = True
+
+    def run():
+        try:
+            app.extensions['search_index'] = SearchIndex.build(catalog.products.values(), catalog.version)
+        finally:
+            state['running'] = False
+
+    threading.Thread(target=run, name='search-index-rebuild', daemon=True).start()
+
+
+def warm_search_index(app):
+    """Construye el índice al arrancar (en el maestro de gunicorn, antes del fork)."""
+    with app.app_context():
+        catalog = get_catalog(app)
+        app.extensions['search_index'] = SearchIndex.build(catalog.products.values(), catalog.version)
+
+
+def get_search_index(app=None):
+    """``(índice, instantánea del catálogo)``; el índice puede ir una versión por detrás."""
+    app = app or current_app._get_current_object()
+    catalog = get_catalog(app)
+    index = app.extensions.get('search_index')
+    if index is None:
+        # Sin precarga: la primera búsqueda del proceso espera a que se construya
+        with _build_lock:
+            index = app.extensions.get('search_index')
+            if index is None:
+                index = SearchIndex.build(catalog.products.values(), catalog.version)
+                app.extensions['search_index'] = index
+    elif index.version != catalog.version:
+        _rebuild_in_background(app, catalog)
+    return index, catalog
+
+
+def index_product_change(product, app=None):
+    """Refleja en el índice un alta, edición o baja ya confirmada en la base.
+
+    Si el índice estaba justo en la versión anterior sigue al día; si no
+    (otro worker cambió el catálogo entretanto) la próxima búsqueda lo
+    reconstruye igualmente.
+    """
+    app = app or current_app._get_current_object()
+    index = app.extensions.get('search_index')
+    if index is None:
+        return
+    version = current_catalog_version()
+    with index._lock:
+        if product.deleted_at is None:
+            index.upsert(product)
+        else:
+            index.remove(product.id)
+        if index.version == version - 1:
+            index.version = version
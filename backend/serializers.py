@@ -0,0 +1,263 @@
+"""Forma pública de productos, pedidos y usuarios, con campos a elección del cliente.
+
+Cada ``Serializer`` declara sus campos (nombre → función que lo lee del
+objeto) y sus relaciones anidadas. ``plan()`` compila una vez por petición
+qué campos y relaciones salen, y ``Plan.dump`` solo evalúa esos: un listado
+pedido con ``?fields=id,total`` no lee los items ni arma sus dicts.
+
+En la query string:
+
+- ``fields=id,total,items.quantity`` limita la respuesta a esos campos; un
+  nombre con punto elige campos de una relación (y la incluye).
+- ``include=history,user`` añade relaciones que no salen por defecto.
+
+Sin parámetros la respuesta es la de siempre. Un nombre desconocido es un
+``ValueError`` (400 en las rutas).
+
+``OrjsonProvider`` sustituye el proveedor JSON de Flask por ``orjson`` si
+está instalado (``JSON_PROVIDER``): mismos resultados, bastante menos CPU por
+respuesta.
+"""
+from operator import attrgetter
+
+from flask import request
+from sqlalchemy.orm import selectinload
+
+from images import variant_urls
+from models import ArchivedOrder, Order
+from money import MoneyJSONProvider
+
+
+class Relation:
+    def __init__(self, getter, serializer: 'Serializer', many: bool = False, load=None):
+        self.get = getter
+        self.serializer = serializer
+        self.many = many
+        # Opción (o lista de opciones) de carga, ``selectinload``..., para no disparar una consulta por objeto
+        self.load = load
+
+
+class Plan:
+    """Campos y relaciones concretos que se serializan en una petición."""
+
+    def __init__(self, fields, relations, key: str):
+        self.fields = fields
+        self.relations = relations
+        self.key = key
+
+    def dump(self, obj) -> dict:
+        data = {name: get(obj) for name, get in self.fields}
+        for name, relation, plan in self.relations:
+            value = relation.get(obj)
+            if relation.many:
+                data[name] = [plan.dump(item) for item in value]
+            else:
+                data[name] = None if value is None else plan.dump(value)
+        return data
+
+    def dump_many(self, objs) -> list:
+        return [self.dump(obj) for obj in objs]
+
+    def load_options(self, entity) -> list:
+        """Opciones de carga de las relaciones pedidas, para consultas sobre ``entity``."""
+        options = []
+        for _, relation, _ in self.relations:
+            if relation.load:
+                loaded = relation.load(entity)
+                options.extend(loaded if isinstance(loaded, (list, tuple)) else [loaded])
+        return options
+
+
+class Serializer:
+    def __init__(self, fields: dict, relations: dict = None, default_fields=None, default_include=()):
+        self.fields = fields
+        self.relations = relations or {}
+        self.default_fields = tuple(fields) if default_fields is None else tuple(default_fields)
+        self.default_include = tuple(default_include)
+
+    def variant(self, default_fields=None, default_include=None) -> 'Serializer':
+        """El mismo serializador con otra forma por defecto (p. ej. un resumen anidado)."""
+        return Serializer(self.fields, self.relations,
+                          default_fields=self.default_fields if default_fields is None else default_fields,
+                          default_include=self.default_include if default_include is None else default_include)
+
+    def plan(self, fields=None, include=()) -> Plan:
+        selected = None
+        nested_fields, nested_include = {}, {}
+        if fields is not None:
+            selected = set()
+            for name in fields:
+                head, _, rest = name.partition('.')
+                if head not in self.fields and head not in self.relations:
+                    raise ValueError(f'Campo desconocido: {head}')
+                if rest:
+                    if head not in self.relations:
+                        raise ValueError(f'{head} no es una relación')
+                    nested_fields.setdefault(head, []).append(rest)
+                selected.add(head)
+        included = set()
+        for name in include:
+            head, _, rest = name.partition('.')
+            if head not in self.relations:
+                raise ValueError(f'Relación desconocida: {head}')
+            included.add(head)
+            if rest:
+                nested_include.setdefault(head, []).append(rest)
+
+        if selected is None:
+            field_names = self.default_fields
+            relation_names = set(self.default_include) | included
+        else:
+            field_names = [name for name in self.fields if name in selected]
+            relation_names = (selected & self.relations.keys()) | included
+        relations = []
+        for name in self.relations:
+            if name in relation_names:
+                relation = self.relations[name]
+                relations.append((name, relation, relation.serializer.plan(nested_fields.get(name),
+                                                                            nested_include.get(name, ()))))
+        key = ','.join(field_names)
+        if relations:
+            key += ',' + ','.join(f'{name}({plan.key})' for name, _, plan in relations)
+        return Plan([(name, self.fields[name]) for name in field_names], relations, key)
+
+
+def _csv_arg(name: str):
+    value = request.args.get(name)
+    if value is None:
+        return None
+    return [part.strip() for part in value.split(',') if part.strip()]
+
+
+def plan_from_request(serializer: Serializer) -> Plan:
+    """Plan según ``?fields=`` e ``?include=``; ``ValueError`` si nombran algo desconocido."""
+    return serializer.plan(_csv_arg('fields'), _csv_arg('include') or ())
+
+
+def _isoformat(getter):
+    def get(obj):
+        value = getter(obj)
+        return value.isoformat() if value else None
+    return get
+
+
+def _info(name: str, default=None):
+    def get(order):
+        return getattr(order.info, name) if order.info else default
+    return get
+
+
+PRODUCT = Serializer({
+    'id': attrgetter('id'),
+    'name': attrgetter('name'),
+    'description': attrgetter('description'),
+    'price': attrgetter('price'),
+    'image_url': attrgetter('image_url'),
+    'image_variants': lambda p: variant_urls(p.image_url),
+})
+
+# Forma completa de un producto del catálogo (listado, ficha, búsqueda y menús)
+serialize_product = PRODUCT.plan().dump
+
+ORDER_ITEM = Serializer({
+    'id': attrgetter('id'),
+    'product_version_id': attrgetter('product_version_id'),
+    # Nombre con el que se compró (versión inmutable), aunque el producto se haya editado o borrado
+    'product_name': lambda item: item.product_version.name if item.product_version else 'Producto eliminado',
+    'quantity': attrgetter('quantity'),
+    'price_at_purchase': attrgetter('price_at_purchase'),
+    'subtotal': lambda item: item.quantity * item.price_at_purchase,
+}, default_fields=('id', 'product_name', 'quantity', 'price_at_purchase', 'subtotal'))
+
+ORDER_INFO = Serializer({
+    'order_type': attrgetter('order_type'),
+    'table_number': attrgetter('table_number'),
+    'delivery_address': attrgetter('delivery_address'),
+    'delivery_phone': attrgetter('delivery_phone'),
+    'payment_method': attrgetter('payment_method'),
+})
+
+STATUS_CHANGE = Serializer({
+    'status': attrgetter('status'),
+    'previous_status': attrgetter('previous_status'),
+    'changed_by': attrgetter('changed_by'),
+    'created_at': _isoformat(attrgetter('created_at')),
+})
+
+USER_FIELDS = {
+    'id': attrgetter('id'),
+    'username': attrgetter('username'),
+    'email': attrgetter('email'),
+    'is_admin': attrgetter('is_admin'),
+    'first_name': attrgetter('first_name'),
+    'last_name': attrgetter('last_name'),
+    'phone': attrgetter('phone'),
+    'address': attrgetter('address'),
+}
+
+ORDER = Serializer({
+    'id': attrgetter('id'),
+    'user_id': attrgetter('user_id'),
+    'user_name': lambda o: f"{o.user.first_name or ''} {o.user.last_name or ''}".strip() or o.user.username,
+    'total': attrgetter('total'),
+    'created_at': _isoformat(attrgetter('created_at')),
+    'order_type': _info('order_type', 'mesa'),
+    'table_number': _info('table_number'),
+    'delivery_address': _info('delivery_address'),
+    'delivery_phone': _info('delivery_phone'),
+    'payment_method': _info('payment_method'),
+    'status': attrgetter('status'),
+    'status_updated_at': _isoformat(attrgetter('status_updated_at')),
+}, relations={
+    'items': Relation(attrgetter('items'), ORDER_ITEM, many=True),
+    'info': Relation(attrgetter('info'), ORDER_INFO),
+    'user': Relation(attrgetter('user'), Serializer(USER_FIELDS)),
+    'history': Relation(attrgetter('status_history'), STATUS_CHANGE, many=True,
+                        load=lambda order: selectinload(order.status_history)),
+}, default_include=('items',))
+
+USER = Serializer(USER_FIELDS, relations={
+    # Resumen de cada pedido (vivos y archivados), como lo muestra el panel de administración
+    'orders': Relation(lambda user: sorted(user.orders + user.archived_orders, key=lambda o: (o.created_at, o.id)),
+                       ORDER.variant(default_fields=('id', 'total', 'created_at'), default_include=('info',)),
+                       many=True, load=lambda user: [selectinload(user.orders).joinedload(Order.info),
+                                                     selectinload(user.archived_orders).joinedload(ArchivedOrder.info)]),
+}, default_include=('orders',))
+
+# Clientes sin sus pedidos (``?include=orders`` los añade): listados y sincronización de tabletas
+USER_SUMMARY = USER.variant(default_include=())
+
+
+class OrjsonProvider(MoneyJSONProvider):
+    """``MoneyJSONProvider`` sobre ``orjson``: el mismo JSON (claves ordenadas, ``Decimal`` como número).
+
+    Fechas, ``Decimal`` y demás tipos que orjson no resuelve igual que Flask
+    pasan por ``default`` del proveedor base.
+    """
+
+    def __init__(self, app):
+        import orjson
+        super().__init__(app)
+        self._orjson = orjson
+
+    def dumps(self, obj, **kwargs) -> str:
+        options = (self._orjson.OPT_PASSTHROUGH_DATETIME | self._orjson.OPT_PASSTHROUGH_DATACLASS
+                   | self._orjson.OPT_NON_STR_KEYS)
+        if kwargs.get('sort_keys', self.sort_keys):
+            options |= self._orjson.OPT_SORT_KEYS
+        return self._orjson.dumps(obj, default=self.default, option=options).decode()
+
+    def loads(self, s, **kwargs):
+        return self._orjson.loads(s)
+
+
+def json_provider(app):
+    """Proveedor JSON según ``JSON_PROVIDER`` (``auto``: orjson si está instalado)."""
+    choice = app.config.get('JSON_PROVIDER', 'auto')
+    if choice in ('auto', 'orjson'):
+        try:
+            return OrjsonProvider(app)
+        except ImportError:
+            if choice == 'orjson':
+                raise
+    return MoneyJSONProvider(app)
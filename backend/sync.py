@@ -0,0 +1,165 @@
+"""Registro de cambios para la sincronización incremental de las tabletas.
+
+Cada escritura sobre productos, menús, pedidos, carritos o clientes añade, en
+la misma transacción, una fila a ``change_log`` con la entidad, su clave y si
+se creó o editó (``upsert``) o se borró (``delete``). El id de la fila es el
+cursor: ``GET /api/sync?since=<cursor>`` devuelve el estado actual de lo que
+cambió después de él, así que al reconectar una tableta solo descarga lo que
+se perdió. El registro guarda claves, no cuerpos: diez ediciones del mismo
+producto llegan como una.
+
+``flask sync compact`` deja la fila más reciente de cada entidad y borra las
+de más de ``SYNC_RETENTION_DAYS`` días, apuntando en ``ChangeLogState`` hasta
+qué cursor borró. Un cursor anterior recibe el conjunto completo con
+``full: true``, como la primera sincronización.
+
+Los ids se asignan al insertar pero en MySQL las transacciones pueden
+confirmar en otro orden, de modo que el cursor que se entrega no pasa de los
+cambios con menos de ``SYNC_SETTLE_SECONDS``: esos se repiten en la siguiente
+sincronización en vez de perderse.
+"""
+import base64
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import and_, func, insert, or_, select, update
+
+from models import db, ChangeLog, ChangeLogState
+
+UPSERT = 'upsert'
+DELETE = 'delete'
+
+PRODUCT = 'product'
+MENU = 'menu'
+ORDER = 'order'
+CART = 'cart'
+USER = 'user'
+
+# Nombre en la API (``?entities=`` y claves de la respuesta) -> entidad del registro
+SYNC_ENTITIES = {'products': PRODUCT, 'menus': MENU, 'orders': ORDER, 'cart': CART, 'users': USER}
+DEFAULT_ENTITIES = ('products', 'menus', 'orders', 'cart')
+ADMIN_ENTITIES = ('users',)
+
+CHANGE_LOG_STATE_ID = 1
+
+
+def _insert(entity: str, op: str, keyed_owners):
+    now = datetime.utcnow()
+    rows = [{'entity': entity, 'entity_key': key.isoformat() if isinstance(key, date) else str(key), 'op': op,
+             'user_id': user_id, 'created_at': now} for key, user_id in keyed_owners]
+    if rows:
+        db.session.execute(insert(ChangeLog), rows)
+
+
+def record_change(entity: str, key, op: str = UPSERT, user_id: int = None):
+    """Anota un cambio en la transacción en curso (sin commit)."""
+    _insert(entity, op, [(key, user_id)])
+
+
+def record_changes(entity: str, keys, op: str = UPSERT):
+    """Varias entidades sin dueño (productos, fechas de menú...) en un solo INSERT (sin commit)."""
+    _insert(entity, op, ((key, None) for key in keys))
+
+
+def record_order_changes(orders):
+    _insert(ORDER, UPSERT, ((order.id, order.user_id) for order in orders))
+
+
+def record_cart_changes(user_ids):
+    _insert(CART, UPSERT, ((user_id, user_id) for user_id in user_ids))
+
+
+def encode_sync_cursor(change_id: int, day: date) -> str:
+    # El día de negocio viaja en el cursor: al cambiar de día la tableta recibe los menús nuevos
+    raw = f'{change_id}|{day.isoformat()}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_sync_cursor(cursor: str):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        change_id, day = base64.urlsafe_b64decode(padded.encode()).decode().split('|')
+        return int(change_id), date.fromisoformat(day)
+    except Exception:
+        raise ValueError('cursor inválido')
+
+
+def compacted_through() -> int:
+    return db.session.query(ChangeLogState.compacted_through).filter_by(id=CHANGE_LOG_STATE_ID).scalar() or 0
+
+
+def latest_change_id() -> int:
+    return max(db.session.query(func.max(ChangeLog.id)).scalar() or 0, compacted_through())
+
+
+def settled_cursor(settle_seconds: float) -> int:
+    """Cursor hasta el que ya no deberían aparecer cambios nuevos (ver docstring del módulo).
+
+    Usa el índice de ``created_at``: solo mira las filas de los últimos segundos.
+    """
+    cutoff = datetime.utcnow() - timedelta(seconds=settle_seconds)
+    oldest_recent = db.session.query(func.min(ChangeLog.id)).filter(ChangeLog.created_at > cutoff).scalar()
+    if oldest_recent is None:
+        return latest_change_id()
+    return max(oldest_recent - 1, compacted_through())
+
+
+def visible_to(user_id: int, is_admin: bool):
+    """Condición sobre ``ChangeLog``: catálogo y menús para todos; pedidos propios (todos si es admin);
+    solo el carrito propio; clientes solo para admin."""
+    own = and_(ChangeLog.entity.in_((ORDER, CART)), ChangeLog.user_id == user_id)
+    shared = (PRODUCT, MENU, ORDER, USER) if is_admin else (PRODUCT, MENU)
+    return or_(ChangeLog.entity.in_(shared), own)
+
+
+def read_changes(since: int, entities, condition, limit: int):
+    """``({entidad: {clave: op}}, id del último cambio leído, hay_más)`` a partir de ``since``.
+
+    Con varios cambios de la misma entidad vale el último.
+    """
+    rows = (db.session.query(ChangeLog.id, ChangeLog.entity, ChangeLog.entity_key, ChangeLog.op)
+            .filter(ChangeLog.id > since, ChangeLog.entity.in_(entities), condition)
+            .order_by(ChangeLog.id)
+            .limit(limit + 1)
+            .all())
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    changes = {entity: {} for entity in entities}
+    for _, entity, key, op in rows:
+        changes[entity][key] = op
+    return changes, (rows[-1][0] if rows else since), has_more
+
+
+def _set_compacted_through(change_id: int):
+    # Las filas que quedan tras una compactación son posteriores a su cursor: el nuevo nunca retrocede
+    result = db.session.execute(
+        update(ChangeLogState).where(ChangeLogState.id == CHANGE_LOG_STATE_ID)
+        .values(compacted_through=change_id),
+        execution_options={'synchronize_session': False},
+    )
+    if result.rowcount == 0:
+        # Base creada con create_all (desarrollo, benchmarks): la fila aún no existe
+        db.session.add(ChangeLogState(id=CHANGE_LOG_STATE_ID, compacted_through=change_id))
+
+
+def compact_change_log(older_than_days: int) -> dict:
+    """Deja una fila por entidad y borra las de más de ``older_than_days`` días (con commit).
+
+    Quitar filas ya superadas por otra más nueva de la misma entidad no cambia
+    ninguna sincronización; borrar las antiguas obliga a los cursores
+    anteriores a resincronizar todo.
+    """
+    newest = (select(func.max(ChangeLog.id).label('id'))
+              .group_by(ChangeLog.entity, ChangeLog.entity_key)
+              .subquery())
+    # El SELECT sobre la tabla derivada permite a MySQL borrar de la misma tabla que consulta
+    superseded = (ChangeLog.query.filter(ChangeLog.id.notin_(select(newest.c.id)))
+                  .delete(synchronize_session=False))
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    through = db.session.query(func.max(ChangeLog.id)).filter(ChangeLog.created_at < cutoff).scalar()
+    pruned = 0
+    if through is not None:
+        pruned = ChangeLog.query.filter(ChangeLog.id <= through).delete(synchronize_session=False)
+        _set_compacted_through(through)
+    db.session.commit()
+    return {'superseded': superseded, 'pruned': pruned, 'compacted_through': compacted_through(),
+            'remaining': db.session.query(func.count(ChangeLog.id)).scalar()}
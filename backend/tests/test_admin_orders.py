@@ -0,0 +1,9 @@
+"""Pedidos creados por un admin a nombre de un cliente."""
+
+
+def test_admin_order_for_missing_customer_is_rejected(client, admin, seed):
+    seed(customers=1, products=1)
+    response = client.post('/api/admin/orders', headers=admin, json={
+        'user_id': 999, 'order_type': 'mesa', 'table_number': 1, 'items': [{'product_id': 1, 'quantity': 1}]})
+    assert response.status_code == 404
+    assert client.get('/api/orders/', headers=admin).get_json() == []
@@ -0,0 +1,20 @@
+"""Clientes creados desde el panel de administración."""
+from passwords import HashingPool
+
+
+def test_customer_created_with_password_can_log_in(client, admin, seed):
+    seed(customers=0, products=0)
+    response = client.post('/api/admin/users', headers=admin, json={
+        'username': 'mesa7', 'first_name': 'Ana', 'password': 'secreta'})
+    assert response.status_code == 201
+    login = client.post('/api/auth/login', json={'username': 'mesa7', 'password': 'secreta'})
+    assert login.status_code == 200
+
+
+def test_saturated_hashing_pool_answers_503(app, client, admin, seed):
+    seed(customers=0, products=0)
+    app.extensions['password_hashing'] = HashingPool(workers=0, queue_size=0)
+    response = client.post('/api/admin/users', headers=admin, json={
+        'username': 'mesa8', 'first_name': 'Beto', 'password': 'secreta'})
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '1'
@@ -0,0 +1,28 @@
+"""Lista de tokens revocados (``auth.RevocationList``)."""
+from sqlalchemy import event
+
+from auth import get_revocation_list
+from models import db
+
+
+def test_revocation_sync_queries_outside_the_lock(app, client, seed, customer):
+    customer_ids, _ = seed(customers=1, products=1)
+    headers = customer(customer_ids[0])
+    revocations = get_revocation_list(app)
+    lock_held = []
+
+    def before_cursor_execute(conn, cursor, statement, *args):
+        if 'revoked_token' in statement:
+            lock_held.append(revocations._lock.locked())
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        assert client.get('/api/cart/', headers=headers).status_code == 200  # recarga completa
+        revocations.sync_interval = 0
+        assert client.post('/api/auth/logout', headers=headers).status_code == 200
+        assert client.get('/api/cart/', headers=headers).status_code == 401  # sincronización incremental
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+    assert lock_held and not any(lock_held)
@@ -0,0 +1,19 @@
+"""Caché de respuestas públicas (``cache.ResponseCache``)."""
+from cache import ResponseCache
+
+
+def test_body_built_across_an_invalidation_is_not_stored(app):
+    cache = ResponseCache()
+    versions = iter(['antes', 'después'])
+
+    def slow_builder():
+        # Una escritura invalida la caché mientras se arma el cuerpo con los datos anteriores
+        cache.invalidate('catalog')
+        return next(versions)
+
+    with app.app_context():
+        body, _ = cache.get_or_build('catalog:products', slow_builder, ttl=60)
+        assert body == '"antes"'
+        body, _ = cache.get_or_build('catalog:products', lambda: next(versions), ttl=60)
+        assert body == '"después"'
+        assert cache.get_or_build('catalog:products', lambda: 'no se llama', ttl=60)[0] == '"después"'
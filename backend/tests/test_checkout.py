@@ -0,0 +1,85 @@
+"""Checkouts en paralelo del mismo carrito y reintentos con ``Idempotency-Key``."""
+from concurrent.futures import ThreadPoolExecutor
+import threading
+
+import pytest
+
+from models import db, CartItem, Order, OrderItem
+
+THREADS = 8
+
+
+def _fill_cart(client, headers, product_ids):
+    response = client.patch('/api/cart/', headers=headers, json={'operations': [
+        {'op': 'add', 'product_id': pid, 'quantity': 2} for pid in product_ids]})
+    assert response.status_code == 200
+
+
+def _parallel_checkouts(app, headers_for):
+    """Lanza ``THREADS`` checkouts a la vez; devuelve ``[(status, body, headers)]``."""
+    start = threading.Barrier(THREADS)
+
+    def checkout(n):
+        client = app.test_client()
+        start.wait()
+        response = client.post('/api/cart/checkout', headers=headers_for(n),
+                               json={'order_type': 'mesa', 'table_number': 3})
+        return response.status_code, response.get_json(), response.headers
+
+    with ThreadPoolExecutor(THREADS) as pool:
+        return list(pool.map(checkout, range(THREADS)))
+
+
+@pytest.fixture
+def cart(app, client, seed, customer):
+    customer_ids, product_ids = seed(customers=1, products=3)
+    headers = customer(customer_ids[0])
+    _fill_cart(client, headers, product_ids)
+    return customer_ids[0], headers
+
+
+def test_parallel_checkouts_with_one_key_create_one_order(app, client, cart):
+    user_id, headers = cart
+    results = _parallel_checkouts(app, lambda n: {**headers, 'Idempotency-Key': 'doble-clic'})
+
+    statuses = [status for status, _, _ in results]
+    assert set(statuses) <= {201, 409}, results
+    order_ids = {body['order_id'] for status, body, _ in results if status == 201}
+    assert len(order_ids) == 1
+    with app.app_context():
+        assert Order.query.filter_by(user_id=user_id).count() == 1
+        assert OrderItem.query.count() == 3
+        assert CartItem.query.filter_by(user_id=user_id).count() == 0
+
+    # El reintento tardío repite la respuesta original sin crear otro pedido
+    replay = client.post('/api/cart/checkout', headers={**headers, 'Idempotency-Key': 'doble-clic'},
+                         json={'order_type': 'mesa', 'table_number': 3})
+    assert replay.status_code == 201
+    assert replay.headers['Idempotent-Replayed'] == 'true'
+    assert replay.get_json()['order_id'] in order_ids
+    with app.app_context():
+        assert Order.query.filter_by(user_id=user_id).count() == 1
+
+
+def test_parallel_checkouts_without_key_empty_the_cart_once(app, cart):
+    user_id, headers = cart
+    results = _parallel_checkouts(app, lambda n: headers)
+
+    statuses = sorted(status for status, _, _ in results)
+    assert statuses.count(201) == 1, results
+    assert set(statuses) <= {201, 400, 409}
+    with app.app_context():
+        assert Order.query.filter_by(user_id=user_id).count() == 1
+        assert db.session.query(OrderItem.quantity).distinct().all() == [(2,)]
+
+
+def test_distinct_keys_after_refill_create_distinct_orders(app, client, cart):
+    user_id, headers = cart
+    first = client.post('/api/cart/checkout', headers={**headers, 'Idempotency-Key': 'a'},
+                        json={'order_type': 'mesa', 'table_number': 1})
+    _fill_cart(client, headers, [1])
+    second = client.post('/api/cart/checkout', headers={**headers, 'Idempotency-Key': 'b'},
+                         json={'order_type': 'mesa', 'table_number': 1})
+    assert (first.status_code, second.status_code) == (201, 201)
+    assert first.get_json()['order_id'] != second.get_json()['order_id']
+    assert 'Idempotent-Replayed' not in second.headers
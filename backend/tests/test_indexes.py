@@ -0,0 +1,116 @@
+"""Las consultas calientes de carrito, pedidos y menú usan índices (EXPLAIN en SQLite y MySQL)."""
+import pytest
+from sqlalchemy import event
+
+from models import db
+
+HOT_TABLES = ('cart_item', 'order', 'order_item', 'order_info', 'daily_menu_item', 'daily_menu_snapshot')
+
+
+def _capture_selects(app, client, requests):
+    """Ejecuta ``requests`` y devuelve los SELECT que lanzaron, con sus parámetros."""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if not executemany and statement.lstrip().upper().startswith('SELECT'):
+            statements.append((statement, parameters))
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        for url, headers in requests:
+            assert client.get(url, headers=headers).status_code == 200, url
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+    return statements
+
+
+def _unindexed_reads(app, statements):
+    """``(tabla, detalle)`` de cada lectura sin índice sobre una tabla caliente."""
+    found = []
+    with app.app_context():
+        connection = db.session.connection()
+        for statement, parameters in statements:
+            if db.engine.dialect.name == 'sqlite':
+                for row in connection.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters):
+                    detail = row[-1]
+                    words = detail.split()
+                    if words[0] == 'SCAN' and words[1] in HOT_TABLES and 'INDEX' not in detail:
+                        found.append((words[1], detail))
+            else:
+                for row in connection.exec_driver_sql('EXPLAIN ' + statement, parameters).mappings():
+                    if row['table'] in HOT_TABLES and row['type'] == 'ALL':
+                        found.append((row['table'], dict(row)))
+    return found
+
+
+def _used_indexes(app, statements) -> str:
+    with app.app_context():
+        connection = db.session.connection()
+        if db.engine.dialect.name == 'sqlite':
+            return ' '.join(row[-1] for statement, parameters in statements
+                            for row in connection.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters))
+        return ' '.join(str(row['key']) for statement, parameters in statements
+                        for row in connection.exec_driver_sql('EXPLAIN ' + statement, parameters).mappings())
+
+
+@pytest.fixture
+def hot_app(make_app, database_url):
+    from bench.common import admin_headers, customer_headers
+    from catalog import add_product
+    from models import User
+
+    app = make_app(database_url)
+    with app.app_context():
+        db.session.add_all([User(username='admin', is_admin=True), User(username='cliente')])
+        for n in range(5):
+            add_product(name=f'Plato {n}', price=10 + n)
+        db.session.commit()
+    client = app.test_client()
+    admin, customer = admin_headers(app, 1), customer_headers(app, 2)
+    assert client.post('/api/menu/add', headers=admin, json={'product_id': 1}).status_code == 201
+    assert client.patch('/api/cart/', headers=customer, json={'operations': [
+        {'op': 'add', 'product_id': 2, 'quantity': 1}]}).status_code == 200
+    for n in range(3):
+        assert client.post('/api/admin/orders', headers=admin, json={
+            'user_id': 2, 'order_type': 'mesa', 'table_number': n + 1,
+            'items': [{'product_id': 1, 'quantity': 1}]}).status_code == 201
+    return app, client, admin, customer
+
+
+def test_cart_reads_use_user_product_index(hot_app):
+    from cache import cart_cache
+
+    app, client, admin, customer = hot_app
+    cart_cache.clear()  # el PATCH dejó el carrito en caché
+    statements = _capture_selects(app, client, [('/api/cart/', customer)])
+    assert _unindexed_reads(app, statements) == []
+    assert 'ix_cart_item_user_product' in _used_indexes(app, statements)
+
+
+def test_order_feeds_use_indexes(hot_app):
+    app, client, admin, customer = hot_app
+    statements = _capture_selects(app, client, [
+        ('/api/orders/', admin), ('/api/orders/history', admin), ('/api/orders/', customer),
+        ('/api/orders/?limit=2', admin),
+    ])
+    assert _unindexed_reads(app, statements) == []
+    assert 'ix_order_user_created_at' in _used_indexes(app, statements)
+
+
+def test_menu_reads_use_indexes(hot_app):
+    app, client, admin, customer = hot_app
+    statements = _capture_selects(app, client, [
+        ('/api/menu/today', customer), ('/api/menu/days?from=2026-01-01&to=2026-01-31', customer),
+    ])
+    assert _unindexed_reads(app, statements) == []
+    assert 'uq_daily_menu_item_date_product' in _used_indexes(app, statements)
+
+
+def test_unindexed_read_is_reported(hot_app):
+    app = hot_app[0]
+    statement = 'SELECT id FROM cart_item WHERE quantity = ?' if app.config['DB_PROFILE'] == 'sqlite' \
+        else 'SELECT id FROM cart_item WHERE quantity = %s'
+    assert [table for table, _ in _unindexed_reads(app, [(statement, (1,))])] == ['cart_item']
+
@@ -0,0 +1,73 @@
+"""El feed de pedidos hace el mismo número de consultas con 2 pedidos que con 30."""
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+from models import db
+
+
+@contextmanager
+def count_queries(app):
+    counter = {'n': 0}
+
+    def before_cursor_execute(*args):
+        counter['n'] += 1
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+
+
+def _create_orders(client, admin, customer_ids, product_ids, count: int):
+    created = []
+    for n in range(count):
+        response = client.post('/api/admin/orders', headers=admin, json={
+            'user_id': customer_ids[n % len(customer_ids)], 'order_type': 'mesa', 'table_number': n % 9 + 1,
+            'items': [{'product_id': pid, 'quantity': 1 + n % 3} for pid in product_ids[:1 + n % len(product_ids)]],
+        })
+        assert response.status_code == 201, response.get_json()
+        created.append(response.get_json()['order_id'])
+    return created
+
+
+def _feed_queries(app, client, admin, url: str) -> int:
+    client.get(url, headers=admin)  # calienta catálogo y revocaciones
+    with count_queries(app) as counter:
+        response = client.get(url, headers=admin)
+    assert response.status_code == 200
+    return counter['n']
+
+
+def test_feed_query_count_does_not_grow_with_orders(app, client, admin, seed):
+    customer_ids, product_ids = seed(customers=3, products=3)
+    _create_orders(client, admin, customer_ids, product_ids, 2)
+    url = '/api/orders/?include=user,info,history'
+    few = _feed_queries(app, client, admin, url)
+
+    _create_orders(client, admin, customer_ids, product_ids, 28)
+    many = _feed_queries(app, client, admin, url)
+
+    assert len(client.get(url, headers=admin).get_json()) == 30
+    assert many == few, (few, many)
+
+
+def test_history_query_count_does_not_grow_with_orders(app, client, admin, seed):
+    customer_ids, product_ids = seed(customers=3, products=3)
+
+    def pay(order_ids):
+        for order_id in order_ids:
+            response = client.put(f'/api/orders/{order_id}/status', headers=admin, json={'status': 'pagado'})
+            assert response.status_code == 200
+
+    pay(_create_orders(client, admin, customer_ids, product_ids, 2))
+    few = _feed_queries(app, client, admin, '/api/orders/history')
+
+    pay(_create_orders(client, admin, customer_ids, product_ids, 28))
+    many = _feed_queries(app, client, admin, '/api/orders/history')
+
+    assert len(client.get('/api/orders/history', headers=admin).get_json()) == 30
+    assert many == few, (few, many)
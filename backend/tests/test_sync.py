@@ -0,0 +1,62 @@
+"""Sincronización incremental (``GET /api/sync?since=``)."""
+import pytest
+
+
+@pytest.fixture
+def synced(app, client, seed, admin, customer):
+    customer_ids, product_ids = seed(customers=1, products=2)
+    headers = customer(customer_ids[0])
+    assert client.post('/api/menu/add', headers=admin, json={'product_id': product_ids[0]}).status_code == 201
+    assert client.patch('/api/cart/', headers=headers, json={'operations': [
+        {'op': 'add', 'product_id': product_ids[0], 'quantity': 1}]}).status_code == 200
+    return headers, product_ids
+
+
+def _cursor(client, headers, entities):
+    return client.get(f'/api/sync?entities={entities}', headers=headers).get_json()['cursor']
+
+
+def test_product_change_refreshes_cart_and_menus_without_products(client, admin, synced):
+    headers, product_ids = synced
+    cursor = _cursor(client, headers, 'menus,cart')
+    assert client.put(f'/api/products/{product_ids[0]}', headers=admin, json={'price': '99.50'}).status_code == 200
+
+    body = client.get(f'/api/sync?entities=menus,cart&since={cursor}', headers=headers).get_json()
+    assert body['full'] is False and 'products' not in body
+    assert body['cart']['items'][0]['product']['price'] == 99.5
+    [menu] = body['menus']['upserted'].values()
+    assert [p['price'] for p in menu] == [99.5]
+
+
+def test_unrelated_product_change_still_counts_for_the_cart(client, admin, synced):
+    headers, product_ids = synced
+    cursor = _cursor(client, headers, 'cart')
+    assert client.get(f'/api/sync?entities=cart&since={cursor}', headers=headers).get_json()['cart'] is None
+    assert client.put(f'/api/products/{product_ids[1]}', headers=admin, json={'price': '1.00'}).status_code == 200
+    assert client.get(f'/api/sync?entities=cart&since={cursor}', headers=headers).get_json()['cart'] is not None
+
+
+def test_paged_cursor_stops_at_the_settled_changes(app, client, seed, admin):
+    customer_ids, product_ids = seed(customers=1, products=3)
+    app.config['SYNC_MAX_CHANGES'] = 1
+    cursor = _cursor(client, admin, 'products')
+    for pid in product_ids:
+        assert client.put(f'/api/products/{pid}', headers=admin, json={'price': '5.00'}).status_code == 200
+
+    # Todo asentado: se pagina de uno en uno hasta el final
+    seen = []
+    while True:
+        body = client.get(f'/api/sync?entities=products&since={cursor}', headers=admin).get_json()
+        seen += [p['id'] for p in body['products']['upserted']]
+        cursor = body['cursor']
+        if not body['has_more']:
+            break
+    assert seen == product_ids
+
+    # Cambios recientes sin asentar: la página se entrega pero el cursor no avanza sobre ella
+    app.config['SYNC_SETTLE_SECONDS'] = 60
+    for pid in product_ids[:2]:
+        assert client.put(f'/api/products/{pid}', headers=admin, json={'price': '6.00'}).status_code == 200
+    body = client.get(f'/api/sync?entities=products&since={cursor}', headers=admin).get_json()
+    assert [p['id'] for p in body['products']['upserted']] == product_ids[:1]
+    assert body['cursor'] == cursor and body['has_more'] is False
@@ -0,0 +1,23 @@
+"""Fechas en la zona horaria del negocio (``BUSINESS_TIMEZONE``).
+
+La base de datos guarda ``datetime.utcnow()`` sin zona; los reportes y el menú
+del día deben agruparse por el día local del restaurante.
+"""
+from datetime import datetime, timezone
+from zoneinfo import ZoneInfo
+
+from flask import current_app
+
+
+def business_tz():
+    name = current_app.config.get('BUSINESS_TIMEZONE') or 'UTC'
+    return timezone.utc if name.upper() == 'UTC' else ZoneInfo(name)
+
+
+def to_business_time(value: datetime) -> datetime:
+    """Convierte un datetime UTC sin zona a la hora local del negocio."""
+    return value.replace(tzinfo=timezone.utc).astimezone(business_tz())
+
+
+def business_now() -> datetime:
+    return datetime.now(business_tz())
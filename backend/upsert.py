@@ -0,0 +1,58 @@
+"""Upserts (sumar a contadores o sobrescribir valores) sin leer antes la fila.
+
+Usa ``INSERT ... ON CONFLICT DO UPDATE`` (SQLite/PostgreSQL) o
+``INSERT ... ON DUPLICATE KEY UPDATE`` (MySQL) para que dos transacciones
+concurrentes sobre la misma clave no choquen con la restricción única. Las
+columnas de ``keys`` deben formar una restricción única del modelo.
+"""
+from models import db
+
+
+def _upsert(model, keys: dict, row: dict, updates) -> bool:
+    """Ejecuta el upsert nativo del dialecto; ``updates(table, new)`` da las columnas a actualizar.
+
+    Devuelve False si el dialecto no tiene upsert y hay que usar el fallback.
+    """
+    table = model.__table__
+    dialect = db.session.get_bind().dialect.name
+    if dialect in ('sqlite', 'postgresql'):
+        if dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+        stmt = insert(table).values(row)
+        stmt = stmt.on_conflict_do_update(index_elements=list(keys), set_=updates(table, stmt.excluded))
+    elif dialect in ('mysql', 'mariadb'):
+        from sqlalchemy.dialects.mysql import insert
+        stmt = insert(table).values(row)
+        stmt = stmt.on_duplicate_key_update(updates(table, stmt.inserted))
+    else:
+        return False
+    db.session.execute(stmt)
+    return True
+
+
+def upsert_increment(model, keys: dict, deltas: dict, values: dict = None):
+    """Inserta ``keys + deltas (+ values)`` o suma ``deltas`` a la fila existente."""
+    row = {**keys, **deltas, **(values or {})}
+    if _upsert(model, keys, row, lambda table, new: {name: table.c[name] + new[name] for name in deltas}):
+        return
+    existing = model.query.filter_by(**keys).with_for_update().first()
+    if existing:
+        for name, delta in deltas.items():
+            setattr(existing, name, getattr(existing, name) + delta)
+    else:
+        db.session.add(model(**row))
+
+
+def upsert_set(model, keys: dict, values: dict):
+    """Inserta ``keys + values`` o sobrescribe ``values`` en la fila existente."""
+    row = {**keys, **values}
+    if _upsert(model, keys, row, lambda table, new: {name: new[name] for name in values}):
+        return
+    existing = model.query.filter_by(**keys).with_for_update().first()
+    if existing:
+        for name, value in values.items():
+            setattr(existing, name, value)
+    else:
+        db.session.add(model(**row))
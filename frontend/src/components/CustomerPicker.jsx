@@ -0,0 +1,42 @@
+import React, { useEffect, useState } from 'react'
+import { useAuth } from '../context/AuthContext.jsx'
+
+// Selector de cliente sobre el directorio paginado: busca en el servidor (`q`) y sigue X-Next-Cursor
+export default function CustomerPicker({ value, onChange, className = '' }) {
+  const { api } = useAuth()
+  const [query, setQuery] = useState('')
+  const [customers, setCustomers] = useState([])
+  const [nextCursor, setNextCursor] = useState(null)
+
+  async function search(q, cursor) {
+    try {
+      const { data, headers } = await api.get('/api/admin/customers', { params: { role: 'customer', q: q || undefined, cursor } })
+      setCustomers(prev => cursor ? [...prev, ...data] : data)
+      setNextCursor(headers['x-next-cursor'] || null)
+    } catch (err) {
+      // No bloquear el formulario por error de carga de clientes
+    }
+  }
+
+  useEffect(() => {
+    const timer = setTimeout(() => search(query.trim()), 250)
+    return () => clearTimeout(timer)
+  }, [query])
+
+  return (
+    <div className={`grid gap-2 ${className}`}>
+      <input type="search" value={query} onChange={e => setQuery(e.target.value)} placeholder="Buscar cliente (nombre, teléfono, email)" className="w-full rounded-md border border-slate-700 bg-slate-900 text-gray-100 placeholder-gray-500 px-3 py-2" />
+      <div className="flex items-center gap-2">
+        <select value={value} onChange={e => onChange(e.target.value)} className="w-full rounded-md border border-slate-700 bg-slate-900 text-gray-100 px-3 py-2">
+          <option value="">Seleccione cliente</option>
+          {customers.map(c => (
+            <option key={c.id} value={c.id}>{(c.first_name || '')} {(c.last_name || '')}{c.phone ? ` · ${c.phone}` : ''}</option>
+          ))}
+        </select>
+        {nextCursor && (
+          <button type="button" onClick={() => search(query.trim(), nextCursor)} className="shrink-0 rounded-md px-3 py-2 text-sm bg-slate-700 text-gray-100 hover:bg-slate-600">Ver más</button>
+        )}
+      </div>
+    </div>
+  )
+}
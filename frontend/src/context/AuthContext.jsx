@@ -6,21 +6,49 @@ const AuthContext = createContext()
 export function AuthProvider({ children }) {
   const [user, setUser] = useState(null)
   const [token, setToken] = useState(localStorage.getItem('token') || null)
+  const [refreshToken, setRefreshToken] = useState(localStorage.getItem('refreshToken') || null)
 
   const api = axios.create({ baseURL: 'http://localhost:5000' })
   api.interceptors.request.use((config) => {
-    if (token) config.headers.Authorization = `Bearer ${token}`
+    if (token && !config.headers.Authorization) config.headers.Authorization = `Bearer ${token}`
     return config
   })
+  // El access token dura poco: ante un 401 se renueva una vez con el refresh token y se reintenta
+  api.interceptors.response.use(undefined, async (error) => {
+    const original = error.config
+    if (error.response?.status !== 401 || !refreshToken || original._retried || original.url === '/api/auth/refresh') {
+      throw error
+    }
+    original._retried = true
+    try {
+      const { data } = await api.post('/api/auth/refresh', null, {
+        headers: { Authorization: `Bearer ${refreshToken}` },
+      })
+      setToken(data.access_token)
+      original.headers.Authorization = `Bearer ${data.access_token}`
+      return api(original)
+    } catch {
+      setToken(null)
+      setRefreshToken(null)
+      setUser(null)
+      throw error
+    }
+  })
 
   useEffect(() => {
     if (token) localStorage.setItem('token', token)
     else localStorage.removeItem('token')
   }, [token])
 
+  useEffect(() => {
+    if (refreshToken) localStorage.setItem('refreshToken', refreshToken)
+    else localStorage.removeItem('refreshToken')
+  }, [refreshToken])
+
   async function login(username, password) {
     const { data } = await api.post('/api/auth/login', { username, password })
     setToken(data.access_token)
+    setRefreshToken(data.refresh_token)
     setUser(data.user)
   }
 
@@ -30,8 +58,10 @@ export function AuthProvider({ children }) {
   }
 
   async function logout() {
-    try { await api.post('/api/auth/logout') } catch {}
+    // Revoca en el servidor el access token y el refresh token de la sesión
+    try { await api.post('/api/auth/logout', { refresh_token: refreshToken }) } catch {}
     setToken(null)
+    setRefreshToken(null)
     setUser(null)
   }
 
@@ -1,4 +1,4 @@
-import React, { createContext, useContext, useEffect, useState } from 'react'
+import React, { createContext, useContext, useEffect, useRef, useState } from 'react'
 import { useAuth } from './AuthContext.jsx'
 import { useNotify } from './NotifyContext.jsx'
 
@@ -8,19 +8,34 @@ export function CartProvider({ children }) {
   const { api, user } = useAuth()
   const [cart, setCart] = useState({ items: [], total: 0 })
   const { notify } = useNotify()
+  // Clave de idempotencia del checkout en curso: se reutiliza en reintentos y
+  // dobles clics, y se descarta al completar el pedido o cambiar el carrito
+  const checkoutKey = useRef(null)
 
   async function loadCart() {
     if (!user) return setCart({ items: [], total: 0 })
+    // El backend responde con ETag: si el carrito no cambió, el navegador revalida con un 304
     const { data } = await api.get('/api/cart/')
     setCart(data)
   }
 
+  // Aplica varias operaciones en una sola petición; la respuesta ya es el carrito actualizado
+  async function applyOperations(operations) {
+    const { data } = await api.patch('/api/cart/', { operations })
+    checkoutKey.current = null
+    setCart(data)
+    return data
+  }
+
+  function productIdOf(item_id) {
+    return cart.items.find((i) => i.id === item_id)?.product.id
+  }
+
   useEffect(() => { loadCart() }, [user])
 
   async function addToCart(product_id, quantity = 1) {
     try {
-      await api.post('/api/cart/', { product_id, quantity })
-      await loadCart()
+      await applyOperations([{ op: 'add', product_id, quantity }])
       notify('Producto agregado al carrito', 'success')
     } catch (err) {
       const msg = err?.response?.data?.message || 'No se pudo agregar al carrito'
@@ -30,22 +45,24 @@ export function CartProvider({ children }) {
   }
 
   async function updateItem(item_id, quantity) {
-    await api.put(`/api/cart/${item_id}`, { quantity })
-    await loadCart()
+    await applyOperations([{ op: 'set', product_id: productIdOf(item_id), quantity: Math.max(1, quantity) }])
   }
 
   async function removeItem(item_id) {
-    await api.delete(`/api/cart/${item_id}`)
-    await loadCart()
+    await applyOperations([{ op: 'remove', product_id: productIdOf(item_id) }])
   }
 
   async function checkout(payload = {}) {
-    const { data } = await api.post('/api/cart/checkout', payload)
+    if (!checkoutKey.current) checkoutKey.current = crypto.randomUUID()
+    const { data } = await api.post('/api/cart/checkout', payload, {
+      headers: { 'Idempotency-Key': checkoutKey.current }
+    })
+    checkoutKey.current = null
     await loadCart()
     return data
   }
 
-  const value = { cart, loadCart, addToCart, updateItem, removeItem, checkout }
+  const value = { cart, loadCart, applyOperations, addToCart, updateItem, removeItem, checkout }
   return <CartContext.Provider value={value}>{children}</CartContext.Provider>
 }
 
@@ -1,28 +1,60 @@
 import React, { useEffect, useState } from 'react'
 import { useAuth } from '../context/AuthContext.jsx'
+import CustomerPicker from '../components/CustomerPicker.jsx'
 
 export default function AdminPanel() {
   const { api } = useAuth()
   const [products, setProducts] = useState([])
-  const [users, setUsers] = useState([])
+  const [customers, setCustomers] = useState([])
+  const [customerQuery, setCustomerQuery] = useState('')
+  const [customersCursor, setCustomersCursor] = useState(null)
+  const [customerOrders, setCustomerOrders] = useState({})
   const [menuToday, setMenuToday] = useState([])
 
   const [form, setForm] = useState({ name: '', description: '', price: '', image_url: '', image_file: null })
   const [editingId, setEditingId] = useState(null)
 
   async function load() {
-    const [p, u, m] = await Promise.all([
+    const [p, m] = await Promise.all([
       api.get('/api/products/'),
-      api.get('/api/admin/users'),
       api.get('/api/menu/today')
     ])
     setProducts(p.data)
-    setUsers(u.data)
     setMenuToday(m.data)
   }
 
   useEffect(() => { load() }, [])
 
+  // Directorio paginado de clientes (con número de pedidos y el último), buscado en el servidor
+  async function loadCustomers(q, cursor) {
+    try {
+      const { data, headers } = await api.get('/api/admin/customers', { params: { role: 'customer', q: q || undefined, cursor } })
+      setCustomers(prev => cursor ? [...prev, ...data] : data)
+      setCustomersCursor(headers['x-next-cursor'] || null)
+    } catch (err) {
+      alert(err?.response?.data?.message || 'No se pudo cargar clientes')
+    }
+  }
+
+  useEffect(() => {
+    const timer = setTimeout(() => loadCustomers(customerQuery.trim()), 250)
+    return () => clearTimeout(timer)
+  }, [customerQuery])
+
+  // Pedidos de un cliente solo cuando se despliegan (la primera página, los más recientes)
+  async function toggleCustomerOrders(customerId) {
+    if (customerOrders[customerId]) {
+      setCustomerOrders(prev => { const next = { ...prev }; delete next[customerId]; return next })
+      return
+    }
+    try {
+      const { data } = await api.get(`/api/admin/customers/${customerId}/orders`, { params: { fields: 'id,total,created_at', include: 'info', limit: 20 } })
+      setCustomerOrders(prev => ({ ...prev, [customerId]: data }))
+    } catch (err) {
+      alert(err?.response?.data?.message || 'No se pudo cargar los pedidos')
+    }
+  }
+
   async function submitProduct(e) {
     e.preventDefault()
     try {
@@ -113,7 +145,7 @@ export default function AdminPanel() {
       }
       setNewUser({ first_name: '', last_name: '', phone: '', address: '', email: '' })
       setEditingUserId(null)
-      await load()
+      await loadCustomers(customerQuery.trim())
     } catch (err) {
       alert(err?.response?.data?.message || 'Error al crear cliente')
     }
@@ -175,8 +207,9 @@ export default function AdminPanel() {
         {/* Clientes registrados (antes Menú del día) */}
         <section className="bg-slate-800 border border-slate-700 rounded-xl shadow p-6">
           <h3 className="text-xl font-semibold text-gray-100 mb-4">Clientes registrados</h3>
+          <input type="search" value={customerQuery} onChange={e => setCustomerQuery(e.target.value)} placeholder="Buscar cliente (nombre, teléfono, email)" className="w-full mb-3 rounded-md border border-slate-700 bg-slate-900 text-gray-100 placeholder-gray-500 px-3 py-2" />
           <div className="bg-white/90 backdrop-blur border border-gray-200 rounded-xl shadow-sm divide-y max-h-80 overflow-y-auto">
-            {users.filter(u => !u.is_admin).map(c => (
+            {customers.map(c => (
               <div key={c.id} className="py-3 px-4 flex items-center">
                 <div className="flex-1">
                   <strong className="text-gray-900">{c.first_name || ''} {c.last_name || ''}</strong>
@@ -191,10 +224,13 @@ export default function AdminPanel() {
                 </div>
               </div>
             ))}
-            {users.filter(u => !u.is_admin).length === 0 && (
-              <div className="py-6 px-4 text-gray-600">No hay clientes registrados.</div>
+            {customers.length === 0 && (
+              <div className="py-6 px-4 text-gray-600">{customerQuery.trim() ? 'Sin resultados para la búsqueda.' : 'No hay clientes registrados.'}</div>
             )}
           </div>
+          {customersCursor && (
+            <button onClick={() => loadCustomers(customerQuery.trim(), customersCursor)} className="mt-3 inline-flex items-center justify-center rounded-md px-3 py-2 text-sm font-medium transition-colors bg-slate-700 text-gray-100 hover:bg-slate-600">Ver más</button>
+          )}
         </section>
 
         <section className="bg-slate-800 border border-slate-700 rounded-xl shadow p-6">
@@ -222,42 +258,50 @@ export default function AdminPanel() {
       {/* Registrar pedido (admin) */}
       <section className="mt-8 bg-slate-800 border border-slate-700 rounded-xl shadow p-6">
           <h3 className="text-xl font-semibold text-gray-100 mb-4">Registrar pedido</h3>
-          <AdminOrderForm users={users.filter(u => !u.is_admin)} menu={menuToday} onCreated={load} />
+          <AdminOrderForm menu={menuToday} onCreated={() => { setCustomerOrders({}); loadCustomers(customerQuery.trim()) }} />
         </section>
 
       {/* Clientes y pedidos (debajo del formulario) */}
       <section className="mt-8">
         <h3 className="text-xl font-semibold mb-2">Clientes y pedidos</h3>
         <div className="bg-white/90 backdrop-blur border border-gray-200 rounded-xl shadow-sm divide-y">
-          {users.filter(u => !u.is_admin).map(u => (
+          {customers.map(u => (
             <div key={u.id} className="py-3 px-4">
-              <div className="mb-1">
-                <strong className="text-gray-900">{u.first_name || ''} {u.last_name || ''}</strong> {u.email && <span className="text-gray-700"> · {u.email}</span>}
-                {u.phone && <span className="text-gray-600"> · {u.phone}</span>}
-                {u.address && <span className="text-gray-600"> · {u.address}</span>}
+              <div className="mb-1 flex items-center gap-2">
+                <div className="flex-1">
+                  <strong className="text-gray-900">{u.first_name || ''} {u.last_name || ''}</strong> {u.email && <span className="text-gray-700"> · {u.email}</span>}
+                  {u.phone && <span className="text-gray-600"> · {u.phone}</span>}
+                  {u.address && <span className="text-gray-600"> · {u.address}</span>}
+                  <div className="text-sm text-gray-600">{u.order_count} pedidos{u.last_order_at ? ` · último ${formatOrderDate(u.last_order_at)}` : ''}</div>
+                </div>
+                {u.order_count > 0 && (
+                  <button onClick={() => toggleCustomerOrders(u.id)} className="inline-flex items-center justify-center rounded-md px-3 py-1 text-sm font-medium transition-colors bg-slate-700 text-gray-100 hover:bg-slate-600">{customerOrders[u.id] ? 'Ocultar' : 'Ver pedidos'}</button>
+                )}
               </div>
-              <ul className="list-disc ml-6 text-sm text-gray-700">
-                {u.orders.map(o => (
-                  <li key={o.id}>
-                    Pedido #{o.id} — Total: ${o.total} — {formatOrderDate(o.created_at)}
-                    {o.info?.order_type && (
-                      <span className="ml-2 inline-flex items-center gap-2 text-xs">
-                        <span className="px-2 py-0.5 rounded-full bg-slate-200 text-slate-800">{o.info.order_type}</span>
-                        {o.info.order_type === 'mesa' && o.info.table_number && (
-                          <span className="text-gray-600">Mesa {o.info.table_number}</span>
-                        )}
-                        {o.info.order_type === 'delivery' && (
-                          <span className="text-gray-600">{o.info.delivery_address}{o.info.delivery_phone ? ` · ${o.info.delivery_phone}` : ''}</span>
-                        )}
-                      </span>
-                    )}
-                  </li>
-                ))}
-                {u.orders.length === 0 && <li>Sin pedidos</li>}
-              </ul>
+              {customerOrders[u.id] && (
+                <ul className="list-disc ml-6 text-sm text-gray-700">
+                  {customerOrders[u.id].map(o => (
+                    <li key={o.id}>
+                      Pedido #{o.id} — Total: ${o.total} — {formatOrderDate(o.created_at)}
+                      {o.info?.order_type && (
+                        <span className="ml-2 inline-flex items-center gap-2 text-xs">
+                          <span className="px-2 py-0.5 rounded-full bg-slate-200 text-slate-800">{o.info.order_type}</span>
+                          {o.info.order_type === 'mesa' && o.info.table_number && (
+                            <span className="text-gray-600">Mesa {o.info.table_number}</span>
+                          )}
+                          {o.info.order_type === 'delivery' && (
+                            <span className="text-gray-600">{o.info.delivery_address}{o.info.delivery_phone ? ` · ${o.info.delivery_phone}` : ''}</span>
+                          )}
+                        </span>
+                      )}
+                    </li>
+                  ))}
+                  {customerOrders[u.id].length === 0 && <li>Sin pedidos</li>}
+                </ul>
+              )}
             </div>
           ))}
-          {users.filter(u => !u.is_admin).length === 0 && <div className="py-6 px-4 text-gray-600">Sin clientes</div>}
+          {customers.length === 0 && <div className="py-6 px-4 text-gray-600">Sin clientes</div>}
         </div>
       </section>
 
@@ -266,7 +310,7 @@ export default function AdminPanel() {
   )
 }
 
-function AdminOrderForm({ users, menu, onCreated }) {
+function AdminOrderForm({ menu, onCreated }) {
   const { api } = useAuth()
   const [clientId, setClientId] = useState('')
   const [productId, setProductId] = useState('')
@@ -301,12 +345,7 @@ function AdminOrderForm({ users, menu, onCreated }) {
   return (
     <form onSubmit={submit} className="grid gap-3">
       <div className="grid grid-cols-1 sm:grid-cols-2 gap-3">
-        <select value={clientId} onChange={e => setClientId(e.target.value)} className="w-full rounded-md border border-slate-700 bg-slate-900 text-gray-100 px-3 py-2">
-          <option value="">Seleccione cliente</option>
-          {users.map(u => (
-            <option key={u.id} value={u.id}>{(u.first_name || '')} {(u.last_name || '')}</option>
-          ))}
-        </select>
+        <CustomerPicker value={clientId} onChange={setClientId} />
         <select value={productId} onChange={e => setProductId(e.target.value)} className="w-full rounded-md border border-slate-700 bg-slate-900 text-gray-100 px-3 py-2">
           <option value="">Seleccione producto del menú</option>
           {menu.map(p => (
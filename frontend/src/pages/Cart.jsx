@@ -1,36 +1,20 @@
-import React, { useEffect, useState } from 'react'
+import React, { useState } from 'react'
 import { useCart } from '../context/CartContext.jsx'
 import { useNotify } from '../context/NotifyContext.jsx'
 import { useAuth } from '../context/AuthContext.jsx'
+import CustomerPicker from '../components/CustomerPicker.jsx'
 
 export default function Cart() {
   const { cart, updateItem, removeItem, checkout } = useCart()
   const { notify } = useNotify()
-  const { api, user: currentUser } = useAuth()
+  const { user: currentUser } = useAuth()
   const [orderType, setOrderType] = useState('mesa')
   const [tableNumber, setTableNumber] = useState('')
   const [deliveryAddress, setDeliveryAddress] = useState('')
   const [deliveryPhone, setDeliveryPhone] = useState('')
-  const [clients, setClients] = useState([])
   const [clientId, setClientId] = useState('')
   const [paymentMethod, setPaymentMethod] = useState('efectivo')
 
-  useEffect(() => {
-    async function loadClients() {
-      try {
-        if (currentUser?.is_admin) {
-          const { data } = await api.get('/api/admin/users')
-          setClients(data.filter(u => !u.is_admin))
-        } else {
-          setClients([])
-        }
-      } catch (err) {
-        // No bloquear el carrito por error de carga de clientes
-      }
-    }
-    loadClients()
-  }, [currentUser])
-
   return (
     <div className="max-w-xl mx-auto mt-10">
       <h2 className="text-2xl font-bold mb-4">Carrito</h2>
@@ -102,16 +86,7 @@ export default function Cart() {
               {currentUser?.is_admin && (
                 <div className="grid grid-cols-1 sm:grid-cols-2 gap-3 items-center">
                   <label className="text-gray-300">Cliente</label>
-                  <select
-                    value={clientId}
-                    onChange={e => setClientId(e.target.value)}
-                    className="w-full border border-slate-700 bg-slate-900 text-gray-100 rounded px-3 py-2"
-                  >
-                    <option value="">Seleccione cliente</option>
-                    {clients.map(c => (
-                      <option key={c.id} value={c.id}>{(c.first_name || '')} {(c.last_name || '')}</option>
-                    ))}
-                  </select>
+                  <CustomerPicker value={clientId} onChange={setClientId} />
                 </div>
               )}
             </div>
@@ -7,6 +7,8 @@ export default function Products() {
   const { addToCart } = useCart()
   const [products, setProducts] = useState([])
   const [error, setError] = useState('')
+  const [query, setQuery] = useState('')
+  const [nextCursor, setNextCursor] = useState(null)
 
   // Construye URL absoluta para imágenes servidas por el backend
   function buildImageSrc(url) {
@@ -16,16 +18,40 @@ export default function Products() {
     return `${base}${url}`
   }
 
+  // srcset a partir de las variantes generadas por el backend ({ ancho: url })
+  function buildSrcSet(variants) {
+    if (!variants) return undefined
+    return Object.entries(variants).map(([w, url]) => `${buildImageSrc(url)} ${w}w`).join(', ')
+  }
+
   async function load() {
     try {
       const { data } = await api.get('/api/products/')
       setProducts(data)
+      setNextCursor(null)
     } catch (err) {
       setError('No se pudo cargar productos')
     }
   }
 
-  useEffect(() => { load() }, [])
+  // Búsqueda en el servidor (sin acentos, por prefijo y tolerante a erratas), paginada con X-Next-Cursor
+  async function search(q, cursor) {
+    try {
+      const { data, headers } = await api.get('/api/products/search', { params: { q, cursor } })
+      setProducts(prev => cursor ? [...prev, ...data] : data)
+      setNextCursor(headers['x-next-cursor'] || null)
+      setError('')
+    } catch (err) {
+      setError('No se pudo buscar productos')
+    }
+  }
+
+  useEffect(() => {
+    const q = query.trim()
+    if (!q) { load(); return }
+    const timer = setTimeout(() => search(q), 250)
+    return () => clearTimeout(timer)
+  }, [query])
 
   return (
     <div className="max-w-6xl mx-auto">
@@ -35,14 +61,22 @@ export default function Products() {
           <span className="text-sm text-gray-400">{products.length} ítems disponibles</span>
         )}
       </div>
+      <input type="search" value={query} onChange={e => setQuery(e.target.value)} placeholder="Buscar platos (p. ej. aji, chaufa, ceviche mixto)" className="w-full mb-5 rounded-md bg-slate-800 border border-slate-700 px-3 py-2 text-gray-100 placeholder-gray-500 focus:outline-none focus:border-indigo-500" />
       {error && <div className="mb-3 text-red-600 bg-red-950/40 border border-red-800 rounded-md px-3 py-2">{error}</div>}
       {products.length === 0 ? (
-        <div className="text-gray-300 bg-slate-800/50 border border-slate-700 rounded-lg p-6 text-center">No hay productos. Crea uno desde <span className="text-indigo-400">Admin</span>.</div>
+        <div className="text-gray-300 bg-slate-800/50 border border-slate-700 rounded-lg p-6 text-center">
+          {query.trim() ? 'Sin resultados para la búsqueda.' : <>No hay productos. Crea uno desde <span className="text-indigo-400">Admin</span>.</>}
+        </div>
       ) : (
         <div className="grid grid-cols-[repeat(auto-fill,minmax(240px,1fr))] gap-5">
           {products.map(p => (
             <div key={p.id} className="bg-slate-800 border border-slate-700 rounded-lg shadow-sm p-4 transition hover:shadow-md hover:border-indigo-700">
-              {p.image_url && <img src={buildImageSrc(p.image_url)} alt={p.name} className="w-full h-44 object-cover rounded-md mb-3 ring-1 ring-slate-700" />}
+              {p.image_url && (
+                <picture>
+                  {p.image_variants && <source type="image/webp" srcSet={buildSrcSet(p.image_variants.webp)} sizes="(max-width: 640px) 100vw, 320px" />}
+                  <img src={buildImageSrc(p.image_url)} srcSet={buildSrcSet(p.image_variants?.jpg)} sizes="(max-width: 640px) 100vw, 320px" loading="lazy" alt={p.name} className="w-full h-44 object-cover rounded-md mb-3 ring-1 ring-slate-700" />
+                </picture>
+              )}
               <h3 className="font-semibold text-lg text-gray-100">{p.name}</h3>
               {p.description && <p className="text-sm text-gray-300 line-clamp-3">{p.description}</p>}
               <div className="mt-3 flex items-center justify-between">
@@ -53,6 +87,11 @@ export default function Products() {
           ))}
         </div>
       )}
+      {nextCursor && (
+        <div className="mt-6 text-center">
+          <button onClick={() => search(query.trim(), nextCursor)} className="rounded-md px-4 py-2 font-medium border border-slate-600 text-gray-200 hover:border-indigo-500">Ver más</button>
+        </div>
+      )}
     </div>
   )
 }
\ No newline at end of file